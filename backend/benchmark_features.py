@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Benchmark the rolling statistics kernel against the pandas path it replaced
+Run with an optional number of years of half-hourly prices (default 5)
+
+Reports wall time for both, and each one's largest relative error against
+an exact two-pass computation over every window. Then compares peak memory
+of the frame-based training feature pipeline with the float32 buffer one.
+"""
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from sklearn.preprocessing import StandardScaler
+
+from models.features import (
+    rolling_features, build_feature_matrix, FEATURE_COLUMNS, LAG_DAYS,
+    ROLLING_WINDOWS, PCT_CHANGES, MOMENTUM, VOLATILITY, ROC, RSI_WINDOW
+)
+
+
+def pandas_rolling_features(prices: np.ndarray) -> dict:
+    """The per-statistic pandas rolling() calls prepare_features used to make"""
+    price = pd.Series(prices)
+    out = {}
+
+    for window in ROLLING_WINDOWS:
+        out[f'rolling_mean_{window}h'] = price.rolling(window=window).mean()
+        out[f'rolling_std_{window}h'] = price.rolling(window=window).std()
+        out[f'rolling_min_{window}h'] = price.rolling(window=window).min()
+        out[f'rolling_max_{window}h'] = price.rolling(window=window).max()
+
+    for name, window in VOLATILITY.items():
+        out[name] = price.rolling(window).std() / price.rolling(window).mean()
+
+    delta = price.diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=RSI_WINDOW).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=RSI_WINDOW).mean()
+    out['rsi_7d'] = 100 - (100 / (1 + gain / loss))
+
+    return {name: values.to_numpy() for name, values in out.items()}
+
+
+def exact_rolling_features(prices: np.ndarray) -> dict:
+    """Two-pass reference over materialised windows (slow, exact)"""
+    out = {}
+    stds, means = {}, {}
+
+    for window in sorted(set(ROLLING_WINDOWS) | set(VOLATILITY.values())):
+        windows = sliding_window_view(prices, window)
+        pad = np.full(window - 1, np.nan)
+        means[window] = np.r_[pad, windows.mean(axis=1)]
+        stds[window] = np.r_[pad, windows.std(axis=1, ddof=1)]
+        if window in ROLLING_WINDOWS:
+            out[f'rolling_mean_{window}h'] = means[window]
+            out[f'rolling_std_{window}h'] = stds[window]
+            out[f'rolling_min_{window}h'] = np.r_[pad, windows.min(axis=1)]
+            out[f'rolling_max_{window}h'] = np.r_[pad, windows.max(axis=1)]
+
+    for name, window in VOLATILITY.items():
+        out[name] = stds[window] / means[window]
+
+    delta = np.diff(prices, prepend=np.nan)
+    gains = sliding_window_view(np.where(delta > 0, delta, 0.0), RSI_WINDOW).mean(axis=1)
+    losses = sliding_window_view(np.where(delta < 0, -delta, 0.0), RSI_WINDOW).mean(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out['rsi_7d'] = np.r_[np.full(RSI_WINDOW - 1, np.nan), 100 - (100 / (1 + gains / losses))]
+
+    return out
+
+
+def frame_feature_pipeline(df: pd.DataFrame):
+    """What train used to do: feature columns added to a frame copy, dropna, scaled float64 copy"""
+    df = df.copy()
+    times = df['timestamp'].dt
+    df['hour'], df['day_of_week'], df['month'] = times.hour, times.dayofweek, times.month
+    df['day_of_month'], df['quarter'] = times.day, times.quarter
+    df['week_of_year'] = times.isocalendar().week.astype(int)
+    df['is_weekend'] = df['day_of_week'].isin([5, 6]).astype(int)
+    for name, period in (('hour', 24), ('day', 7), ('month', 12)):
+        column = df['day_of_week' if name == 'day' else name]
+        df[f'{name}_sin'] = np.sin(2 * np.pi * column / period)
+        df[f'{name}_cos'] = np.cos(2 * np.pi * column / period)
+    for lag in LAG_DAYS:
+        df[f'price_lag_{lag}d'] = df['price'].shift(lag * 24)
+    for name, values in rolling_features(df['price'].to_numpy()).items():
+        df[name] = values
+    for name, periods in PCT_CHANGES.items():
+        df[name] = df['price'] / df['price'].shift(periods) - 1
+    for name, periods in MOMENTUM.items():
+        df[name] = df['price'] - df['price'].shift(periods)
+    for name, periods in ROC.items():
+        df[name] = (df['price'] - df['price'].shift(periods)) / df['price'].shift(periods)
+
+    df = df.dropna()
+    X = df[FEATURE_COLUMNS].values
+    return StandardScaler().fit_transform(X), df['price'].values
+
+
+def buffer_feature_pipeline(df: pd.DataFrame):
+    """What train does now: one float32 buffer, scaled in place"""
+    matrix = build_feature_matrix(df['timestamp'], df['price'].to_numpy())
+    return StandardScaler(copy=False).fit_transform(matrix.X), matrix.y
+
+
+def peak_memory(fn, *args):
+    """Wall time and peak traced allocation of one call"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def synthetic_prices(rows: int, seed: int = 42) -> np.ndarray:
+    """Random-walk prices with a volatile spell and a flat stretch"""
+    rng = np.random.default_rng(seed)
+    prices = np.abs(rng.standard_normal(rows).cumsum()) * 3 + 50
+    spike = slice(rows // 2, rows // 2 + rows // 20)
+    prices[spike] += np.abs(rng.standard_normal(len(prices[spike]))) * 300
+    prices[rows // 10:rows // 10 + 200] = 80.0
+    return prices
+
+
+def timed(fn, prices: np.ndarray, repeats: int = 5):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn(prices)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def max_relative_error(result: dict, reference: dict) -> float:
+    worst = 0.0
+    for name, expected in reference.items():
+        got = result[name]
+        both = np.isfinite(expected) & np.isfinite(got)
+        scale = np.maximum(np.abs(expected[both]), 1e-12)
+        if both.any():
+            worst = max(worst, float(np.max(np.abs(got[both] - expected[both]) / scale)))
+    return worst
+
+
+def main(years: int = 5):
+    prices = synthetic_prices(years * 365 * 48)
+
+    print(f"🦞 Rolling feature benchmark - {len(prices):,} rows")
+    print("=" * 50)
+
+    reference = exact_rolling_features(prices)
+    legacy, legacy_time = timed(pandas_rolling_features, prices)
+    kernel, kernel_time = timed(rolling_features, prices)
+
+    print(f"  pandas rolling: {legacy_time * 1000:8.1f} ms  max rel error {max_relative_error(legacy, reference):.1e}")
+    print(f"  kernel:         {kernel_time * 1000:8.1f} ms  max rel error {max_relative_error(kernel, reference):.1e}")
+    print(f"  speedup:        {legacy_time / kernel_time:8.1f}x")
+
+    df = pd.DataFrame({
+        'timestamp': pd.date_range('2020-01-01', periods=len(prices), freq='h'),
+        'price': prices,
+        'market': 'uk_dayahead',
+    })
+
+    print()
+    print("Training feature pipeline (features + scaling)")
+    print("=" * 50)
+    (X_frame, _), frame_time, frame_peak = peak_memory(frame_feature_pipeline, df)
+    (X_buffer, _), buffer_time, buffer_peak = peak_memory(buffer_feature_pipeline, df)
+
+    print(f"  frame + float64: {frame_time * 1000:7.1f} ms  peak {frame_peak / 1e6:7.1f} MB  matrix {X_frame.nbytes / 1e6:6.1f} MB")
+    print(f"  float32 buffer:  {buffer_time * 1000:7.1f} ms  peak {buffer_peak / 1e6:7.1f} MB  matrix {X_buffer.nbytes / 1e6:6.1f} MB")
+    print(f"  max abs difference after scaling: {np.max(np.abs(X_frame - X_buffer)):.1e}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Compare model backends' training and inference throughput
+Run with an optional number of years of hourly prices (default 2) and
+backend names (default: every backend in models.registry)
+
+Every backend is fitted on the same scaled feature matrix, so the numbers
+show what swapping a slot's backend in MODEL_CONFIG would cost or save.
+"""
+import sys
+
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+
+from benchmark_features import synthetic_prices
+from models.features import build_feature_matrix
+from models.registry import throughput_report
+
+
+def main(years: int = 2, backends=None):
+    prices = synthetic_prices(years * 365 * 24)
+    timestamps = pd.date_range('2020-01-01', periods=len(prices), freq='h')
+    matrix = build_feature_matrix(timestamps, prices)
+    X = StandardScaler(copy=False).fit_transform(matrix.X)
+
+    print(f"🦞 Model backend benchmark - {X.shape[0]:,} rows x {X.shape[1]} features")
+    print("=" * 78)
+    print(f"  {'backend':<18}{'fit s':>8}{'fit rows/s':>13}{'predict rows/s':>16}{'1-row ms':>10}{'MAE':>10}")
+
+    for row in throughput_report(X, matrix.y, backends):
+        print(
+            f"  {row['backend']:<18}{row['fit_seconds']:>8.2f}{row['fit_rows_per_s']:>13,.0f}"
+            f"{row['predict_rows_per_s']:>16,.0f}{row['single_row_ms']:>10.2f}{row['mae']:>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2, sys.argv[2:] or None)
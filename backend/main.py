@@ -1,17 +1,35 @@
 """
 Lobster Energy - Backend API
 """
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 
 from routers import market, predictions, signals
-from services.scheduler import start_scheduler
+from services.scheduler import start_scheduler, stop_scheduler
+from services.http_client import open_http_client, close_http_client, get_http_client
+from services.feature_cache import get_feature_cache
+from services.training_jobs import get_training_queue
+from services.predictor_registry import get_predictor_registry
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Shared upstream connection pool, reused by every fetcher
+    await open_http_client()
+    start_scheduler()
+    yield
+    stop_scheduler()
+    get_training_queue().shutdown()
+    await close_http_client()
+
 
 app = FastAPI(
     title="Lobster Energy API",
     description="AI-powered energy procurement advisory",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -27,11 +45,6 @@ app.include_router(predictions.router, prefix="/api/predictions", tags=["Predict
 app.include_router(signals.router, prefix="/api/signals", tags=["Trading Signals"])
 
 
-@app.on_event("startup")
-async def startup():
-    start_scheduler()
-
-
 @app.get("/")
 def root():
     return {"name": "Lobster Energy 🦞⚡", "status": "running"}
@@ -42,5 +55,24 @@ def health():
     return {"status": "ok"}
 
 
+@app.get("/health/http")
+def http_pool_health():
+    """Upstream connection pool usage and reuse counters"""
+    client = get_http_client()
+    return client.stats() if client else {"status": "not started"}
+
+
+@app.get("/health/feature-cache")
+def feature_cache_health():
+    """Feature-matrix cache hit/miss/eviction counters and memory use"""
+    return get_feature_cache().stats()
+
+
+@app.get("/health/models")
+def models_health():
+    """Model version served per market, when it was loaded and its data range"""
+    return get_predictor_registry().status()
+
+
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,140 @@
+"""
+Versioned model artifacts
+Each training run is published as an immutable version directory with a
+manifest, and activated by atomically replacing a one-line pointer file,
+so readers only ever see a complete set of models
+
+    saved_models/
+        CURRENT                      -> "20261017T040044Z-3fa2"
+        versions/20261017T040044Z-3fa2/
+            manifest.json            data range, feature hash, metrics, members
+            xgb_short.ubj            XGBoost native (UBJSON)
+            gb_long.joblib           other estimators, compressed joblib
+            scalers.joblib
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+import json
+import os
+import shutil
+import uuid
+
+import joblib
+from xgboost import XGBModel
+
+from models.registry import BACKENDS
+
+MODEL_KEEP_VERSIONS = int(os.getenv("MODEL_KEEP_VERSIONS", "5"))
+
+MANIFEST = "manifest.json"
+POINTER = "CURRENT"
+
+
+def feature_hash(columns: List[str], version: int) -> str:
+    """Identifies the feature layout a model was trained on"""
+    return hashlib.sha256(json.dumps([version, list(columns)]).encode()).hexdigest()[:16]
+
+
+class ArtifactStore:
+    """Model versions under one directory, one of them active"""
+
+    def __init__(self, root: str, keep: int = MODEL_KEEP_VERSIONS):
+        self.root = root
+        self.versions_dir = os.path.join(root, "versions")
+        self.keep = max(keep, 1)
+
+    def versions(self) -> List[str]:
+        """Published versions, oldest first"""
+        if not os.path.isdir(self.versions_dir):
+            return []
+        return sorted(
+            name for name in os.listdir(self.versions_dir)
+            if not name.startswith(".") and os.path.exists(os.path.join(self.versions_dir, name, MANIFEST))
+        )
+
+    def active_version(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self.root, POINTER)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def activate(self, version: str):
+        """Point readers at a published version (also used to roll back)"""
+        if version not in self.versions():
+            raise ValueError(f"Unknown model version {version}")
+        tmp = os.path.join(self.root, f".{POINTER}.{uuid.uuid4().hex}")
+        with open(tmp, "w") as f:
+            f.write(version)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, os.path.join(self.root, POINTER))
+
+    def manifest(self, version: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        version = version or self.active_version()
+        if version is None:
+            return None
+        with open(os.path.join(self.versions_dir, version, MANIFEST)) as f:
+            return json.load(f)
+
+    def publish(self, members: Dict[str, Tuple[Any, str, Dict]], scalers: Dict, manifest: Dict[str, Any]) -> str:
+        """
+        Write a new version and activate it
+
+        members maps slot -> (fitted estimator, backend name, params). The
+        version is written under a hidden name and renamed into place, so
+        a crash mid-write leaves nothing a reader could pick up.
+        """
+        version = f"{datetime.utcnow():%Y%m%dT%H%M%S%fZ}-{uuid.uuid4().hex[:4]}"
+        staging = os.path.join(self.versions_dir, f".{version}")
+        os.makedirs(staging)
+
+        entries = {}
+        for slot, (model, backend, params) in members.items():
+            if isinstance(model, XGBModel):
+                filename, fmt = f"{slot}.ubj", "xgboost-ubj"
+                model.save_model(os.path.join(staging, filename))
+            else:
+                filename, fmt = f"{slot}.joblib", "joblib"
+                joblib.dump(model, os.path.join(staging, filename), compress=3)
+            entries[slot] = {"file": filename, "format": fmt, "backend": backend, "params": params}
+
+        joblib.dump(scalers, os.path.join(staging, "scalers.joblib"), compress=3)
+
+        manifest = {**manifest, "version": version, "created_at": datetime.utcnow().isoformat(), "members": entries}
+        with open(os.path.join(staging, MANIFEST), "w") as f:
+            json.dump(manifest, f, indent=2, default=str)
+
+        os.rename(staging, os.path.join(self.versions_dir, version))
+        self.activate(version)
+        self.prune()
+        return version
+
+    def load(self, version: Optional[str] = None) -> Tuple[Dict[str, Any], Dict, Dict[str, Any]]:
+        """(models by slot, scalers, manifest) of a version, the active one by default"""
+        manifest = self.manifest(version)
+        if manifest is None:
+            raise FileNotFoundError(f"No active model version in {self.root}")
+        path = os.path.join(self.versions_dir, manifest["version"])
+
+        models = {}
+        for slot, entry in manifest["members"].items():
+            filename = os.path.join(path, entry["file"])
+            if entry["format"] == "xgboost-ubj":
+                # Hyperparameters come from the manifest; the file holds the booster
+                model = BACKENDS[entry["backend"]].estimator(**entry["params"])
+                model.load_model(filename)
+            else:
+                model = joblib.load(filename)
+            models[slot] = model
+
+        scalers = joblib.load(os.path.join(path, "scalers.joblib"))
+        return models, scalers, manifest
+
+    def prune(self):
+        """Delete all but the newest `keep` versions (never the active one)"""
+        active = self.active_version()
+        for version in self.versions()[:-self.keep]:
+            if version != active:
+                shutil.rmtree(os.path.join(self.versions_dir, version), ignore_errors=True)
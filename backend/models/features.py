@@ -0,0 +1,561 @@
+"""
+Feature definitions, the rolling statistics kernel and the incremental
+feature engine
+The batch path (build_feature_matrix) writes every feature for a whole
+series into one float32 buffer using rolling_features(); the engine keeps
+rolling state per market so the latest feature vector costs O(1) per new
+observation
+"""
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Bump whenever a feature definition changes, so cached matrices are not reused
+FEATURE_VERSION = 1
+
+# Row offsets assume hourly rows, as the models always have
+LAG_DAYS = [1, 2, 3, 7, 14, 30, 90]
+ROLLING_WINDOWS = [24, 168, 720]  # 1 day, 1 week, 1 month in hours
+PCT_CHANGES = {"price_change_1d": 24, "price_change_7d": 168, "price_change_30d": 720}
+MOMENTUM = {"momentum_7d": 168, "momentum_30d": 720}
+VOLATILITY = {"volatility_7d": 168, "volatility_30d": 720}
+ROC = {"roc_7d": 168}
+RSI_WINDOW = 168
+
+# Longest look-back of any feature, in rows
+MAX_LOOKBACK = max(LAG_DAYS) * 24
+
+
+@dataclass
+class FeatureMatrix:
+    """Feature rows with every feature present (see build_feature_matrix)"""
+    timestamps: np.ndarray  # datetime64[ns]
+    X: np.ndarray  # float32, one column per feature
+    y: np.ndarray  # float64 target
+    columns: List[str]
+
+    @property
+    def nbytes(self) -> int:
+        return self.timestamps.nbytes + self.X.nbytes + self.y.nbytes
+
+    def __len__(self) -> int:
+        return len(self.X)
+
+
+def _rolling_extreme(x: np.ndarray, window: int, op: np.ufunc, fill: float) -> np.ndarray:
+    """
+    Rolling min/max in O(n) without a Python loop (van Herk/Gil-Werman)
+
+    The series is cut into blocks of `window` rows; every window is covered
+    by a suffix of one block and a prefix of the next.
+    """
+    n = len(x)
+    padded = np.concatenate([x, np.full(-n % window, fill)]).reshape(-1, window)
+    prefix = op.accumulate(padded, axis=1).ravel()
+    suffix = op.accumulate(padded[:, ::-1], axis=1)[:, ::-1].ravel()
+    return op(suffix[:n - window + 1], prefix[window - 1:n])
+
+
+def _flat_run_lengths(x: np.ndarray) -> np.ndarray:
+    """Length of the run of identical values ending at each row"""
+    idx = np.arange(len(x))
+    starts = np.where(np.r_[True, x[1:] != x[:-1]], idx, 0)
+    return idx - np.maximum.accumulate(starts) + 1
+
+
+def rolling_features(prices: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Every rolling statistic prepare_features uses, for every window
+
+    Prefix sums of the centred prices, their squares and the RSI gains and
+    losses give every window's sums by differencing, so mean, std,
+    volatility and RSI for all windows come from one pass over the series
+    (plus an O(n) block scan per window for min/max). Moments are centred
+    on the series mean and accumulated in extended precision (np.longdouble)
+    to limit cancellation. Windows of identical values get a
+    std of exactly 0, as pandas does. Rows before a window fills are NaN,
+    and so is any window holding a missing price (pandas' default
+    min_periods); missing prices are summed as the centre so they can't
+    poison later windows.
+    """
+    x = np.ascontiguousarray(prices, dtype=np.float64)
+    n = len(x)
+    out: Dict[str, np.ndarray] = {}
+
+    delta = np.diff(x, prepend=np.nan)
+    missing = np.isnan(x)
+    shift = float(x[~missing].mean()) if n and not missing.all() else 0.0
+
+    def prefix_sums(values: np.ndarray) -> np.ndarray:
+        sums = np.zeros(n + 1, dtype=values.dtype)
+        np.cumsum(values, out=sums[1:])
+        return sums
+
+    # Window sums by differencing prefix sums; the centred moments are
+    # accumulated in extended precision so differencing loses nothing
+    centred = np.where(missing, 0.0, x - shift).astype(np.longdouble)
+    gaps = prefix_sums(missing.astype(np.int64)) if missing.any() else None
+    first = prefix_sums(centred)
+    second = prefix_sums(centred * centred)
+    gains = prefix_sums(np.where(delta > 0, delta, 0.0))
+    losses = prefix_sums(np.where(delta < 0, -delta, 0.0))
+
+    runs = _flat_run_lengths(x)
+
+    def full(values: np.ndarray, window: int) -> np.ndarray:
+        column = np.full(n, np.nan)
+        if n >= window:
+            column[window - 1:] = values
+        return column
+
+    stds, means = {}, {}
+    for window in sorted(set(ROLLING_WINDOWS) | set(VOLATILITY.values())):
+        if n < window:
+            mean = std = lo = hi = np.full(n, np.nan)
+        else:
+            s1 = (first[window:] - first[:-window]).astype(np.float64)
+            s2 = (second[window:] - second[:-window]).astype(np.float64)
+            var = (s2 - s1 * s1 / window) / (window - 1)
+            var = np.where(runs[window - 1:] >= window, 0.0, np.maximum(var, 0.0))
+            mean = full(shift + s1 / window, window)
+            std = full(np.sqrt(var), window)
+            lo = full(_rolling_extreme(x, window, np.minimum, np.inf), window)
+            hi = full(_rolling_extreme(x, window, np.maximum, -np.inf), window)
+            if gaps is not None:
+                incomplete = np.zeros(n, dtype=bool)
+                incomplete[window - 1:] = gaps[window:] - gaps[:-window] > 0
+                for column in (mean, std, lo, hi):
+                    column[incomplete] = np.nan
+
+        means[window], stds[window] = mean, std
+        if window in ROLLING_WINDOWS:
+            out[f"rolling_mean_{window}h"] = mean
+            out[f"rolling_std_{window}h"] = std
+            out[f"rolling_min_{window}h"] = lo
+            out[f"rolling_max_{window}h"] = hi
+
+    for name, window in VOLATILITY.items():
+        out[name] = stds[window] / means[window]
+
+    if n >= RSI_WINDOW:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rs = (gains[RSI_WINDOW:] - gains[:-RSI_WINDOW]) / (losses[RSI_WINDOW:] - losses[:-RSI_WINDOW])
+            out["rsi_7d"] = full(100 - (100 / (1 + rs)), RSI_WINDOW)
+    else:
+        out["rsi_7d"] = np.full(n, np.nan)
+
+    return out
+
+
+def time_features(timestamp: pd.Timestamp) -> Dict[str, float]:
+    """Calendar features for one timestamp, as prepare_features computes them"""
+    hour = timestamp.hour
+    day_of_week = timestamp.dayofweek
+    month = timestamp.month
+
+    return {
+        "hour": hour,
+        "day_of_week": day_of_week,
+        "day_of_month": timestamp.day,
+        "month": month,
+        "quarter": timestamp.quarter,
+        "week_of_year": int(timestamp.isocalendar()[1]),
+        "is_weekend": int(day_of_week in (5, 6)),
+        "hour_sin": np.sin(2 * np.pi * hour / 24),
+        "hour_cos": np.cos(2 * np.pi * hour / 24),
+        "day_sin": np.sin(2 * np.pi * day_of_week / 7),
+        "day_cos": np.cos(2 * np.pi * day_of_week / 7),
+        "month_sin": np.sin(2 * np.pi * month / 12),
+        "month_cos": np.cos(2 * np.pi * month / 12),
+    }
+
+
+# Model feature columns, in the order prepare_features has always produced
+TIME_FEATURES = [
+    "hour", "day_of_week", "day_of_month", "month", "quarter", "week_of_year", "is_weekend",
+    "hour_sin", "hour_cos", "day_sin", "day_cos", "month_sin", "month_cos",
+]
+FEATURE_COLUMNS = (
+    TIME_FEATURES
+    + [f"price_lag_{lag}d" for lag in LAG_DAYS]
+    + [f"rolling_{stat}_{w}h" for w in ROLLING_WINDOWS for stat in ("mean", "std", "min", "max")]
+    + list(PCT_CHANGES) + list(MOMENTUM) + list(VOLATILITY) + list(ROC) + ["rsi_7d"]
+)
+FEATURE_INDEX = {name: i for i, name in enumerate(FEATURE_COLUMNS)}
+
+# The models are direct multi-horizon: each row also says how many days
+# ahead of its features the target lies (see build_direct_matrix)
+HORIZON_COLUMN = "horizon_days"
+MODEL_COLUMNS = FEATURE_COLUMNS + [HORIZON_COLUMN]
+
+
+def fill_time_features(out: np.ndarray, timestamps: pd.DatetimeIndex):
+    """Write the calendar (TIME_FEATURES) columns of one row per timestamp into out"""
+    def put(name: str, values):
+        out[:, FEATURE_INDEX[name]] = values
+
+    hour = timestamps.hour.to_numpy()
+    day_of_week = timestamps.dayofweek.to_numpy()
+    month = timestamps.month.to_numpy()
+    put("hour", hour)
+    put("day_of_week", day_of_week)
+    put("day_of_month", timestamps.day.to_numpy())
+    put("month", month)
+    put("quarter", timestamps.quarter.to_numpy())
+    put("week_of_year", timestamps.isocalendar().week.to_numpy(dtype=np.int64))
+    put("is_weekend", day_of_week >= 5)
+    put("hour_sin", np.sin(2 * np.pi * hour / 24))
+    put("hour_cos", np.cos(2 * np.pi * hour / 24))
+    put("day_sin", np.sin(2 * np.pi * day_of_week / 7))
+    put("day_cos", np.cos(2 * np.pi * day_of_week / 7))
+    put("month_sin", np.sin(2 * np.pi * month / 12))
+    put("month_cos", np.cos(2 * np.pi * month / 12))
+
+
+def fill_features(out: np.ndarray, timestamps: pd.DatetimeIndex, prices: np.ndarray, start: int = 0):
+    """
+    Write the features of rows start..n-1 into out (n - start rows, one
+    column per FEATURE_COLUMNS entry)
+
+    Columns are written straight into the buffer (cast to its dtype), so
+    no frame of intermediate columns is ever built. Rows before `start`
+    still feed lags and rolling windows.
+    """
+    x = np.ascontiguousarray(prices, dtype=np.float64)
+    n = len(x)
+
+    def put(name: str, values):
+        out[:, FEATURE_INDEX[name]] = values
+
+    # NaN-padded prices, so shifted(rows) is the price `rows` observations back
+    padded = np.concatenate([np.full(MAX_LOOKBACK, np.nan), x])
+
+    def shifted(rows: int) -> np.ndarray:
+        return padded[MAX_LOOKBACK + start - rows:MAX_LOOKBACK + n - rows]
+
+    fill_time_features(out, timestamps[start:])
+
+    for lag in LAG_DAYS:
+        put(f"price_lag_{lag}d", shifted(lag * 24))
+
+    for name, values in rolling_features(x).items():
+        put(name, values[start:])
+
+    price = x[start:]
+    for name, rows in PCT_CHANGES.items():
+        put(name, price / shifted(rows) - 1)
+    for name, rows in MOMENTUM.items():
+        put(name, price - shifted(rows))
+    for name, rows in ROC.items():
+        put(name, (price - shifted(rows)) / shifted(rows))
+
+
+def build_feature_matrix(
+    timestamps,
+    prices: np.ndarray,
+    target: Optional[np.ndarray] = None
+) -> FeatureMatrix:
+    """
+    Feature rows with every feature present, built in one float32 buffer
+
+    Rows inside the longest look-back can never be complete, so the buffer
+    is allocated for the rest only. Any later row with a missing feature
+    (e.g. an undefined RSI over a flat week) is dropped, as dropna() did.
+    Input must be sorted by timestamp.
+    """
+    timestamps = pd.DatetimeIndex(timestamps).as_unit("ns")
+    prices = np.asarray(prices, dtype=np.float64)
+    target = prices if target is None else np.asarray(target, dtype=np.float64)
+
+    start = min(MAX_LOOKBACK, len(prices))
+    X = np.empty((len(prices) - start, len(FEATURE_COLUMNS)), dtype=np.float32)
+    fill_features(X, timestamps, prices, start)
+
+    ts = timestamps[start:].to_numpy()
+    y = target[start:]
+
+    incomplete = np.isnan(X).any(axis=1)
+    if incomplete.any():
+        complete = ~incomplete
+        X, ts, y = X[complete], ts[complete], y[complete]
+
+    return FeatureMatrix(timestamps=ts, X=X, y=y, columns=list(FEATURE_COLUMNS))
+
+
+def build_direct_matrix(
+    matrix: FeatureMatrix,
+    max_horizon_days: int,
+    samples: int,
+    after: Optional[np.datetime64] = None,
+    seed: int = 0
+) -> FeatureMatrix:
+    """
+    Training rows for the direct multi-horizon models (MODEL_COLUMNS)
+
+    Every target row of `matrix` is paired with up to `samples` origin rows
+    a whole number of days earlier, the horizons drawn uniformly from 1 to
+    max_horizon_days (capped by the history before the target). A row holds
+    the origin's features, the target's calendar columns and the horizon,
+    and predicts the target's price, which is exactly what
+    build_horizon_matrix asks of the models at forecast time. Only targets
+    after `after` are used, if given. Draws come from a seeded generator,
+    so the same matrix always gives the same rows; origins missing from
+    the matrix (gaps, incomplete features) are skipped.
+    """
+    day = np.timedelta64(1, "D")
+    ts = matrix.timestamps
+    if not len(ts):
+        return FeatureMatrix(ts, np.empty((0, len(MODEL_COLUMNS)), dtype=np.float32), matrix.y, list(MODEL_COLUMNS))
+    targets = np.arange(len(ts)) if after is None else np.flatnonzero(ts > after)
+
+    reach = np.minimum((ts[targets] - ts[0]) // day, max_horizon_days).astype(np.int64)
+    targets, reach = targets[reach >= 1], reach[reach >= 1]
+
+    rng = np.random.default_rng(seed)
+    target_idx = np.repeat(targets, samples)
+    horizons = 1 + (rng.random(len(target_idx)) * np.repeat(reach, samples)).astype(np.int64)
+
+    # Short reaches draw the same horizon twice; keep one of each
+    pairs = np.unique(target_idx * (max_horizon_days + 1) + horizons)
+    target_idx, horizons = pairs // (max_horizon_days + 1), pairs % (max_horizon_days + 1)
+
+    origin_ts = ts[target_idx] - horizons * day
+    origin_idx = np.minimum(np.searchsorted(ts, origin_ts), len(ts) - 1)
+    found = ts[origin_idx] == origin_ts
+    target_idx, horizons, origin_idx = target_idx[found], horizons[found], origin_idx[found]
+
+    X = np.empty((len(target_idx), len(MODEL_COLUMNS)), dtype=np.float32)
+    X[:, :len(FEATURE_COLUMNS)] = matrix.X[origin_idx]
+    fill_time_features(X, pd.DatetimeIndex(ts[target_idx]))
+    X[:, -1] = horizons
+    return FeatureMatrix(timestamps=ts[target_idx], X=X, y=matrix.y[target_idx], columns=list(MODEL_COLUMNS))
+
+
+def build_horizon_matrix(
+    origin: pd.Timestamp,
+    features: np.ndarray,
+    horizon_days: int
+) -> Tuple[pd.DatetimeIndex, np.ndarray]:
+    """
+    One MODEL_COLUMNS row per forecast day 1..horizon_days, for direct
+    multi-horizon scoring
+
+    Every row holds the feature vector observed at `origin`, the calendar
+    columns of its target date and its horizon in days, the layout the
+    models were trained on (see build_direct_matrix).
+    """
+    target_dates = pd.DatetimeIndex(origin + pd.to_timedelta(np.arange(1, horizon_days + 1), unit="D"))
+    X = np.empty((horizon_days, len(MODEL_COLUMNS)), dtype=np.float32)
+    X[:, :len(FEATURE_COLUMNS)] = np.asarray(features, dtype=np.float32).reshape(1, -1)
+    fill_time_features(X, target_dates)
+    X[:, -1] = np.arange(1, horizon_days + 1)
+    return target_dates, X
+
+
+class RollingWindow:
+    """
+    Fixed-size window over a stream with O(1) push
+
+    Mean and std come from running sums and sums of squares of values
+    shifted by a reference close to the window mean, which keeps
+    cancellation small. Once per window length the reference is moved to
+    the current mean and the sums are recomputed from the ring buffer, so
+    rounding never accumulates. A window of identical values has a std of
+    exactly 0. Min and max use monotonic deques. Statistics are NaN until
+    the window is full, like pandas rolling().
+    """
+
+    def __init__(self, size: int, extremes: bool = True):
+        self.size = size
+        self.extremes = extremes
+        self.values = [0.0] * size
+        self.count = 0
+        self.shift: Optional[float] = None
+        self.sum = 0.0
+        self.sumsq = 0.0
+        self.run = 0  # identical values ending at the latest push
+        self._mins: deque = deque()
+        self._maxs: deque = deque()
+
+    def push(self, x: float):
+        i = self.count
+        slot = i % self.size
+        if self.shift is None:
+            self.shift = x
+
+        if i >= self.size:
+            old = self.values[slot] - self.shift
+            self.sum -= old
+            self.sumsq -= old * old
+
+        previous = self.values[(i - 1) % self.size] if i else None
+        self.run = self.run + 1 if x == previous else 1
+
+        d = x - self.shift
+        self.values[slot] = x
+        self.sum += d
+        self.sumsq += d * d
+        self.count += 1
+
+        if self.count % self.size == 0:
+            # Re-centre on the current window and recompute the sums exactly
+            values = np.asarray(self.values)
+            self.shift = float(values.mean())
+            shifted = values - self.shift
+            self.sum = float(shifted.sum())
+            self.sumsq = float((shifted * shifted).sum())
+
+        if self.extremes:
+            expired = i - self.size
+            while self._mins and self._mins[-1][1] >= x:
+                self._mins.pop()
+            self._mins.append((i, x))
+            if self._mins[0][0] <= expired:
+                self._mins.popleft()
+
+            while self._maxs and self._maxs[-1][1] <= x:
+                self._maxs.pop()
+            self._maxs.append((i, x))
+            if self._maxs[0][0] <= expired:
+                self._maxs.popleft()
+
+    @property
+    def full(self) -> bool:
+        return self.count >= self.size
+
+    def mean(self) -> float:
+        if not self.full:
+            return np.nan
+        return self.shift + self.sum / self.size
+
+    def std(self) -> float:
+        if not self.full:
+            return np.nan
+        if self.run >= self.size:
+            return 0.0
+        var = (self.sumsq - self.sum * self.sum / self.size) / (self.size - 1)
+        return np.sqrt(max(var, 0.0))
+
+    def min(self) -> float:
+        return self._mins[0][1] if self.full else np.nan
+
+    def max(self) -> float:
+        return self._maxs[0][1] if self.full else np.nan
+
+
+class IncrementalFeatureEngine:
+    """
+    Rolling feature state for one market's price series
+
+    sync() feeds only rows newer than the last one seen; if the rows it
+    has already seen changed (backfill, overwrites, another market's
+    data) the state is rebuilt from the trailing MAX_LOOKBACK rows, which
+    is all any feature depends on. features() then returns the latest
+    vector without touching history.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.windows = {w: RollingWindow(w) for w in ROLLING_WINDOWS}
+        self.gain = RollingWindow(RSI_WINDOW, extremes=False)
+        self.loss = RollingWindow(RSI_WINDOW, extremes=False)
+
+        # Last MAX_LOOKBACK + 1 observations, for lags and change detection
+        self.history_size = MAX_LOOKBACK + 1
+        self.history_ts = np.zeros(self.history_size, dtype="datetime64[ns]")
+        self.history_price = np.zeros(self.history_size, dtype=np.float64)
+        self.count = 0
+
+    @property
+    def last_timestamp(self) -> Optional[np.datetime64]:
+        if self.count == 0:
+            return None
+        return self.history_ts[(self.count - 1) % self.history_size]
+
+    def _ago(self, rows: int) -> float:
+        """Price `rows` observations before the latest (NaN if not seen)"""
+        if rows >= self.count:
+            return np.nan
+        return self.history_price[(self.count - 1 - rows) % self.history_size]
+
+    def _recent(self, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        """The last n observations in order"""
+        idx = np.arange(self.count - n, self.count) % self.history_size
+        return self.history_ts[idx], self.history_price[idx]
+
+    def update(self, timestamp: np.datetime64, price: float):
+        """Append one observation"""
+        previous = self._ago(0)
+        delta = price - previous
+        # pandas: delta.where(delta > 0, 0) and -delta.where(delta < 0, 0)
+        self.gain.push(delta if delta > 0 else 0.0)
+        self.loss.push(-(delta if delta < 0 else 0.0))
+
+        for window in self.windows.values():
+            window.push(price)
+
+        slot = self.count % self.history_size
+        self.history_ts[slot] = timestamp
+        self.history_price[slot] = price
+        self.count += 1
+
+    def sync(self, timestamps: np.ndarray, prices: np.ndarray) -> int:
+        """Bring the state up to date with an ascending series; returns rows fed"""
+        timestamps = np.asarray(timestamps, dtype="datetime64[ns]")
+        prices = np.asarray(prices, dtype=np.float64)
+
+        start = 0
+        if self.count:
+            start = int(np.searchsorted(timestamps, self.last_timestamp, side="right"))
+            overlap = min(start, self.count, self.history_size)
+            seen_ts, seen_prices = self._recent(overlap)
+            consistent = (
+                overlap > 0
+                and np.array_equal(timestamps[start - overlap:start], seen_ts)
+                and np.array_equal(prices[start - overlap:start], seen_prices)
+            )
+            if not consistent:
+                self.reset()
+                start = 0
+
+        if self.count == 0:
+            # Nothing older than the longest look-back affects any feature
+            start = max(0, len(timestamps) - self.history_size - 1)
+
+        for ts, price in zip(timestamps[start:], prices[start:]):
+            self.update(ts, price)
+        return len(timestamps) - start
+
+    def features(self) -> Dict[str, float]:
+        """Feature values for the latest observation (NaN where history is short)"""
+        price = self._ago(0)
+        features = time_features(pd.Timestamp(self.last_timestamp))
+
+        for lag in LAG_DAYS:
+            features[f"price_lag_{lag}d"] = self._ago(lag * 24)
+
+        for size, window in self.windows.items():
+            features[f"rolling_mean_{size}h"] = window.mean()
+            features[f"rolling_std_{size}h"] = window.std()
+            features[f"rolling_min_{size}h"] = window.min()
+            features[f"rolling_max_{size}h"] = window.max()
+
+        for name, rows in PCT_CHANGES.items():
+            features[name] = price / self._ago(rows) - 1
+        for name, rows in MOMENTUM.items():
+            features[name] = price - self._ago(rows)
+        for name, rows in VOLATILITY.items():
+            features[name] = self.windows[rows].std() / self.windows[rows].mean()
+        for name, rows in ROC.items():
+            features[name] = (price - self._ago(rows)) / self._ago(rows)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rs = np.float64(self.gain.mean()) / np.float64(self.loss.mean())
+            features["rsi_7d"] = 100 - (100 / (1 + rs))
+
+        return features
@@ -7,13 +7,25 @@ import numpy as np
 from datetime import datetime, timedelta
 from typing import Tuple, Dict, List, Optional
 from dataclasses import dataclass
-import pickle
 import os
+import threading
+import time
+import tracemalloc
+import multiprocessing
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
-from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
 from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import TimeSeriesSplit
-from xgboost import XGBRegressor
+from threadpoolctl import threadpool_limits
+from xgboost import Booster, XGBRegressor
+
+from models.features import (
+    IncrementalFeatureEngine, FeatureMatrix, FEATURE_VERSION, FEATURE_COLUMNS, MODEL_COLUMNS, MAX_LOOKBACK,
+    build_feature_matrix, build_direct_matrix, build_horizon_matrix, fill_features
+)
+from models.registry import BACKENDS, MemberSpec, ensemble_specs, thread_budgets
+from models.artifacts import ArtifactStore, feature_hash
 
 # Prophet for time series
 try:
@@ -22,6 +34,103 @@ try:
 except ImportError:
     PROPHET_AVAILABLE = False
 
+# Processes fitting ensemble members in parallel (0: one per member, up to
+# the CPU count; 1: fit one after another in this process)
+TRAINING_WORKERS = int(os.getenv("TRAINING_WORKERS", "0"))
+
+# Direct multi-horizon training: targets are paired with origins up to
+# MAX_HORIZON_DAYS earlier, HORIZON_SAMPLES horizons per target row
+MAX_HORIZON_DAYS = int(os.getenv("MAX_HORIZON_DAYS", "365"))
+HORIZON_SAMPLES = int(os.getenv("HORIZON_SAMPLES", "2"))
+
+# Warm-start retraining of xgb_short (see EnergyPredictor.retrain)
+INCREMENTAL_TREES = int(os.getenv("INCREMENTAL_TREES", "20"))  # trees added per update
+INCREMENTAL_MIN_ROWS = int(os.getenv("INCREMENTAL_MIN_ROWS", "48"))  # new rows worth an update
+FULL_RETRAIN_HOURS = float(os.getenv("FULL_RETRAIN_HOURS", "168"))  # full refit at least this often
+DRIFT_RETRAIN_FACTOR = float(os.getenv("DRIFT_RETRAIN_FACTOR", "1.5"))  # error jump forcing a full refit
+
+# Fit cost records kept in the training state
+TRAINING_HISTORY_SIZE = 100
+
+
+def _fit_member(name: str, model, X, y, threads: int):
+    """Fit one ensemble member within a thread budget; returns (name, model, seconds)"""
+    start = time.perf_counter()
+    with threadpool_limits(limits=threads):
+        model.fit(X, y)
+    return name, model, time.perf_counter() - start
+
+
+def _attach(ref: Tuple[str, Tuple[int, ...], str]):
+    """(block, array view) for a (name, shape, dtype) shared memory reference"""
+    name, shape, dtype = ref
+    block = shared_memory.SharedMemory(name=name)
+    return block, np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+
+def _fit_shared_member(name: str, model, X_ref, y_ref, threads: int):
+    """_fit_member on arrays the parent process placed in shared memory"""
+    X_block, X = _attach(X_ref)
+    y_block, y = _attach(y_ref)
+    try:
+        return _fit_member(name, model, X, y, threads)
+    finally:
+        del X, y
+        X_block.close()
+        y_block.close()
+
+
+def fit_members(members: Dict[str, Tuple], workers: Optional[int] = None) -> Tuple[Dict, Dict[str, float]]:
+    """
+    Fit (model, X, y, threads) members, in a process pool when workers > 1
+
+    Every member is fully specified (seed and thread count included) before
+    it is handed out, so where it runs cannot change what it learns.
+    Workers are spawned rather than forked: forking a process that has
+    already run OpenMP code can deadlock. Training arrays are copied once
+    into shared memory and mapped by every worker, instead of being
+    pickled to each of them.
+    """
+    if workers is None:
+        workers = TRAINING_WORKERS
+    if workers <= 0:
+        workers = min(len(members), os.cpu_count() or 1)
+    
+    fitted, seconds = {}, {}
+    if workers <= 1 or len(members) <= 1:
+        for name, (model, X, y, threads) in members.items():
+            _, fitted[name], seconds[name] = _fit_member(name, model, X, y, threads)
+        return fitted, seconds
+    
+    blocks, refs = [], {}
+    
+    def share(values) -> Tuple[str, Tuple[int, ...], str]:
+        # Members usually share one X and one y: copy each array once
+        key = id(values)
+        if key not in refs:
+            array = np.asarray(values)
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            blocks.append(block)
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            refs[key] = (block.name, array.shape, array.dtype.str)
+        return refs[key]
+    
+    context = multiprocessing.get_context("spawn")
+    try:
+        with ProcessPoolExecutor(max_workers=min(workers, len(members)), mp_context=context) as pool:
+            futures = [
+                pool.submit(_fit_shared_member, name, model, share(X), share(y), threads)
+                for name, (model, X, y, threads) in members.items()
+            ]
+            for future in futures:
+                name, model, elapsed = future.result()
+                fitted[name], seconds[name] = model, elapsed
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+    return fitted, seconds
+
 
 @dataclass
 class PredictionResult:
@@ -43,9 +152,11 @@ class EnergyPredictor:
     - XGBoost for short-term (1-7 days)
     - Prophet for medium-term seasonality (1-4 weeks)
     - Gradient Boosting for longer-term trends (1-12 months)
+    
+    The estimator behind each slot is chosen per market in models.registry.
     """
     
-    def __init__(self, model_dir: str = "./saved_models"):
+    def __init__(self, model_dir: str = "./saved_models", feature_cache=None):
         self.model_dir = model_dir
         os.makedirs(model_dir, exist_ok=True)
         
@@ -56,6 +167,32 @@ class EnergyPredictor:
         }
         self.scalers = {}
         self.is_trained = False
+        
+        # Wall time of each member's last fit, in seconds
+        self.fit_seconds: Dict[str, float] = {}
+        
+        # What the models were last fitted on, and what each fit cost
+        self.training_state = {
+            'trained_until': None,  # newest timestamp in the training data
+            'full_trained_at': None,
+            'forecast_mae': None,  # running xgb_short error on rows not yet trained on
+            'history': [],
+        }
+        
+        # Rolling feature state per market, for inference on the latest row;
+        # requests run on worker threads, so updates hold feature_lock
+        self.feature_engines: Dict[str, IncrementalFeatureEngine] = {}
+        self.feature_lock = threading.Lock()
+        
+        # Optional shared cache of feature matrices (services.feature_cache)
+        self.feature_cache = feature_cache
+        
+        # Published model versions; `version` is the one these models are
+        self.artifacts = ArtifactStore(model_dir)
+        self.version: Optional[str] = None
+        self.model_specs: Dict[str, MemberSpec] = {}
+        self.market: Optional[str] = None
+        self.data_range: Optional[Dict] = None
     
     def prepare_features(self, df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -67,126 +204,311 @@ class EnergyPredictor:
         - Rolling stats: rolling_mean_7d, rolling_std_7d, rolling_min_7d, rolling_max_7d
         - Momentum: price_change_1d, price_change_7d, momentum_7d
         - Seasonality: sin/cos encoding for cyclical features
+        
+        Returns the sorted frame with a column per feature (NaN where history
+        is short). Training and inference use build_feature_matrix instead,
+        which skips the frame entirely.
         """
-        df = df.copy()
         df = df.sort_values('timestamp')
         
-        # Time features
-        df['hour'] = df['timestamp'].dt.hour
-        df['day_of_week'] = df['timestamp'].dt.dayofweek
-        df['day_of_month'] = df['timestamp'].dt.day
-        df['month'] = df['timestamp'].dt.month
-        df['quarter'] = df['timestamp'].dt.quarter
-        df['week_of_year'] = df['timestamp'].dt.isocalendar().week.astype(int)
-        df['is_weekend'] = df['day_of_week'].isin([5, 6]).astype(int)
-        
-        # Cyclical encoding for time features
-        df['hour_sin'] = np.sin(2 * np.pi * df['hour'] / 24)
-        df['hour_cos'] = np.cos(2 * np.pi * df['hour'] / 24)
-        df['day_sin'] = np.sin(2 * np.pi * df['day_of_week'] / 7)
-        df['day_cos'] = np.cos(2 * np.pi * df['day_of_week'] / 7)
-        df['month_sin'] = np.sin(2 * np.pi * df['month'] / 12)
-        df['month_cos'] = np.cos(2 * np.pi * df['month'] / 12)
-        
-        # Lag features
-        for lag in [1, 2, 3, 7, 14, 30, 90]:
-            df[f'price_lag_{lag}d'] = df['price'].shift(lag * 24)  # Assuming hourly data
-        
-        # Rolling statistics
-        for window in [24, 168, 720]:  # 1 day, 1 week, 1 month in hours
-            df[f'rolling_mean_{window}h'] = df['price'].rolling(window=window).mean()
-            df[f'rolling_std_{window}h'] = df['price'].rolling(window=window).std()
-            df[f'rolling_min_{window}h'] = df['price'].rolling(window=window).min()
-            df[f'rolling_max_{window}h'] = df['price'].rolling(window=window).max()
-        
-        # Price changes / momentum
-        df['price_change_1d'] = df['price'].pct_change(24)
-        df['price_change_7d'] = df['price'].pct_change(168)
-        df['price_change_30d'] = df['price'].pct_change(720)
-        
-        # Momentum indicators
-        df['momentum_7d'] = df['price'] - df['price'].shift(168)
-        df['momentum_30d'] = df['price'] - df['price'].shift(720)
-        
-        # Volatility
-        df['volatility_7d'] = df['price'].rolling(168).std() / df['price'].rolling(168).mean()
-        df['volatility_30d'] = df['price'].rolling(720).std() / df['price'].rolling(720).mean()
-        
-        # Rate of change
-        df['roc_7d'] = (df['price'] - df['price'].shift(168)) / df['price'].shift(168)
-        
-        # Relative Strength Index (RSI)
-        delta = df['price'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=168).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=168).mean()
-        rs = gain / loss
-        df['rsi_7d'] = 100 - (100 / (1 + rs))
-        
-        return df
+        features = np.empty((len(df), len(FEATURE_COLUMNS)), dtype=np.float64)
+        fill_features(features, pd.DatetimeIndex(df['timestamp']), df['price'].to_numpy())
+        
+        features = pd.DataFrame(features, columns=FEATURE_COLUMNS, index=df.index)
+        return pd.concat([df, features], axis=1)
     
-    def train(self, df: pd.DataFrame, target_col: str = 'price'):
+    def feature_matrix(
+        self,
+        df: pd.DataFrame,
+        market: Optional[str] = None,
+        target_col: str = 'price',
+        writable: bool = False
+    ) -> FeatureMatrix:
+        """
+        NaN-free float32 feature matrix for a price frame
+        
+        Served from the feature cache when one is attached and the same
+        market's data (same version, span and length) was featurised before.
+        Cached matrices are shared and read-only; pass writable=True for one
+        the caller may modify in place (a copy on a cache hit, otherwise a
+        fresh matrix that is not cached).
+        """
+        if not df['timestamp'].is_monotonic_increasing:
+            df = df.sort_values('timestamp')
+        
+        key = None
+        if self.feature_cache is not None and market is not None and len(df):
+            key = (
+                market, FEATURE_VERSION, target_col,
+                df['timestamp'].iloc[0], df['timestamp'].iloc[-1], len(df)
+            )
+            cached = self.feature_cache.get(key)
+            if cached is not None:
+                if writable:
+                    return FeatureMatrix(cached.timestamps, cached.X.copy(), cached.y, list(cached.columns))
+                return cached
+        
+        matrix = build_feature_matrix(
+            df['timestamp'], df['price'].to_numpy(), df[target_col].to_numpy()
+        )
+        
+        if key is not None and not writable:
+            matrix.X.flags.writeable = False
+            matrix.y.flags.writeable = False
+            self.feature_cache.put(key, matrix)
+        return matrix
+    
+    def train(
+        self,
+        df: pd.DataFrame,
+        target_col: str = 'price',
+        market: Optional[str] = None,
+        reason: str = 'requested'
+    ):
         """Train all models on historical data"""
         
-        print("Preparing features...")
-        df_features = self.prepare_features(df)
-        df_features = df_features.dropna()
+        train_start = time.perf_counter()
+        if market is None and 'market' in df and len(df):
+            market = df['market'].iloc[0]
         
-        feature_cols = [c for c in df_features.columns if c not in 
-                       ['timestamp', 'price', 'market', 'unit', 'source', 'product']]
+        # Peak Python-side memory of building and scaling the feature buffer
+        # (allocations inside the estimators' native code are not traced)
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
         
-        X = df_features[feature_cols]
-        y = df_features[target_col]
+        print("Preparing features...")
+        matrix = self.feature_matrix(df, market, target_col)
+        
+        # One row per (target, horizon) pair: a fresh buffer, so a cached
+        # matrix is never modified by the in-place scaling below
+        direct = build_direct_matrix(matrix, MAX_HORIZON_DAYS, HORIZON_SAMPLES)
+        feature_cols = direct.columns
+        X = direct.X
+        y = direct.y
         
-        # Scale features
-        self.scalers['main'] = StandardScaler()
+        # Scale features in place: the estimators get this float32 buffer as is
+        self.scalers['main'] = StandardScaler(copy=False)
         X_scaled = self.scalers['main'].fit_transform(X)
         
-        # Time series cross-validation
-        tscv = TimeSeriesSplit(n_splits=5)
-        
-        print("Training XGBoost (short-term)...")
-        self.models['xgb_short'] = XGBRegressor(
-            n_estimators=200,
-            max_depth=6,
-            learning_rate=0.1,
-            subsample=0.8,
-            colsample_bytree=0.8,
-            random_state=42
-        )
-        self.models['xgb_short'].fit(X_scaled, y)
-        
-        print("Training Gradient Boosting (long-term)...")
-        self.models['gb_long'] = GradientBoostingRegressor(
-            n_estimators=150,
-            max_depth=5,
-            learning_rate=0.1,
-            random_state=42
-        )
-        self.models['gb_long'].fit(X_scaled, y)
+        _, peak = tracemalloc.get_traced_memory()
+        if not tracing:
+            tracemalloc.stop()
+        print(f"Feature matrix: {X.shape[0]:,} x {X.shape[1]} float32 ({X.nbytes / 1e6:.1f} MB), "
+              f"peak {peak / 1e6:.1f} MB while building")
+        
+        # Members come from the model registry (per-market config). Budgets
+        # leave a core for Prophet and are fixed up front, so sequential and
+        # parallel training build identical models.
+        self.model_specs = ensemble_specs(market)
+        budgets = thread_budgets(self.model_specs, reserved=1 if PROPHET_AVAILABLE else 0)
+        members = {
+            slot: (spec.build(budgets[slot]), X_scaled, y, budgets[slot])
+            for slot, spec in self.model_specs.items()
+        }
         
-        # Prophet for seasonality
-        if PROPHET_AVAILABLE:
-            print("Training Prophet (seasonality)...")
-            prophet_df = df[['timestamp', 'price']].copy()
-            prophet_df.columns = ['ds', 'y']
-            prophet_df = prophet_df.dropna()
+        for slot, spec in self.model_specs.items():
+            print(f"Training {slot} ({spec.backend}, {budgets[slot]} threads)...")
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=1) as background:
+            fitting_members = background.submit(fit_members, members)
             
-            self.models['prophet'] = Prophet(
-                yearly_seasonality=True,
-                weekly_seasonality=True,
-                daily_seasonality=True,
-                changepoint_prior_scale=0.1
-            )
-            self.models['prophet'].fit(prophet_df)
+            # Prophet for seasonality; it already fits in a cmdstan
+            # subprocess, so it runs here alongside the pool
+            if PROPHET_AVAILABLE:
+                print("Training Prophet (seasonality)...")
+                prophet_start = time.perf_counter()
+                prophet_df = df[['timestamp', 'price']].copy()
+                prophet_df.columns = ['ds', 'y']
+                prophet_df = prophet_df.dropna()
+                
+                self.models['prophet'] = Prophet(
+                    yearly_seasonality=True,
+                    weekly_seasonality=True,
+                    daily_seasonality=True,
+                    changepoint_prior_scale=0.1
+                )
+                self.models['prophet'].fit(prophet_df)
+                prophet_seconds = time.perf_counter() - prophet_start
+            
+            fitted, self.fit_seconds = fitting_members.result()
+        
+        self.models.update(fitted)
+        if PROPHET_AVAILABLE:
+            self.fit_seconds['prophet'] = prophet_seconds
+        
+        for name, seconds in self.fit_seconds.items():
+            print(f"  {name}: {seconds:.1f}s")
+        print(f"  ensemble wall time: {time.perf_counter() - start:.1f}s")
         
         self.feature_cols = feature_cols
         self.is_trained = True
         
+        self.market = market
+        if len(matrix):
+            self.training_state['trained_until'] = matrix.timestamps[-1]
+            self.data_range = {
+                'start': str(matrix.timestamps[0]),
+                'end': str(matrix.timestamps[-1]),
+                'rows': len(matrix),
+            }
+        self.training_state['full_trained_at'] = datetime.utcnow()
+        self.training_state['forecast_mae'] = None
+        self._record_fit('full', reason, len(y), time.perf_counter() - train_start)
+        
+        metrics = self.evaluate(X_scaled, y)
+        for name, seconds in self.fit_seconds.items():
+            metrics.setdefault(name, {})['fit_seconds'] = round(seconds, 3)
+        
         # Save models
-        self.save_models()
+        self.save_models(metrics)
         
         print("Training complete!")
-        return self.evaluate(X_scaled, y)
+        return metrics
+    
+    def _record_fit(self, mode: str, reason: str, rows: int, seconds: float):
+        """Append a fit's cost to the training history"""
+        xgb = self.models['xgb_short']
+        record = {
+            'mode': mode,
+            'reason': reason,
+            'at': datetime.utcnow().isoformat(),
+            'rows': int(rows),
+            'seconds': round(seconds, 3),
+            'xgb_trees': xgb.get_booster().num_boosted_rounds() if isinstance(xgb, XGBRegressor) else None,
+        }
+        history = self.training_state['history']
+        history.append(record)
+        del history[:-TRAINING_HISTORY_SIZE]
+        print(f"  {mode} fit ({reason}): {rows:,} rows in {seconds:.2f}s")
+    
+    def _untrained_rows(self, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, int]:
+        """Scaled direct rows whose targets are newer than the last fit, and how many new targets"""
+        if not df['timestamp'].is_monotonic_increasing:
+            df = df.sort_values('timestamp')
+        
+        trained_until = self.training_state['trained_until']
+        timestamps = df['timestamp'].to_numpy(dtype='datetime64[ns]')
+        first_origin = int(np.searchsorted(
+            timestamps, trained_until - np.timedelta64(MAX_HORIZON_DAYS, 'D'), side='right'
+        ))
+        
+        # Origins up to MAX_HORIZON_DAYS before the new rows, plus the
+        # look-back their features need
+        window = df.iloc[max(0, first_origin - MAX_LOOKBACK):]
+        matrix = build_feature_matrix(window['timestamp'], window['price'].to_numpy())
+        direct = build_direct_matrix(matrix, MAX_HORIZON_DAYS, HORIZON_SAMPLES, after=trained_until)
+        
+        new_targets = len(np.unique(direct.timestamps))
+        if not new_targets:
+            return direct.X, direct.y, 0
+        X = self.scalers['main'].transform(direct.X, copy=False)
+        return X, direct.y, new_targets
+    
+    def retrain(self, df: pd.DataFrame, market: Optional[str] = None) -> Dict:
+        """
+        Bring the models up to date with df as cheaply as allowed
+        
+        Continues boosting xgb_short on the rows added since the last fit
+        (INCREMENTAL_TREES more trees, same scaler; the other members are
+        left as they are). Falls back to a full train when there is no
+        model or training state, xgb_short isn't an XGBoost backend, the
+        feature set changed, the last full fit is older than
+        FULL_RETRAIN_HOURS, or xgb_short's error on the new rows exceeds
+        DRIFT_RETRAIN_FACTOR times its running average (drift).
+        
+        Returns the mode used ('full', 'incremental' or 'skipped'), why,
+        and the fit's metrics.
+        """
+        state = self.training_state
+        full_reason = None
+        
+        if not self.is_trained:
+            full_reason = 'untrained'
+        elif state['trained_until'] is None or state['full_trained_at'] is None:
+            full_reason = 'no training state'
+        elif not isinstance(self.models['xgb_short'], XGBRegressor):
+            full_reason = 'no warm start for this backend'
+        elif list(self.feature_cols) != MODEL_COLUMNS:
+            full_reason = 'feature set changed'
+        elif datetime.utcnow() - state['full_trained_at'] > timedelta(hours=FULL_RETRAIN_HOURS):
+            full_reason = 'scheduled'
+        
+        if full_reason is None:
+            start = time.perf_counter()
+            X, y, new_rows = self._untrained_rows(df)
+            if new_rows < INCREMENTAL_MIN_ROWS:
+                return {'mode': 'skipped', 'reason': f'{new_rows} new rows', 'metrics': {}}
+            
+            # Error on data the model hasn't seen, before it learns from it
+            mae = float(np.mean(np.abs(self.models['xgb_short'].predict(X) - y)))
+            baseline = state['forecast_mae']
+            if baseline is not None and mae > DRIFT_RETRAIN_FACTOR * baseline:
+                full_reason = f'drift (MAE {mae:.2f} vs {baseline:.2f})'
+        
+        if full_reason is not None:
+            print(f"Full retrain: {full_reason}")
+            return {'mode': 'full', 'reason': full_reason, 'metrics': self.train(df, market=market, reason=full_reason)}
+        
+        print(f"Warm-starting xgb_short on {new_rows:,} new rows ({len(y):,} horizon pairs)...")
+        current = self.models['xgb_short']
+        spec = self.model_specs['xgb_short']
+        model = MemberSpec(spec.slot, spec.backend, {**spec.params, 'n_estimators': INCREMENTAL_TREES}).build(
+            current.get_params()['n_jobs']
+        )
+        # Continue from a fresh copy of the saved booster: a live booster's
+        # sampling state has moved on, and reusing it breaks reproducibility
+        booster = Booster(model_file=bytearray(current.get_booster().save_raw()))
+        model.fit(X, y, xgb_model=booster)
+        self.models['xgb_short'] = model
+        
+        state['trained_until'] = np.datetime64(df['timestamp'].max(), 'ns')
+        state['forecast_mae'] = mae if baseline is None else 0.8 * baseline + 0.2 * mae
+        self._record_fit('incremental', 'new data', len(y), time.perf_counter() - start)
+        if self.data_range:
+            self.data_range = {**self.data_range, 'end': str(state['trained_until']), 'rows': self.data_range['rows'] + new_rows}
+        
+        metrics = self.evaluate(X, y)
+        self.save_models(metrics)
+        return {'mode': 'incremental', 'reason': 'new data', 'metrics': metrics}
+    
+    def train_from_store(
+        self,
+        store,
+        market: str = 'uk_dayahead',
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ):
+        """Train straight from the columnar history store (services.history_store)"""
+        df = store.read(market, start, end)
+        df['market'] = market
+        return self.train(df)
+    
+    def latest_features(self, df: pd.DataFrame, market: str = 'uk_dayahead') -> pd.DataFrame:
+        """
+        Timestamp and feature columns of the newest row that has every feature
+        
+        Uses the market's incremental engine, so repeated calls only process
+        rows added since the last one. Falls back to the batch path when the
+        newest row lacks history for some feature (dropna would skip it).
+        """
+        if not df['timestamp'].is_monotonic_increasing:
+            df = df.sort_values('timestamp')
+        with self.feature_lock:
+            engine = self.feature_engines.setdefault(market, IncrementalFeatureEngine())
+            engine.sync(df['timestamp'].to_numpy(), df['price'].to_numpy())
+            features = engine.features()
+        
+        if any(pd.isna(features[c]) for c in FEATURE_COLUMNS):
+            matrix = self.feature_matrix(df, market)
+            latest = pd.DataFrame(matrix.X[-1:], columns=matrix.columns)
+            latest.insert(0, 'timestamp', matrix.timestamps[-1:])
+            return latest
+        
+        latest = {'timestamp': pd.Timestamp(engine.last_timestamp)}
+        latest.update((c, features[c]) for c in FEATURE_COLUMNS)
+        return pd.DataFrame([latest])
     
     def evaluate(self, X, y) -> Dict:
         """Evaluate model performance"""
@@ -213,111 +535,150 @@ class EnergyPredictor:
         horizon_days: int = 7,
         market: str = 'uk_dayahead'
     ) -> List[PredictionResult]:
-        """Generate predictions for future prices"""
+        """
+        Forecast daily prices for days 1..horizon_days
+        
+        Direct multi-horizon: the models were trained to predict the price
+        a given number of days after the features (see build_direct_matrix),
+        so the row of every horizon is built at once from the latest
+        features (build_horizon_matrix), scaled together and scored with one
+        predict call per ensemble member.
+        """
         
         if not self.is_trained:
             raise ValueError("Model not trained. Call train() first.")
         
-        df_features = self.prepare_features(df)
-        df_features = df_features.dropna()
-        
         # Get latest data point as base
-        latest = df_features.iloc[-1:].copy()
+        latest = self.latest_features(df, market)
+        target_dates, X = build_horizon_matrix(
+            latest['timestamp'].iloc[0],
+            latest[FEATURE_COLUMNS].to_numpy(dtype=np.float32)[0],
+            horizon_days
+        )
+        days = np.arange(1, horizon_days + 1)
         
-        predictions = []
+        X_scaled = self.scalers['main'].transform(X)
+        xgb_pred = self.models['xgb_short'].predict(X_scaled).astype(np.float64)
+        gb_pred = self.models['gb_long'].predict(X_scaled).astype(np.float64)
         
-        for day in range(1, horizon_days + 1):
-            target_date = latest['timestamp'].iloc[0] + timedelta(days=day)
-            
-            # Update time features for target date
-            pred_features = latest[self.feature_cols].copy()
-            
-            # Scale
-            X_scaled = self.scalers['main'].transform(pred_features)
-            
-            # Get predictions from each model
-            xgb_pred = self.models['xgb_short'].predict(X_scaled)[0]
-            gb_pred = self.models['gb_long'].predict(X_scaled)[0]
-            
-            # Ensemble prediction (weighted average)
-            if day <= 7:
-                # Short-term: favor XGBoost
-                weights = {'xgb': 0.6, 'gb': 0.4}
-            else:
-                # Longer-term: favor Gradient Boosting
-                weights = {'xgb': 0.3, 'gb': 0.7}
-            
-            predicted_price = xgb_pred * weights['xgb'] + gb_pred * weights['gb']
-            
-            # Confidence interval (based on model disagreement + historical volatility)
-            model_std = np.std([xgb_pred, gb_pred])
-            historical_std = df['price'].std()
-            uncertainty = model_std + (historical_std * 0.1 * np.sqrt(day))
-            
-            # Confidence decreases with horizon
-            confidence = max(0.5, 1.0 - (day * 0.05))
-            
-            predictions.append(PredictionResult(
+        # Ensemble prediction: short-term favours XGBoost, longer-term Gradient Boosting
+        xgb_weight = np.where(days <= 7, 0.6, 0.3)
+        predicted_price = xgb_pred * xgb_weight + gb_pred * (1 - xgb_weight)
+        
+        # Confidence interval (model disagreement, i.e. the std of the two
+        # predictions, plus historical volatility growing with the horizon)
+        model_std = np.abs(xgb_pred - gb_pred) / 2
+        historical_std = df['price'].std()
+        uncertainty = model_std + (historical_std * 0.1 * np.sqrt(days))
+        
+        # Confidence decreases with horizon
+        confidence = np.maximum(0.5, 1.0 - (days * 0.05))
+        
+        importance = self.get_feature_importance()
+        
+        return [
+            PredictionResult(
                 target_date=target_date,
-                predicted_price=predicted_price,
-                confidence=confidence,
-                lower_bound=predicted_price - 2 * uncertainty,
-                upper_bound=predicted_price + 2 * uncertainty,
+                predicted_price=price,
+                confidence=conf,
+                lower_bound=price - 2 * spread,
+                upper_bound=price + 2 * spread,
                 model_used='ensemble',
-                features_importance=self.get_feature_importance()
-            ))
-        
-        return predictions
+                features_importance=dict(importance)
+            )
+            for target_date, price, conf, spread in zip(
+                target_dates, predicted_price.tolist(), confidence.tolist(), uncertainty.tolist()
+            )
+        ]
     
     def get_feature_importance(self) -> Dict[str, float]:
-        """Get feature importance from XGBoost model"""
-        if self.models['xgb_short'] is None:
+        """Get feature importance from the short-term model (if its backend has any)"""
+        importances = getattr(self.models['xgb_short'], 'feature_importances_', None)
+        if importances is None:
             return {}
         
-        importance = dict(zip(
-            self.feature_cols,
-            self.models['xgb_short'].feature_importances_
-        ))
+        importance = dict(zip(self.feature_cols, importances.astype(float).tolist()))
         
         # Sort by importance
         return dict(sorted(importance.items(), key=lambda x: x[1], reverse=True)[:10])
     
-    def save_models(self):
-        """Save trained models to disk"""
-        for name, model in self.models.items():
-            if model is not None and name != 'prophet':
-                path = os.path.join(self.model_dir, f"{name}.pkl")
-                with open(path, 'wb') as f:
-                    pickle.dump(model, f)
-        
-        # Save scalers
-        with open(os.path.join(self.model_dir, "scalers.pkl"), 'wb') as f:
-            pickle.dump(self.scalers, f)
-        
-        # Save feature columns
-        with open(os.path.join(self.model_dir, "feature_cols.pkl"), 'wb') as f:
-            pickle.dump(self.feature_cols, f)
+    def save_models(self, metrics: Optional[Dict] = None) -> str:
+        """Publish the trained models as a new artifact version and activate it"""
+        members = {}
+        for slot, spec in self.model_specs.items():
+            model = self.models[slot]
+            params = dict(spec.params)
+            threads_param = BACKENDS[spec.backend].threads_param
+            if threads_param:
+                params[threads_param] = model.get_params()[threads_param]
+            members[slot] = (model, spec.backend, params)
+        
+        manifest = {
+            'market': self.market,
+            'data': self.data_range,
+            'feature_version': FEATURE_VERSION,
+            'feature_hash': feature_hash(self.feature_cols, FEATURE_VERSION),
+            'feature_columns': list(self.feature_cols),
+            'metrics': metrics or {},
+            'training_state': {
+                **self.training_state,
+                'trained_until': _isoformat(self.training_state['trained_until']),
+                'full_trained_at': _isoformat(self.training_state['full_trained_at']),
+            },
+        }
+        
+        self.version = self.artifacts.publish(members, self.scalers, manifest)
+        print(f"Published model version {self.version}")
+        return self.version
     
-    def load_models(self):
-        """Load trained models from disk"""
-        try:
-            for name in ['xgb_short', 'gb_long']:
-                path = os.path.join(self.model_dir, f"{name}.pkl")
-                if os.path.exists(path):
-                    with open(path, 'rb') as f:
-                        self.models[name] = pickle.load(f)
-            
-            with open(os.path.join(self.model_dir, "scalers.pkl"), 'rb') as f:
-                self.scalers = pickle.load(f)
-            
-            with open(os.path.join(self.model_dir, "feature_cols.pkl"), 'rb') as f:
-                self.feature_cols = pickle.load(f)
-            
-            self.is_trained = True
+    def load_models(self, version: Optional[str] = None):
+        """
+        Load a model version (the active one by default)
+        
+        Only the pointer file is read when that version is already loaded,
+        so callers can check for newly published models cheaply. Versions
+        trained on a different feature layout are not loaded.
+        """
+        version = version or self.artifacts.active_version()
+        if version is None:
+            return False
+        if version == self.version and self.is_trained:
             return True
+        
+        try:
+            models, scalers, manifest = self.artifacts.load(version)
         except Exception as e:
             print(f"Error loading models: {e}")
             return False
+        
+        if manifest['feature_hash'] != feature_hash(MODEL_COLUMNS, FEATURE_VERSION):
+            print(f"Model version {version} was trained on other features; not loading it")
+            return False
+        
+        state = manifest['training_state']
+        self.training_state = {
+            **state,
+            'trained_until': np.datetime64(state['trained_until'], 'ns') if state['trained_until'] else None,
+            'full_trained_at': datetime.fromisoformat(state['full_trained_at']) if state['full_trained_at'] else None,
+        }
+        self.model_specs = {
+            slot: MemberSpec(slot, entry['backend'], entry['params'])
+            for slot, entry in manifest['members'].items()
+        }
+        self.models = {**dict.fromkeys(['xgb_short', 'prophet', 'gb_long']), **models}
+        self.scalers = scalers
+        self.feature_cols = manifest['feature_columns']
+        self.market = manifest['market']
+        self.data_range = manifest['data']
+        self.version = version
+        self.is_trained = True
+        return True
+
+
+def _isoformat(value) -> Optional[str]:
+    if value is None:
+        return None
+    return pd.Timestamp(value).isoformat()
 
 
 class SignalGenerator:
@@ -0,0 +1,188 @@
+"""
+Model registry
+Ensemble slots (xgb_short, gb_long) are filled from named backends, chosen
+and tuned per market by config rather than in code
+
+MODEL_CONFIG points at a JSON file shaped like
+
+    {
+        "default": {"gb_long": {"backend": "sklearn_hist_gbr"}},
+        "uk_peak": {"xgb_short": {"params": {"n_estimators": 400}, "threads": 2}}
+    }
+
+A market's entry is applied over "default", which is applied over
+DEFAULT_ENSEMBLE. Naming a different backend for a slot starts from that
+backend's default parameters; otherwise params are merged key by key.
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+import json
+import os
+import time
+
+import numpy as np
+from sklearn.ensemble import GradientBoostingRegressor, HistGradientBoostingRegressor
+from threadpoolctl import threadpool_limits
+from xgboost import XGBRegressor
+
+MODEL_CONFIG = os.getenv("MODEL_CONFIG", "")
+
+
+@dataclass(frozen=True)
+class Backend:
+    """An estimator class, its default parameters and how it takes a thread count"""
+    estimator: type
+    params: Dict[str, Any]
+    threads_param: Optional[str] = None  # None: OpenMP/BLAS threads, capped by threadpool_limits
+    threads: Optional[int] = None  # fixed budget; None: a share of the free cores
+
+
+_XGB_PARAMS = {
+    "n_estimators": 200,
+    "max_depth": 6,
+    "learning_rate": 0.1,
+    "subsample": 0.8,
+    "colsample_bytree": 0.8,
+    "random_state": 42,
+}
+
+BACKENDS: Dict[str, Backend] = {
+    "xgboost_hist": Backend(XGBRegressor, {**_XGB_PARAMS, "tree_method": "hist"}, threads_param="n_jobs"),
+    "xgboost_exact": Backend(XGBRegressor, {**_XGB_PARAMS, "tree_method": "exact"}, threads_param="n_jobs"),
+    # Exact-split and single-threaded: slow on long histories
+    "sklearn_gbr": Backend(
+        GradientBoostingRegressor,
+        {"n_estimators": 150, "max_depth": 5, "learning_rate": 0.1, "random_state": 42},
+        threads=1
+    ),
+    # Binned splits, OpenMP over features; no early stopping so fits are comparable
+    "sklearn_hist_gbr": Backend(
+        HistGradientBoostingRegressor,
+        {"max_iter": 150, "max_depth": 5, "learning_rate": 0.1, "early_stopping": False, "random_state": 42}
+    ),
+}
+
+DEFAULT_ENSEMBLE = {
+    "xgb_short": {"backend": "xgboost_hist"},
+    "gb_long": {"backend": "sklearn_gbr"},
+}
+
+
+@dataclass
+class MemberSpec:
+    """One ensemble slot's backend, parameters and thread budget"""
+    slot: str
+    backend: str
+    params: Dict[str, Any] = field(default_factory=dict)
+    threads: Optional[int] = None
+
+    def build(self, threads: int):
+        """Unfitted estimator for a thread budget"""
+        backend = BACKENDS[self.backend]
+        params = dict(self.params)
+        if backend.threads_param:
+            params[backend.threads_param] = threads
+        return backend.estimator(**params)
+
+
+def load_model_config(path: str = MODEL_CONFIG) -> Dict[str, Dict]:
+    if not path:
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _apply(specs: Dict[str, MemberSpec], overrides: Dict[str, Dict]):
+    for slot, override in overrides.items():
+        if slot not in specs:
+            raise ValueError(f"Unknown ensemble slot {slot!r} (expected one of {sorted(specs)})")
+        spec = specs[slot]
+        backend = override.get("backend", spec.backend)
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown model backend {backend!r} for {slot} (expected one of {sorted(BACKENDS)})")
+        if backend != spec.backend:
+            spec = MemberSpec(slot, backend, dict(BACKENDS[backend].params), BACKENDS[backend].threads)
+        spec.params.update(override.get("params", {}))
+        if "threads" in override:
+            spec.threads = override["threads"]
+        specs[slot] = spec
+
+
+def ensemble_specs(market: Optional[str] = None, config: Optional[Dict[str, Dict]] = None) -> Dict[str, MemberSpec]:
+    """Resolved member specs for a market (config defaults to MODEL_CONFIG)"""
+    if config is None:
+        config = load_model_config()
+
+    specs = {
+        slot: MemberSpec(slot, entry["backend"], dict(BACKENDS[entry["backend"]].params), BACKENDS[entry["backend"]].threads)
+        for slot, entry in DEFAULT_ENSEMBLE.items()
+    }
+    _apply(specs, config.get("default", {}))
+    if market is not None:
+        _apply(specs, config.get(market, {}))
+    return specs
+
+
+def thread_budgets(specs: Dict[str, MemberSpec], reserved: int = 0, cpus: Optional[int] = None) -> Dict[str, int]:
+    """
+    Threads per member when all fit at once: fixed budgets as given, the
+    cores left over (after `reserved`) shared by the rest
+
+    Depends only on the specs and CPU count, never on how many workers fit
+    them, so sequential and parallel training build the same models.
+    """
+    cpus = cpus or os.cpu_count() or 1
+    fixed = {slot: spec.threads for slot, spec in specs.items() if spec.threads}
+    shared = [slot for slot in specs if slot not in fixed]
+
+    free = cpus - reserved - sum(fixed.values())
+    share = max(1, free // len(shared)) if shared else 0
+    return {**fixed, **{slot: share for slot in shared}}
+
+
+def throughput_report(
+    X: np.ndarray,
+    y: np.ndarray,
+    backends: Optional[List[str]] = None,
+    threads: Optional[int] = None,
+    single_rows: int = 200
+) -> List[Dict[str, Any]]:
+    """
+    Fit and score every backend on the same data
+
+    Reports fit and batch predict throughput (rows/s), single-row predict
+    latency and in-sample MAE, each backend using `threads` threads (all
+    cores by default).
+    """
+    threads = threads or os.cpu_count() or 1
+    rows = []
+
+    for name in backends or list(BACKENDS):
+        spec = MemberSpec(name, name, dict(BACKENDS[name].params))
+        model = spec.build(threads)
+
+        with threadpool_limits(limits=threads):
+            start = time.perf_counter()
+            model.fit(X, y)
+            fit_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            preds = model.predict(X)
+            predict_seconds = time.perf_counter() - start
+
+            sample = X[-single_rows:]
+            start = time.perf_counter()
+            for i in range(len(sample)):
+                model.predict(sample[i:i + 1])
+            row_seconds = (time.perf_counter() - start) / max(len(sample), 1)
+
+        rows.append({
+            "backend": name,
+            "fit_seconds": fit_seconds,
+            "fit_rows_per_s": len(X) / fit_seconds,
+            "predict_rows_per_s": len(X) / predict_seconds,
+            "single_row_ms": row_seconds * 1000,
+            "mae": float(np.mean(np.abs(preds - y))),
+        })
+
+    return rows
@@ -1,49 +1,48 @@
 """
 Market Data API Routes
 """
-from fastapi import APIRouter, Depends, Query, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Query, HTTPException
 from datetime import datetime, timedelta
 from typing import Optional, List
 import pandas as pd
 
-from services.database import get_db, MarketPrice
+from services import repository
+from services.repository import run_db
 from services.data_fetcher import BMRSClient
+from services.ingest import bulk_upsert_prices, IngestResult
+from services.bmrs_parser import PROVIDER_MARKETS, TRACKED_PROVIDERS
 
 router = APIRouter()
 
 
 @router.get("/prices")
 async def get_prices(
-    market: str = Query("uk_dayahead", description="Market: uk_dayahead, uk_peak, gas_nbp"),
+    market: str = Query("uk_dayahead", description="Market: uk_dayahead, uk_dayahead_n2ex, uk_peak, gas_nbp"),
+    provider: Optional[str] = Query(None, description="Market index provider (overrides market): APXMIDP, N2EXMIDP"),
     start_date: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
     end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
-    limit: int = Query(1000, description="Max records to return"),
-    db: Session = Depends(get_db)
+    limit: int = Query(1000, description="Max records to return")
 ):
     """Get historical market prices"""
     
-    query = db.query(MarketPrice).filter(MarketPrice.market == market)
+    if provider:
+        if provider not in PROVIDER_MARKETS:
+            raise HTTPException(status_code=400, detail=f"Invalid provider. Use: {list(PROVIDER_MARKETS)}")
+        market = PROVIDER_MARKETS[provider]
     
-    if start_date:
-        query = query.filter(MarketPrice.timestamp >= datetime.fromisoformat(start_date))
-    if end_date:
-        query = query.filter(MarketPrice.timestamp <= datetime.fromisoformat(end_date))
-    
-    prices = query.order_by(MarketPrice.timestamp.desc()).limit(limit).all()
+    prices = await run_db(
+        repository.fetch_prices,
+        market,
+        start=datetime.fromisoformat(start_date) if start_date else None,
+        end=datetime.fromisoformat(end_date) if end_date else None,
+        limit=limit
+    )
     
     return {
         "market": market,
+        "provider": provider,
         "count": len(prices),
-        "data": [
-            {
-                "timestamp": p.timestamp.isoformat(),
-                "price": p.price,
-                "unit": p.unit,
-                "product": p.product
-            }
-            for p in prices
-        ]
+        "data": prices
     }
 
 
@@ -64,8 +63,7 @@ async def get_current_prices():
 
 @router.get("/summary")
 async def get_market_summary(
-    market: str = Query("uk_dayahead"),
-    db: Session = Depends(get_db)
+    market: str = Query("uk_dayahead")
 ):
     """Get market summary statistics"""
     
@@ -77,29 +75,20 @@ async def get_market_summary(
     month_ago = now - timedelta(days=30)
     year_ago = now - timedelta(days=365)
     
-    def get_stats(start_date):
-        prices = db.query(MarketPrice).filter(
-            MarketPrice.market == market,
-            MarketPrice.timestamp >= start_date
-        ).all()
-        
-        if not prices:
-            return None
-        
-        values = [p.price for p in prices]
-        return {
-            "min": min(values),
-            "max": max(values),
-            "avg": sum(values) / len(values),
-            "count": len(values)
-        }
+    def get_all_stats(db):
+        return [
+            repository.price_stats(db, market, start_date)
+            for start_date in (day_ago, week_ago, month_ago, year_ago)
+        ]
+    
+    last_24h, last_7d, last_30d, last_365d = await run_db(get_all_stats)
     
     return {
         "market": market,
-        "last_24h": get_stats(day_ago),
-        "last_7d": get_stats(week_ago),
-        "last_30d": get_stats(month_ago),
-        "last_365d": get_stats(year_ago),
+        "last_24h": last_24h,
+        "last_7d": last_7d,
+        "last_30d": last_30d,
+        "last_365d": last_365d,
     }
 
 
@@ -116,6 +105,13 @@ async def list_products():
                 "unit": "GBP/MWh",
                 "source": "Nordpool"
             },
+            {
+                "id": "uk_dayahead_n2ex",
+                "name": "UK Day-Ahead Power (N2EX)",
+                "description": "N2EX mid price from the BMRS market index",
+                "unit": "GBP/MWh",
+                "source": "BMRS"
+            },
             {
                 "id": "uk_baseload",
                 "name": "UK Baseload",
@@ -145,7 +141,7 @@ async def list_products():
 async def fetch_historical_data(
     market: str = Query("uk_dayahead"),
     years: int = Query(5, description="Years of historical data to fetch"),
-    db: Session = Depends(get_db)
+    overwrite: bool = Query(False, description="Overwrite prices that already exist")
 ):
     """Trigger historical data fetch (admin endpoint)"""
     
@@ -154,33 +150,19 @@ async def fetch_historical_data(
     
     client = BMRSClient()
     try:
-        df = await client.fetch_market_prices(start_date, end_date)
-        
-        # Store in database
-        count = 0
-        for _, row in df.iterrows():
-            existing = db.query(MarketPrice).filter(
-                MarketPrice.timestamp == row['timestamp'],
-                MarketPrice.market == row['market']
-            ).first()
-            
-            if not existing and row['price'] > 0:
-                price = MarketPrice(
-                    timestamp=row['timestamp'],
-                    market=row['market'],
-                    price=row['price'],
-                    unit=row.get('unit', 'GBP/MWh'),
-                    source='bmrs'
-                )
-                db.add(price)
-                count += 1
-        
-        db.commit()
+        # Store each chunk as it arrives rather than holding the whole range
+        fetched = 0
+        result = IngestResult()
+        async for batch in client.iter_market_prices(start_date, end_date, TRACKED_PROVIDERS):
+            fetched += len(batch)
+            result += await run_db(bulk_upsert_prices, batch, update_existing=overwrite)
         
         return {
             "status": "success",
-            "records_fetched": len(df),
-            "records_added": count
+            "records_fetched": fetched,
+            "records_added": result.inserted,
+            "records_updated": result.updated,
+            "records_skipped": result.skipped
         }
     finally:
         await client.close()
@@ -190,7 +172,7 @@ async def fetch_historical_data(
 async def get_chart_data(
     market: str = Query("uk_dayahead"),
     period: str = Query("1M", description="1D, 1W, 1M, 3M, 1Y, 5Y"),
-    db: Session = Depends(get_db)
+    max_points: Optional[int] = Query(None, ge=3, le=10000, description="Downsample raw prices to at most this many points (LTTB)")
 ):
     """Get data formatted for charts"""
     
@@ -208,16 +190,13 @@ async def get_chart_data(
     
     start_date = datetime.utcnow() - periods[period]
     
-    prices = db.query(MarketPrice).filter(
-        MarketPrice.market == market,
-        MarketPrice.timestamp >= start_date
-    ).order_by(MarketPrice.timestamp.asc()).all()
+    if max_points:
+        chart = await run_db(repository.downsampled_chart, market, period, start_date, max_points)
+    else:
+        chart = await run_db(repository.chart_points, market, start_date)
     
     return {
         "market": market,
         "period": period,
-        "data": [
-            {"x": p.timestamp.isoformat(), "y": p.price}
-            for p in prices
-        ]
+        **chart
     }
@@ -1,66 +1,81 @@
 """
 Predictions API Routes
 """
-from fastapi import APIRouter, Depends, Query, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Query, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from datetime import datetime, timedelta
 from typing import Optional
 import pandas as pd
 
-from services.database import get_db, MarketPrice, Prediction, ContractComparison
+from services import repository
+from services.repository import run_db
+from services.database import ContractComparison
+from services.training_jobs import get_training_queue, TRAINING_RETRY_AFTER
+from services.predictor_registry import get_predictor_registry
 from models.predictor import EnergyPredictor, SignalGenerator
 
 router = APIRouter()
 
-# Global predictor instance
-predictor = EnergyPredictor(model_dir="./saved_models")
-signal_generator = SignalGenerator(predictor)
+
+async def require_model(market: str) -> EnergyPredictor:
+    """
+    The market's shared predictor, once it has a trained model
+    
+    Without a published model, training is queued in the background and
+    the request is answered with 503 and Retry-After rather than training
+    here. A (re)load from disk runs on a worker thread.
+    """
+    predictor = await run_in_threadpool(get_predictor_registry().get, market)
+    if predictor is not None:
+        return predictor
+    
+    job = get_training_queue().submit(market)
+    if job.status == "succeeded":
+        message = "Model was trained but could not be loaded"
+    else:
+        message = "Model not trained yet; training has been queued"
+    raise HTTPException(
+        status_code=503,
+        detail={
+            "message": message,
+            "job_id": job.id,
+            "status": job.status,
+            "error": job.error
+        },
+        headers={"Retry-After": str(TRAINING_RETRY_AFTER)}
+    )
 
 
 @router.get("/forecast")
 async def get_forecast(
     market: str = Query("uk_dayahead"),
-    horizon_days: int = Query(30, description="Forecast horizon in days (max 90)"),
-    db: Session = Depends(get_db)
+    horizon_days: int = Query(30, description="Forecast horizon in days (max 90)")
 ):
     """Get price forecast for specified market"""
     
     if horizon_days > 90:
         horizon_days = 90
     
-    # Load historical data
-    start_date = datetime.utcnow() - timedelta(days=365)
-    prices = db.query(MarketPrice).filter(
-        MarketPrice.market == market,
-        MarketPrice.timestamp >= start_date
-    ).order_by(MarketPrice.timestamp.asc()).all()
+    # Recent prices from the in-memory window
+    df = await repository.recent_price_history(market)
     
-    if len(prices) < 100:
+    if len(df) < 100:
         raise HTTPException(
             status_code=400, 
             detail="Insufficient historical data. Need at least 100 data points."
         )
     
-    # Convert to DataFrame
-    df = pd.DataFrame([
-        {"timestamp": p.timestamp, "price": p.price, "market": p.market}
-        for p in prices
-    ])
-    
     # Ensure model is trained
-    if not predictor.is_trained:
-        if not predictor.load_models():
-            # Train on available data
-            predictor.train(df)
+    predictor = await require_model(market)
     
-    # Generate predictions
-    predictions = predictor.predict(df, horizon_days=horizon_days, market=market)
+    # Generate predictions (off the event loop; models are CPU-bound)
+    predictions = await run_in_threadpool(predictor.predict, df, horizon_days=horizon_days, market=market)
     
     return {
         "market": market,
         "generated_at": datetime.utcnow().isoformat(),
         "horizon_days": horizon_days,
-        "current_price": prices[-1].price if prices else None,
+        "current_price": df["price"].iloc[-1],
         "forecast": [
             {
                 "date": p.target_date.isoformat(),
@@ -75,37 +90,24 @@ async def get_forecast(
     }
 
 
-@router.post("/train")
+@router.post("/train", status_code=202)
 async def train_model(
-    market: str = Query("uk_dayahead"),
-    db: Session = Depends(get_db)
+    market: str = Query("uk_dayahead")
 ):
-    """Train/retrain the prediction model"""
-    
-    # Load all historical data
-    prices = db.query(MarketPrice).filter(
-        MarketPrice.market == market
-    ).order_by(MarketPrice.timestamp.asc()).all()
+    """Queue a training run; poll GET /train/{job_id} for its progress"""
     
-    if len(prices) < 1000:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Insufficient data for training. Have {len(prices)}, need 1000+."
-        )
-    
-    df = pd.DataFrame([
-        {"timestamp": p.timestamp, "price": p.price, "market": p.market}
-        for p in prices
-    ])
-    
-    # Train model
-    metrics = predictor.train(df)
-    
-    return {
-        "status": "success",
-        "training_samples": len(df),
-        "metrics": metrics
-    }
+    job = get_training_queue().submit(market, force=True)
+    return job.to_dict()
+
+
+@router.get("/train/{job_id}")
+async def training_status(job_id: str):
+    """Status, stage and (once finished) metrics or error of a training job"""
+    
+    job = get_training_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown training job")
+    return job.to_dict()
 
 
 @router.get("/compare-contracts")
@@ -113,35 +115,25 @@ async def compare_contracts(
     fixed_rate: float = Query(..., description="Current fixed rate offer (GBP/MWh)"),
     annual_volume: float = Query(..., description="Annual consumption in MWh"),
     contract_years: int = Query(1, description="Contract duration (1-3 years)"),
-    market: str = Query("uk_dayahead"),
-    db: Session = Depends(get_db)
+    market: str = Query("uk_dayahead")
 ):
     """Compare fixed vs flexible contract options"""
     
-    # Load historical data
-    start_date = datetime.utcnow() - timedelta(days=365)
-    prices = db.query(MarketPrice).filter(
-        MarketPrice.market == market,
-        MarketPrice.timestamp >= start_date
-    ).order_by(MarketPrice.timestamp.asc()).all()
+    # Recent prices from the in-memory window
+    df = await repository.recent_price_history(market)
     
-    if len(prices) < 100:
+    if len(df) < 100:
         raise HTTPException(status_code=400, detail="Insufficient data for analysis")
     
-    df = pd.DataFrame([
-        {"timestamp": p.timestamp, "price": p.price, "market": p.market}
-        for p in prices
-    ])
-    
-    if not predictor.is_trained:
-        if not predictor.load_models():
-            predictor.train(df)
+    predictor = await require_model(market)
     
     # Generate predictions for contract period
-    predictions = predictor.predict(df, horizon_days=min(365 * contract_years, 365))
+    predictions = await run_in_threadpool(
+        predictor.predict, df, horizon_days=min(365 * contract_years, 365), market=market
+    )
     
     # Compare
-    comparison = signal_generator.compare_fixed_vs_flexible(
+    comparison = SignalGenerator(predictor).compare_fixed_vs_flexible(
         fixed_rate, predictions, annual_volume
     )
     
@@ -156,11 +148,10 @@ async def compare_contracts(
         confidence=comparison['confidence'],
         reasoning=comparison['reason']
     )
-    db.add(record)
-    db.commit()
+    [analysis_id] = await run_db(repository.save_records, record)
     
     return {
-        "analysis_id": record.id,
+        "analysis_id": analysis_id,
         **comparison,
         "contract_years": contract_years,
         "annual_volume_mwh": annual_volume
@@ -170,26 +161,10 @@ async def compare_contracts(
 @router.get("/history")
 async def get_prediction_history(
     market: str = Query("uk_dayahead"),
-    limit: int = Query(50),
-    db: Session = Depends(get_db)
+    limit: int = Query(50)
 ):
     """Get historical predictions for accuracy analysis"""
     
-    predictions = db.query(Prediction).filter(
-        Prediction.market == market
-    ).order_by(Prediction.created_at.desc()).limit(limit).all()
-    
     return {
-        "predictions": [
-            {
-                "id": p.id,
-                "created_at": p.created_at.isoformat(),
-                "target_date": p.target_date.isoformat(),
-                "predicted_price": p.predicted_price,
-                "confidence": p.confidence,
-                "lower_bound": p.lower_bound,
-                "upper_bound": p.upper_bound
-            }
-            for p in predictions
-        ]
+        "predictions": await run_db(repository.prediction_history, market, limit)
     }
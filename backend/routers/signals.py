@@ -1,51 +1,38 @@
 """
 Trading Signals API Routes
 """
-from fastapi import APIRouter, Depends, Query, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Query, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from datetime import datetime, timedelta
 from typing import Optional
 import pandas as pd
 
-from services.database import get_db, MarketPrice, Signal, TrancheRecommendation
-from models.predictor import EnergyPredictor, SignalGenerator
+from services import repository
+from services.repository import run_db
+from services.database import Signal, TrancheRecommendation
+from models.predictor import SignalGenerator
+from routers.predictions import require_model
 
 router = APIRouter()
 
-# Global instances
-predictor = EnergyPredictor(model_dir="./saved_models")
-signal_generator = SignalGenerator(predictor)
-
 
 @router.get("/current")
 async def get_current_signals(
-    market: str = Query("uk_dayahead"),
-    db: Session = Depends(get_db)
+    market: str = Query("uk_dayahead")
 ):
     """Get current trading signals"""
     
-    # Load historical data
-    start_date = datetime.utcnow() - timedelta(days=365)
-    prices = db.query(MarketPrice).filter(
-        MarketPrice.market == market,
-        MarketPrice.timestamp >= start_date
-    ).order_by(MarketPrice.timestamp.asc()).all()
+    # Recent prices from the in-memory window
+    df = await repository.recent_price_history(market)
     
-    if len(prices) < 100:
+    if len(df) < 100:
         raise HTTPException(status_code=400, detail="Insufficient data for signal generation")
     
-    df = pd.DataFrame([
-        {"timestamp": p.timestamp, "price": p.price, "market": p.market}
-        for p in prices
-    ])
-    
-    current_price = prices[-1].price
+    current_price = df["price"].iloc[-1]
     
-    if not predictor.is_trained:
-        if not predictor.load_models():
-            predictor.train(df)
+    predictor = await require_model(market)
     
-    signals = signal_generator.generate_signals(df, current_price, market)
+    signals = await run_in_threadpool(SignalGenerator(predictor).generate_signals, df, current_price, market)
     
     # Store signal
     signal_record = Signal(
@@ -58,11 +45,10 @@ async def get_current_signals(
         time_horizon="7d",
         expires_at=datetime.utcnow() + timedelta(hours=24)
     )
-    db.add(signal_record)
-    db.commit()
+    [signal_id] = await run_db(repository.save_records, signal_record)
     
     return {
-        "signal_id": signal_record.id,
+        "signal_id": signal_id,
         "market": market,
         "generated_at": datetime.utcnow().isoformat(),
         **signals
@@ -73,38 +59,27 @@ async def get_current_signals(
 async def get_tranche_recommendations(
     market: str = Query("uk_dayahead"),
     delivery_period: str = Query("Q2-2026", description="Delivery period (e.g., Q2-2026, Mar-2026)"),
-    volume_mwh: float = Query(1000, description="Volume to procure in MWh"),
-    db: Session = Depends(get_db)
+    volume_mwh: float = Query(1000, description="Volume to procure in MWh")
 ):
     """Get specific tranche purchase recommendations"""
     
-    # Load data
-    start_date = datetime.utcnow() - timedelta(days=365)
-    prices = db.query(MarketPrice).filter(
-        MarketPrice.market == market,
-        MarketPrice.timestamp >= start_date
-    ).order_by(MarketPrice.timestamp.asc()).all()
+    # Recent prices from the in-memory window
+    df = await repository.recent_price_history(market)
     
-    if len(prices) < 100:
+    if len(df) < 100:
         raise HTTPException(status_code=400, detail="Insufficient data")
     
-    df = pd.DataFrame([
-        {"timestamp": p.timestamp, "price": p.price, "market": p.market}
-        for p in prices
-    ])
+    current_price = df["price"].iloc[-1]
     
-    current_price = prices[-1].price
+    predictor = await require_model(market)
     
-    if not predictor.is_trained:
-        if not predictor.load_models():
-            predictor.train(df)
-    
-    signals = signal_generator.generate_signals(df, current_price, market)
+    signals = await run_in_threadpool(SignalGenerator(predictor).generate_signals, df, current_price, market)
     
     # Calculate tranche details
     recommendations = signals['recommendations']
     
     tranche_details = []
+    tranches = []
     for rec in recommendations:
         volume = volume_mwh * (rec['percentage'] / 100)
         cost = volume * rec['target_price']
@@ -126,9 +101,9 @@ async def get_tranche_recommendations(
             confidence=signals['confidence'],
             reasoning=rec['reason']
         )
-        db.add(tranche)
+        tranches.append(tranche)
     
-    db.commit()
+    await run_db(repository.save_records, *tranches)
     
     return {
         "market": market,
@@ -149,71 +124,21 @@ async def get_tranche_recommendations(
 @router.get("/history")
 async def get_signal_history(
     market: str = Query("uk_dayahead"),
-    limit: int = Query(50),
-    db: Session = Depends(get_db)
+    limit: int = Query(50)
 ):
     """Get historical signals"""
     
-    signals = db.query(Signal).filter(
-        Signal.market == market
-    ).order_by(Signal.created_at.desc()).limit(limit).all()
-    
     return {
-        "signals": [
-            {
-                "id": s.id,
-                "created_at": s.created_at.isoformat(),
-                "signal_type": s.signal_type,
-                "strength": s.strength,
-                "reason": s.reason,
-                "current_price": s.current_price,
-                "target_price": s.target_price
-            }
-            for s in signals
-        ]
+        "signals": await run_db(repository.signal_history, market, limit)
     }
 
 
 @router.get("/dashboard")
-async def get_dashboard_data(
-    db: Session = Depends(get_db)
-):
+async def get_dashboard_data():
     """Get all data needed for main dashboard"""
     
     markets = ['uk_dayahead', 'uk_peak', 'gas_nbp']
-    dashboard = {}
-    
-    for market in markets:
-        prices = db.query(MarketPrice).filter(
-            MarketPrice.market == market
-        ).order_by(MarketPrice.timestamp.desc()).limit(168).all()  # Last week
-        
-        if prices:
-            current = prices[0].price
-            day_ago = prices[24].price if len(prices) > 24 else current
-            week_ago = prices[-1].price if prices else current
-            
-            dashboard[market] = {
-                "current_price": current,
-                "change_24h": ((current - day_ago) / day_ago * 100) if day_ago else 0,
-                "change_7d": ((current - week_ago) / week_ago * 100) if week_ago else 0,
-                "min_7d": min(p.price for p in prices),
-                "max_7d": max(p.price for p in prices),
-                "unit": prices[0].unit
-            }
-    
-    # Latest signal for each market
-    for market in markets:
-        latest_signal = db.query(Signal).filter(
-            Signal.market == market
-        ).order_by(Signal.created_at.desc()).first()
-        
-        if latest_signal and market in dashboard:
-            dashboard[market]['signal'] = {
-                "type": latest_signal.signal_type,
-                "strength": latest_signal.strength,
-                "reason": latest_signal.reason
-            }
+    dashboard = await run_db(repository.dashboard_snapshot, markets)
     
     return {
         "timestamp": datetime.utcnow().isoformat(),
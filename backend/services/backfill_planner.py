@@ -0,0 +1,227 @@
+"""
+Gap-aware, resumable historical backfill
+Finds missing settlement periods and fetches only those ranges
+"""
+from datetime import datetime, timedelta
+from typing import List, Tuple, Optional
+import asyncio
+import os
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from services.database import MarketPrice, BackfillCheckpoint
+from services.ingest import bulk_upsert_prices, IngestResult
+from services.bmrs_parser import PROVIDER_MARKETS, TRACKED_MARKETS
+
+SETTLEMENT_PERIOD = timedelta(minutes=30)
+
+# Ranges closer together than this are fetched as one (BMRS works in whole days)
+MERGE_GAP = timedelta(days=1)
+
+# Days per fetch between checkpoint commits
+BACKFILL_CHUNK_DAYS = int(os.getenv("BACKFILL_CHUNK_DAYS", "30"))
+
+# Data this old is final; a completed range still missing it is an upstream hole
+FINALITY_WINDOW = timedelta(days=int(os.getenv("BACKFILL_FINALITY_DAYS", "2")))
+
+
+def _floor_period(ts: datetime) -> datetime:
+    return ts.replace(minute=ts.minute - ts.minute % 30, second=0, microsecond=0)
+
+
+def find_missing_ranges(
+    db: Session,
+    market: str,
+    start: datetime,
+    end: datetime,
+    merge_gap: timedelta = MERGE_GAP
+) -> List[Tuple[datetime, datetime]]:
+    """
+    Missing half-hourly settlement periods in [start, end), as merged ranges
+
+    Only timestamps are read, so the (market, timestamp) unique index
+    answers the query without touching the table.
+    """
+    start, end = _floor_period(start), _floor_period(end)
+    if start >= end:
+        return []
+
+    stored = db.execute(
+        select(MarketPrice.timestamp)
+        .where(
+            MarketPrice.market == market,
+            MarketPrice.timestamp >= start,
+            MarketPrice.timestamp < end
+        )
+        .order_by(MarketPrice.timestamp)
+    ).scalars().all()
+
+    period = np.timedelta64(30, "m")
+    expected = np.arange(np.datetime64(start, "m"), np.datetime64(end, "m"), period)
+    have = np.array(stored, dtype="datetime64[m]")
+    missing = expected[~np.isin(expected, have)]
+
+    if len(missing) == 0:
+        return []
+
+    # Split into runs wherever consecutive missing periods are further apart than the merge gap
+    breaks = np.flatnonzero(np.diff(missing) > np.timedelta64(merge_gap) + period) + 1
+    ranges = []
+    for run in np.split(missing, breaks):
+        ranges.append((run[0].astype(datetime), (run[-1] + period).astype(datetime)))
+    return ranges
+
+
+def merge_ranges(
+    ranges: List[Tuple[datetime, datetime]],
+    merge_gap: timedelta = MERGE_GAP
+) -> List[Tuple[datetime, datetime]]:
+    """Union of ranges, joining any closer together than merge_gap"""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start - merged[-1][1] <= merge_gap:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def subtract_ranges(
+    ranges: List[Tuple[datetime, datetime]],
+    holes: List[Tuple[datetime, datetime]]
+) -> List[Tuple[datetime, datetime]]:
+    """The parts of ranges not covered by any of holes"""
+    holes = merge_ranges(holes, merge_gap=timedelta(0))
+    remaining = []
+    for start, end in ranges:
+        for hole_start, hole_end in holes:
+            if hole_end <= start or hole_start >= end:
+                continue
+            if hole_start > start:
+                remaining.append((start, hole_start))
+            start = max(start, hole_end)
+            if start >= end:
+                break
+        if start < end:
+            remaining.append((start, end))
+    return remaining
+
+
+def exhausted_ranges(done: List[BackfillCheckpoint], market: str) -> List[Tuple[datetime, datetime]]:
+    """
+    Where a market's data is known to be as complete as upstream will make it
+
+    A finished checkpoint fetched every market in its key, and data older
+    than FINALITY_WINDOW at the time it finished is final; anything still
+    missing there is an upstream hole. Newer data in the same range stays
+    eligible for refetching.
+    """
+    ranges = []
+    for checkpoint in done:
+        if market not in checkpoint.market.split(","):
+            continue
+        final_end = min(checkpoint.range_end, checkpoint.updated_at - FINALITY_WINDOW)
+        if checkpoint.range_start < final_end:
+            ranges.append((checkpoint.range_start, final_end))
+    return ranges
+
+
+def plan_backfill(
+    db: Session,
+    markets: List[str],
+    start: datetime,
+    end: datetime
+) -> List[BackfillCheckpoint]:
+    """
+    Checkpoints to work through: interrupted ones first, otherwise new ones
+    for each range missing from any of the markets (fetched together in
+    one pass)
+
+    Each market's gaps are first cut down by its exhausted ranges, so a
+    market upstream can't fill only costs a refetch of its recent,
+    not-yet-final days rather than the whole window.
+    """
+    key = ",".join(markets)
+    pending = db.query(BackfillCheckpoint).filter(
+        BackfillCheckpoint.market == key,
+        BackfillCheckpoint.status == "pending"
+    ).order_by(BackfillCheckpoint.range_start.asc()).all()
+
+    if pending:
+        return pending
+
+    done = db.query(BackfillCheckpoint).filter(BackfillCheckpoint.status == "done").all()
+
+    missing = merge_ranges([
+        r
+        for market in markets
+        for r in subtract_ranges(find_missing_ranges(db, market, start, end), exhausted_ranges(done, market))
+    ])
+
+    for range_start, range_end in missing:
+        pending.append(BackfillCheckpoint(
+            market=key,
+            range_start=range_start,
+            range_end=range_end,
+            cursor=range_start,
+            status="pending"
+        ))
+
+    db.add_all(pending)
+    db.commit()
+    return pending
+
+
+async def run_backfill(
+    db: Session,
+    client,
+    markets: Optional[List[str]] = None,
+    years: int = 5,
+    end: Optional[datetime] = None,
+    chunk_days: int = BACKFILL_CHUNK_DAYS
+) -> IngestResult:
+    """
+    Fill gaps in the last `years` of data for the tracked BMRS markets
+
+    Every provider comes back in the same download, so all markets are
+    planned and written together. Progress is committed after every chunk,
+    so rerunning after a crash picks up from the stored cursor instead of
+    starting over. Database work runs in a worker thread so the event loop
+    (the scheduler, or the API it shares a process with) stays responsive.
+    """
+    markets = markets or TRACKED_MARKETS
+    providers = [p for p, m in PROVIDER_MARKETS.items() if m in markets]
+    end = end or datetime.utcnow()
+    start = end - timedelta(days=years * 365)
+    total = IngestResult()
+
+    checkpoints = await asyncio.to_thread(plan_backfill, db, markets, start, end)
+    if not checkpoints:
+        print(f"  No gaps in {', '.join(markets)} since {start.date()}")
+        return total
+
+    print(f"  {len(checkpoints)} range(s) to backfill for {', '.join(markets)}")
+
+    for checkpoint in checkpoints:
+        cursor = checkpoint.cursor or checkpoint.range_start
+
+        while cursor < checkpoint.range_end:
+            chunk_end = min(cursor + timedelta(days=chunk_days), checkpoint.range_end)
+
+            print(f"  Fetching {cursor} to {chunk_end}...", end=" ", flush=True)
+            result = IngestResult()
+            async for batch in client.iter_market_prices(cursor, chunk_end, providers):
+                result += await asyncio.to_thread(bulk_upsert_prices, db, batch)
+            total += result
+            print(f"{result.inserted} records added")
+
+            cursor = chunk_end
+            checkpoint.cursor = cursor
+            await asyncio.to_thread(db.commit)
+
+        checkpoint.status = "done"
+        await asyncio.to_thread(db.commit)
+
+    return total
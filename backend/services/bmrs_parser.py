@@ -0,0 +1,110 @@
+"""
+Columnar parsing of BMRS market index responses
+Each response chunk goes straight into typed column buffers, so memory
+grows with the chunk size rather than the length of history fetched
+"""
+from datetime import datetime
+from typing import Dict, Optional, Sequence, Union
+import os
+
+import numpy as np
+import pandas as pd
+
+# Known market index data providers (categorical codes) and the market each is stored as
+PROVIDERS = ["APXMIDP", "N2EXMIDP"]
+PROVIDER_MARKETS = {
+    "APXMIDP": "uk_dayahead",
+    "N2EXMIDP": "uk_dayahead_n2ex",
+}
+
+# Market for a provider requested by name but missing from PROVIDER_MARKETS
+DEFAULT_MARKET = "uk_dayahead"
+
+# Providers kept when ingesting; both arrive in the same payloads
+TRACKED_PROVIDERS = [
+    p for p in os.getenv("BMRS_PROVIDERS", "APXMIDP,N2EXMIDP").split(",") if p in PROVIDER_MARKETS
+]
+TRACKED_MARKETS = [PROVIDER_MARKETS[p] for p in TRACKED_PROVIDERS]
+
+ProviderFilter = Optional[Union[str, Sequence[str]]]
+
+
+def _to_epoch_ns(value: Optional[datetime]) -> Optional[int]:
+    """Naive datetimes are treated as UTC, like stored timestamps"""
+    if value is None:
+        return None
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize("UTC")
+    return ts.as_unit("ns").value
+
+
+def parse_market_index(
+    payload: Dict,
+    data_provider: ProviderFilter = "APXMIDP",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> pd.DataFrame:
+    """
+    Parse one market-index response into a typed DataFrame batch
+
+    Columns are built as int64 epoch-ns timestamps, float64 prices/volumes
+    and a categorical provider, then filtered with vectorised masks:
+    the provider (one, several, or None for every known provider) and the
+    optional [start, end) window, which trims the overlap between
+    neighbouring date chunks. Each known provider maps to its own market;
+    any other provider asked for by name lands in DEFAULT_MARKET.
+    """
+    items = payload.get("data", [])
+    n = len(items)
+
+    timestamps = pd.to_datetime(
+        [item.get("startTime") for item in items], utc=True, format="ISO8601"
+    ).as_unit("ns").asi8 if n else np.empty(0, dtype="int64")
+    prices = np.fromiter(
+        (np.nan if item.get("price") is None else item["price"] for item in items),
+        dtype="float64", count=n
+    )
+    volumes = np.fromiter(
+        (np.nan if item.get("volume") is None else item["volume"] for item in items),
+        dtype="float64", count=n
+    )
+    periods = np.fromiter(
+        (item.get("settlementPeriod") or 0 for item in items),
+        dtype="int16", count=n
+    )
+    # Known providers plus any asked for by name; others are dropped before
+    # the Categorical is built (they would be coerced to NaN)
+    if data_provider is None:
+        requested = PROVIDERS
+    elif isinstance(data_provider, str):
+        requested = [data_provider]
+    else:
+        requested = list(data_provider)
+    categories = PROVIDERS + [p for p in requested if p not in PROVIDERS]
+    known = set(categories)
+    providers = pd.Categorical(
+        [p if p in known else None for p in (item.get("dataProvider") for item in items)],
+        categories=categories
+    )
+    mask = np.isin(providers.codes, [categories.index(p) for p in requested])
+    start_ns, end_ns = _to_epoch_ns(start), _to_epoch_ns(end)
+    if start_ns is not None:
+        mask &= timestamps >= start_ns
+    if end_ns is not None:
+        mask &= timestamps < end_ns
+
+    batch = pd.DataFrame({
+        "timestamp": pd.to_datetime(timestamps[mask], unit="ns", utc=True),
+        "price": prices[mask],
+        "volume": volumes[mask],
+        "settlement_period": periods[mask],
+        "provider": providers[mask],
+    })
+    # A provider outside PROVIDER_MARKETS is stored as the default market
+    markets = np.array([PROVIDER_MARKETS.get(p, DEFAULT_MARKET) for p in categories], dtype=object)
+    batch["market"] = markets[providers.codes[mask]]
+    batch["unit"] = "GBP/MWh"
+    batch["source"] = "bmrs"
+    return batch.sort_values("timestamp", kind="stable").reset_index(drop=True)
+
@@ -5,8 +5,45 @@ Uses BMRS (Elexon) for UK electricity data - official government source
 import httpx
 import pandas as pd
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Tuple, Callable, AsyncIterator
+from collections import deque
 import asyncio
+import os
+import random
+import time
+
+from services.http_client import PooledHTTPClient, get_http_client
+from services.bmrs_parser import parse_market_index, ProviderFilter
+from services.response_cache import ResponseCache, CacheMiss, get_response_cache
+
+
+class TokenBucket:
+    """
+    Async token bucket limiter
+
+    Allows bursts of up to `capacity` requests, refilling at `rate`
+    tokens per second, so concurrent chunk fetches stay within quota.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self._tokens) / self.rate)
 
 
 class BMRSClient:
@@ -15,74 +52,234 @@ class BMRSClient:
     https://data.elexon.co.uk/
     
     Free, no API key required for basic endpoints
+
+    Date ranges are split into chunks that are fetched concurrently
+    (up to `max_concurrency` in flight), paced by a token bucket and
+    retried with exponential backoff on 429/5xx responses.
     """
     
     BASE_URL = "https://data.elexon.co.uk/bmrs/api/v1"
+
+    MAX_CONCURRENCY = int(os.getenv("BMRS_MAX_CONCURRENCY", "4"))
+    RATE_LIMIT = float(os.getenv("BMRS_RATE_LIMIT", "4"))  # requests per second
+    MAX_RETRIES = int(os.getenv("BMRS_MAX_RETRIES", "4"))
+    RETRY_BACKOFF = float(os.getenv("BMRS_RETRY_BACKOFF", "1.0"))  # seconds, doubled per attempt
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
     
-    def __init__(self):
-        self.client = httpx.AsyncClient(timeout=60.0)
-    
-    async def fetch_market_prices(
+    def __init__(
         self,
+        max_concurrency: Optional[int] = None,
+        rate_limit: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        http: Optional[PooledHTTPClient] = None,
+        cache: Optional[ResponseCache] = None
+    ):
+        # Use the app-wide pooled client when one is running
+        shared = http or get_http_client()
+        self._owns_client = shared is None
+        self.client = shared or httpx.AsyncClient(timeout=60.0)
+        self.max_concurrency = max(1, max_concurrency or self.MAX_CONCURRENCY)
+        self.max_retries = self.MAX_RETRIES if max_retries is None else max_retries
+        self.limiter = TokenBucket(rate_limit or self.RATE_LIMIT)
+        self.cache = cache or get_response_cache()
+    
+    @staticmethod
+    def _chunk_ranges(
         start_date: datetime,
-        end_date: Optional[datetime] = None,
-        data_provider: str = "APXMIDP"  # APX Mid Price (main UK market)
-    ) -> pd.DataFrame:
-        """
-        Fetch UK electricity market index prices
+        end_date: datetime,
+        chunk_days: int
+    ) -> List[Tuple[datetime, datetime]]:
+        """Split [start_date, end_date) into consecutive chunks of chunk_days"""
+        ranges = []
+        current = start_date
+        while current < end_date:
+            chunk_end = min(current + timedelta(days=chunk_days), end_date)
+            ranges.append((current, chunk_end))
+            current = chunk_end
+        return ranges
+    
+    def _retry_delay(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        """Backoff delay, honouring Retry-After when the server sends one"""
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return float(retry_after)
         
-        data_provider options:
-        - APXMIDP: APX Power UK Mid Price (main)
-        - N2EXMIDP: N2EX Mid Price
+        base = self.RETRY_BACKOFF * (2 ** attempt)
+        return base + random.uniform(0, self.RETRY_BACKOFF)
+    
+    async def _get_json(
+        self,
+        url: str,
+        params: Dict,
+        data_end: Optional[datetime] = None
+    ) -> Optional[Dict]:
         """
-        if end_date is None:
-            end_date = datetime.now()
+        GET a BMRS endpoint with rate limiting and retries, None on failure
+
+        data_end (end of the period requested) lets the response cache keep
+        settled data forever.
+        """
+        if self.cache is not None:
+            try:
+                cached = self.cache.get(url, params)
+            except CacheMiss as e:
+                print(f"BMRS replay miss: {e}")
+                return None
+            if cached is not None:
+                return cached
         
-        all_records = []
-        current = start_date
+        error = None
         
-        # BMRS limits to 7 days per request, so we chunk
-        while current < end_date:
-            chunk_end = min(current + timedelta(days=7), end_date)
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.acquire()
+            response = None
             
             try:
-                url = f"{self.BASE_URL}/balancing/pricing/market-index"
-                params = {
-                    "from": current.strftime("%Y-%m-%d"),
-                    "to": chunk_end.strftime("%Y-%m-%d"),
-                }
-                
                 response = await self.client.get(url, params=params)
                 
                 if response.status_code == 200:
-                    data = response.json()
-                    for item in data.get("data", []):
-                        if item.get("dataProvider") == data_provider:
-                            all_records.append({
-                                "timestamp": item.get("startTime"),
-                                "price": item.get("price"),
-                                "volume": item.get("volume"),
-                                "settlement_period": item.get("settlementPeriod"),
-                                "market": "uk_dayahead",
-                                "unit": "GBP/MWh",
-                                "source": "bmrs"
-                            })
-                else:
-                    print(f"BMRS error {response.status_code}: {current} to {chunk_end}")
-                    
-            except Exception as e:
-                print(f"Fetch error {current}: {e}")
+                    payload = response.json()
+                    if self.cache is not None:
+                        self.cache.put(url, params, payload, data_end)
+                    return payload
+                
+                if response.status_code not in self.RETRY_STATUSES:
+                    print(f"BMRS error {response.status_code}: {params}")
+                    return None
+                
+                error = f"HTTP {response.status_code}"
+            except (httpx.HTTPError, ValueError) as e:
+                error = e
             
-            current = chunk_end
-            await asyncio.sleep(0.5)  # Rate limiting
+            if attempt < self.max_retries:
+                await asyncio.sleep(self._retry_delay(attempt, response))
         
-        if not all_records:
+        print(f"BMRS request failed after {self.max_retries + 1} attempts {params}: {error}")
+        return None
+    
+    async def _iter_chunks(
+        self,
+        path: str,
+        start_date: datetime,
+        end_date: datetime,
+        chunk_days: int,
+        make_params: Callable[[datetime, datetime], Dict]
+    ) -> AsyncIterator[Tuple[datetime, datetime, Dict]]:
+        """
+        Fetch a date range chunk by chunk, concurrently
+
+        Keeps up to max_concurrency requests in flight and yields
+        (chunk_start, chunk_end, payload) in time order as chunks complete,
+        so only a handful of responses are held in memory at once.
+        Failed chunks are skipped.
+        """
+        url = f"{self.BASE_URL}/{path}"
+        ranges = iter(self._chunk_ranges(start_date, end_date, chunk_days))
+        in_flight = deque()
+        
+        def launch():
+            chunk = next(ranges, None)
+            if chunk is not None:
+                task = asyncio.create_task(
+                    self._get_json(url, make_params(*chunk), data_end=chunk[1])
+                )
+                in_flight.append((*chunk, task))
+        
+        try:
+            for _ in range(self.max_concurrency):
+                launch()
+            
+            while in_flight:
+                chunk_start, chunk_end, task = in_flight.popleft()
+                payload = await task
+                launch()
+                if payload is not None:
+                    yield chunk_start, chunk_end, payload
+        finally:
+            for _, _, task in in_flight:
+                task.cancel()
+    
+    async def _fetch_chunks(self, *args) -> List[Dict]:
+        """All chunk payloads for a range, in time order"""
+        return [payload async for _, _, payload in self._iter_chunks(*args)]
+    
+    @staticmethod
+    def _date_params(chunk_start: datetime, chunk_end: datetime) -> Dict:
+        return {
+            "from": chunk_start.strftime("%Y-%m-%d"),
+            "to": chunk_end.strftime("%Y-%m-%d"),
+        }
+    
+    @staticmethod
+    def _datetime_params(chunk_start: datetime, chunk_end: datetime) -> Dict:
+        """
+        Exact chunk bounds as UTC ISO datetimes (naive values are UTC)
+        
+        Used where batches are trimmed to [chunk_start, chunk_end): the
+        request has to cover exactly that window, or rows between a
+        date-only bound and the chunk's time of day are lost at every
+        chunk boundary.
+        """
+        def iso(value: datetime) -> str:
+            ts = pd.Timestamp(value)
+            ts = ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+            return ts.strftime("%Y-%m-%dT%H:%M:%SZ")
+        
+        return {"from": iso(chunk_start), "to": iso(chunk_end)}
+    
+    async def iter_market_prices(
+        self,
+        start_date: datetime,
+        end_date: Optional[datetime] = None,
+        data_provider: ProviderFilter = "APXMIDP"
+    ) -> AsyncIterator[pd.DataFrame]:
+        """
+        Stream market index prices as one DataFrame batch per chunk
+
+        Batches arrive in timestamp order and don't overlap, so they can
+        be ingested as they come without holding the whole range. Pass
+        several providers (or None for all) to keep every series from the
+        same download; each lands in its own market.
+        """
+        if end_date is None:
+            end_date = datetime.now()
+        
+        # BMRS limits to 7 days per request, so we chunk
+        chunks = self._iter_chunks(
+            "balancing/pricing/market-index",
+            start_date, end_date, 7,
+            self._datetime_params
+        )
+        
+        async for chunk_start, chunk_end, payload in chunks:
+            batch = parse_market_index(payload, data_provider, chunk_start, chunk_end)
+            if not batch.empty:
+                yield batch
+    
+    async def fetch_market_prices(
+        self,
+        start_date: datetime,
+        end_date: Optional[datetime] = None,
+        data_provider: ProviderFilter = "APXMIDP"  # APX Mid Price (main UK market)
+    ) -> pd.DataFrame:
+        """
+        Fetch UK electricity market index prices
+        
+        data_provider options (a list or None keeps several in one pass):
+        - APXMIDP: APX Power UK Mid Price (main) -> uk_dayahead
+        - N2EXMIDP: N2EX Mid Price -> uk_dayahead_n2ex
+        """
+        batches = [
+            batch async for batch in
+            self.iter_market_prices(start_date, end_date, data_provider)
+        ]
+        
+        if not batches:
             return pd.DataFrame()
         
-        df = pd.DataFrame(all_records)
-        df["timestamp"] = pd.to_datetime(df["timestamp"])
-        df = df.drop_duplicates(subset=["timestamp"])
-        df = df.sort_values("timestamp")
+        df = pd.concat(batches, ignore_index=True)
+        df = df.drop_duplicates(subset=["market", "timestamp"])
         return df
     
     async def fetch_system_prices(
@@ -97,45 +294,32 @@ class BMRSClient:
         if end_date is None:
             end_date = datetime.now()
         
-        all_records = []
-        current = start_date
+        payloads = await self._fetch_chunks(
+            "balancing/settlement/system-prices",
+            start_date, end_date, 7,
+            self._date_params
+        )
         
-        while current < end_date:
-            chunk_end = min(current + timedelta(days=7), end_date)
-            
-            try:
-                url = f"{self.BASE_URL}/balancing/settlement/system-prices"
-                params = {
-                    "from": current.strftime("%Y-%m-%d"),
-                    "to": chunk_end.strftime("%Y-%m-%d"),
-                }
-                
-                response = await self.client.get(url, params=params)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    for item in data.get("data", []):
-                        all_records.append({
-                            "timestamp": item.get("startTime"),
-                            "system_sell_price": item.get("systemSellPrice"),
-                            "system_buy_price": item.get("systemBuyPrice"),
-                            "settlement_period": item.get("settlementPeriod"),
-                            "market": "uk_system",
-                            "unit": "GBP/MWh",
-                            "source": "bmrs"
-                        })
-                        
-            except Exception as e:
-                print(f"System price error {current}: {e}")
-            
-            current = chunk_end
-            await asyncio.sleep(0.5)
+        all_records = []
+        for data in payloads:
+            for item in data.get("data", []):
+                all_records.append({
+                    "timestamp": item.get("startTime"),
+                    "system_sell_price": item.get("systemSellPrice"),
+                    "system_buy_price": item.get("systemBuyPrice"),
+                    "settlement_period": item.get("settlementPeriod"),
+                    "market": "uk_system",
+                    "unit": "GBP/MWh",
+                    "source": "bmrs"
+                })
         
         if not all_records:
             return pd.DataFrame()
         
         df = pd.DataFrame(all_records)
         df["timestamp"] = pd.to_datetime(df["timestamp"])
+        df = df.drop_duplicates()
+        df = df.sort_values("timestamp", kind="stable").reset_index(drop=True)
         return df
     
     async def fetch_day_ahead_prices(
@@ -149,43 +333,33 @@ class BMRSClient:
         if end_date is None:
             end_date = datetime.now()
         
-        all_records = []
-        current = start_date
+        payloads = await self._fetch_chunks(
+            "datasets/MID",
+            start_date, end_date, 30,
+            lambda s, e: {
+                "from": s.strftime("%Y-%m-%dT00:00:00Z"),
+                "to": e.strftime("%Y-%m-%dT23:59:59Z"),
+            }
+        )
         
-        while current < end_date:
-            chunk_end = min(current + timedelta(days=30), end_date)
-            
-            try:
-                url = f"{self.BASE_URL}/datasets/MID"
-                params = {
-                    "from": current.strftime("%Y-%m-%dT00:00:00Z"),
-                    "to": chunk_end.strftime("%Y-%m-%dT23:59:59Z"),
-                }
-                
-                response = await self.client.get(url, params=params)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    for item in data.get("data", []):
-                        all_records.append({
-                            "timestamp": item.get("startTime"),
-                            "price": item.get("price"),
-                            "market": "uk_dayahead",
-                            "unit": "GBP/MWh",
-                            "source": "bmrs"
-                        })
-                        
-            except Exception as e:
-                print(f"Day-ahead error {current}: {e}")
-            
-            current = chunk_end
-            await asyncio.sleep(0.5)
+        all_records = []
+        for data in payloads:
+            for item in data.get("data", []):
+                all_records.append({
+                    "timestamp": item.get("startTime"),
+                    "price": item.get("price"),
+                    "market": "uk_dayahead",
+                    "unit": "GBP/MWh",
+                    "source": "bmrs"
+                })
         
         if not all_records:
             return pd.DataFrame()
         
         df = pd.DataFrame(all_records)
         df["timestamp"] = pd.to_datetime(df["timestamp"])
+        df = df.drop_duplicates()
+        df = df.sort_values("timestamp", kind="stable").reset_index(drop=True)
         return df
     
     async def get_current_price(self) -> Dict:
@@ -200,10 +374,9 @@ class BMRSClient:
                 "to": today.strftime("%Y-%m-%d"),
             }
             
-            response = await self.client.get(url, params=params)
+            data = await self._get_json(url, params, data_end=today)
             
-            if response.status_code == 200:
-                data = response.json()
+            if data is not None:
                 # Get latest APXMIDP price
                 for item in reversed(data.get("data", [])):
                     if item.get("dataProvider") == "APXMIDP" and item.get("price", 0) > 0:
@@ -219,7 +392,8 @@ class BMRSClient:
         return {}
     
     async def close(self):
-        await self.client.aclose()
+        if self._owns_client:
+            await self.client.aclose()
 
 
 class GasDataClient:
@@ -231,8 +405,10 @@ class GasDataClient:
     # National Grid gas data
     BASE_URL = "https://data.nationalgas.com/api"
     
-    def __init__(self):
-        self.client = httpx.AsyncClient(timeout=60.0)
+    def __init__(self, http: Optional[PooledHTTPClient] = None):
+        shared = http or get_http_client()
+        self._owns_client = shared is None
+        self.client = shared or httpx.AsyncClient(timeout=60.0)
     
     async def fetch_gas_prices(
         self,
@@ -254,7 +430,8 @@ class GasDataClient:
         return pd.DataFrame()
     
     async def close(self):
-        await self.client.aclose()
+        if self._owns_client:
+            await self.client.aclose()
 
 
 async def backfill_historical_data(years: int = 5) -> pd.DataFrame:
@@ -1,15 +1,41 @@
 """
 Database service for storing market data and predictions
 """
-from sqlalchemy import create_engine, Column, Integer, Float, String, DateTime, Boolean, Text
+from sqlalchemy import create_engine, Column, Integer, Float, String, DateTime, Boolean, Text, Index, text, inspect, event, select
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, Session
 from datetime import datetime
+from typing import Iterator, Optional, Sequence
 import os
 
+import numpy as np
+import pandas as pd
+
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./lobster_energy.db")
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+# Connection pool; async handlers run queries on this many worker threads
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+
+_is_sqlite = DATABASE_URL.startswith("sqlite")
+_engine_args = {}
+if _is_sqlite:
+    _engine_args["connect_args"] = {"check_same_thread": False}
+if ":memory:" not in DATABASE_URL:
+    _engine_args.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW)
+
+engine = create_engine(DATABASE_URL, **_engine_args)
+
+if _is_sqlite:
+    @event.listens_for(engine, "connect")
+    def _sqlite_pragmas(dbapi_connection, connection_record):
+        # WAL lets readers on other connections proceed while a write is in progress
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -26,6 +52,12 @@ class MarketPrice(Base):
     unit = Column(String(20))  # GBP/MWh, p/therm
     source = Column(String(50))  # nordpool, bmrs, ice
     created_at = Column(DateTime, default=datetime.utcnow)
+    
+    # One price per market per settlement period; bulk ingestion relies on
+    # this for INSERT ... ON CONFLICT
+    __table_args__ = (
+        Index("uq_market_prices_market_timestamp", "market", "timestamp", unique=True),
+    )
 
 
 class Prediction(Base):
@@ -93,9 +125,137 @@ class ContractComparison(Base):
     reasoning = Column(Text)
 
 
+class BackfillCheckpoint(Base):
+    """Progress of a planned backfill range, so interrupted runs can resume"""
+    __tablename__ = "backfill_checkpoints"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    market = Column(String(50), index=True)
+    range_start = Column(DateTime)
+    range_end = Column(DateTime)
+    cursor = Column(DateTime)  # fetched and stored up to here
+    status = Column(String(20), default="pending")  # pending, done
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class PriceRollup(Base):
+    """OHLC aggregates of market prices per hour, day and week"""
+    __tablename__ = "price_rollups"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    market = Column(String(50))
+    resolution = Column(String(10))  # hour, day, week
+    bucket = Column(DateTime)  # start of the period (weeks start Monday)
+    open = Column(Float)
+    high = Column(Float)
+    low = Column(Float)
+    close = Column(Float)
+    mean = Column(Float)
+    count = Column(Integer)
+    
+    __table_args__ = (
+        Index("uq_price_rollups_market_resolution_bucket", "market", "resolution", "bucket", unique=True),
+    )
+
+
 def init_db():
     """Initialize database tables"""
     Base.metadata.create_all(bind=engine)
+    _ensure_market_price_unique_index()
+
+
+def _ensure_market_price_unique_index():
+    """
+    Add the (market, timestamp) unique index to databases created before it
+    existed, dropping duplicate rows (keeping the oldest) first
+    """
+    index = next(i for i in MarketPrice.__table__.indexes if i.unique)
+    
+    with engine.begin() as conn:
+        existing = {i["name"] for i in inspect(conn).get_indexes(MarketPrice.__tablename__)}
+        if index.name in existing:
+            return
+        
+        removed = conn.execute(text(
+            "DELETE FROM market_prices WHERE id NOT IN "
+            "(SELECT MIN(id) FROM market_prices GROUP BY market, timestamp)"
+        )).rowcount
+        if removed:
+            print(f"Removed {removed} duplicate market prices")
+        
+        index.create(bind=conn)
+
+
+# Bulk time-series loading
+# Core selects of just the needed columns straight into typed arrays,
+# skipping ORM object construction and the identity map
+
+PRICE_LOAD_CHUNK_SIZE = int(os.getenv("PRICE_LOAD_CHUNK_SIZE", "50000"))
+
+PRICE_COLUMN_DTYPES = {
+    "timestamp": "datetime64[ns]",
+    "price": np.float64,
+    "market": object,
+    "product": object,
+    "unit": object,
+    "source": object,
+}
+
+
+def _price_select(
+    market: str,
+    start: Optional[datetime],
+    end: Optional[datetime],
+    columns: Sequence[str]
+):
+    table = MarketPrice.__table__
+    query = select(*(table.c[c] for c in columns)).where(table.c.market == market)
+    if start is not None:
+        query = query.where(table.c.timestamp >= start)
+    if end is not None:
+        query = query.where(table.c.timestamp < end)
+    return query.order_by(table.c.timestamp)
+
+
+def _price_frame(rows: Sequence, columns: Sequence[str]) -> pd.DataFrame:
+    values = list(zip(*rows)) if rows else [()] * len(columns)
+    arrays = {}
+    for column, column_values in zip(columns, values):
+        if column == "timestamp":
+            # pandas parses datetimes an order of magnitude faster than np.array
+            arrays[column] = pd.to_datetime(list(column_values)).as_unit("ns").to_numpy()
+        else:
+            arrays[column] = np.array(column_values, dtype=PRICE_COLUMN_DTYPES[column])
+    return pd.DataFrame(arrays)
+
+
+def load_prices(
+    db: Session,
+    market: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    columns: Sequence[str] = ("timestamp", "price")
+) -> pd.DataFrame:
+    """Ascending prices for a market in [start, end) as a typed DataFrame"""
+    rows = db.execute(_price_select(market, start, end, columns)).all()
+    return _price_frame(rows, columns)
+
+
+def iter_prices(
+    db: Session,
+    market: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    columns: Sequence[str] = ("timestamp", "price"),
+    chunk_size: int = PRICE_LOAD_CHUNK_SIZE
+) -> Iterator[pd.DataFrame]:
+    """load_prices in ascending chunks of at most chunk_size rows, streamed from the cursor"""
+    result = db.execute(
+        _price_select(market, start, end, columns).execution_options(yield_per=chunk_size)
+    )
+    for rows in result.partitions():
+        yield _price_frame(rows, columns)
 
 
 def get_db():
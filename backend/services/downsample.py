@@ -0,0 +1,113 @@
+"""
+Chart downsampling
+Largest-Triangle-Three-Buckets over NumPy arrays, plus a small cache of
+downsampled series keyed by the data watermark
+"""
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+import os
+import threading
+
+import numpy as np
+
+from services.events import subscribe, PRICES_INGESTED, PricesIngested
+
+CHART_CACHE_SIZE = int(os.getenv("CHART_CACHE_SIZE", "64"))
+
+# LTTB runs over at most this many source points per output point; wider
+# windows are reduced from a rollup rather than from raw rows
+CHART_LTTB_SOURCE_FACTOR = int(os.getenv("CHART_LTTB_SOURCE_FACTOR", "8"))
+
+
+def lttb(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Indices of at most max_points points that preserve the shape of y(x)
+
+    The first and last points are always kept. The rest are split into
+    equal buckets, and from each the point forming the largest triangle
+    with the previous bucket's average and the next bucket's average is
+    kept, which favours peaks and troughs. Anchoring on the previous
+    bucket's average rather than its chosen point (as sequential LTTB
+    does) removes the dependency between buckets, so every triangle area
+    is computed in one pass and each bucket's argmax comes from
+    np.maximum.reduceat, with no Python loop over buckets.
+    """
+    n = len(x)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    buckets = max_points - 2
+    edges = (np.arange(buckets + 1) * ((n - 2) / buckets)).astype(np.int64) + 1
+    edges[-1] = n - 1
+
+    # Average of each bucket; the last bucket looks ahead to the final point
+    sizes = np.diff(edges)
+    avg_x = np.append(np.add.reduceat(x[:n - 1], edges[:-1]) / sizes, x[-1])
+    avg_y = np.append(np.add.reduceat(y[:n - 1], edges[:-1]) / sizes, y[-1])
+
+    # Per point of the interior: its bucket, that bucket's anchor and look-ahead
+    bucket = np.repeat(np.arange(buckets), sizes)
+    ax = np.append(x[0], avg_x[:buckets - 1])[bucket]
+    ay = np.append(y[0], avg_y[:buckets - 1])[bucket]
+    cx, cy = avg_x[1:][bucket], avg_y[1:][bucket]
+
+    px, py = x[1:n - 1], y[1:n - 1]
+    area = np.abs((ax - cx) * (py - ay) - (ax - px) * (cy - ay))
+
+    # First point in each bucket reaching the bucket's largest area
+    largest = np.maximum.reduceat(area, edges[:-1] - 1)
+    candidates = np.flatnonzero(area == largest[bucket])
+    _, first = np.unique(bucket[candidates], return_index=True)
+
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0] = 0
+    selected[1:-1] = candidates[first] + 1
+    selected[-1] = n - 1
+    return selected
+
+
+class DownsampleCache:
+    """
+    LRU of downsampled chart payloads
+
+    Keys start with the market and include its watermark, so data written
+    by another process (e.g. backfill.py) misses naturally. Ingests in this
+    process also drop the market's entries, which covers rewritten prices.
+    """
+
+    def __init__(self, max_entries: int = CHART_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return self._entries[key]
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, market: str):
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == market]:
+                del self._entries[key]
+
+    def on_prices_ingested(self, event: PricesIngested):
+        self.invalidate(event.market)
+
+
+chart_cache = DownsampleCache()
+subscribe(PRICES_INGESTED, chart_cache.on_prices_ingested)
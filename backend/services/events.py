@@ -0,0 +1,53 @@
+"""
+In-process event bus for data change notifications
+Caches and downstream consumers subscribe to hear about new prices and
+newly trained models
+"""
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Any
+
+import pandas as pd
+
+PRICES_INGESTED = "prices_ingested"
+MODEL_TRAINED = "model_trained"
+
+
+@dataclass
+class PricesIngested:
+    """Rows were inserted or updated for a market"""
+    market: str
+    watermark: datetime  # latest stored timestamp after the write
+    first_timestamp: datetime  # earliest timestamp written (older data may have changed)
+    rows: pd.DataFrame  # timestamp, price of the rows written
+
+
+@dataclass
+class ModelTrained:
+    """A market's models were retrained and saved"""
+    market: str
+    model_dir: str
+
+
+_subscribers: Dict[str, List[Callable[[Any], None]]] = defaultdict(list)
+
+
+def subscribe(topic: str, handler: Callable[[Any], None]):
+    """Register a handler; handlers run synchronously in the publisher"""
+    if handler not in _subscribers[topic]:
+        _subscribers[topic].append(handler)
+
+
+def unsubscribe(topic: str, handler: Callable[[Any], None]):
+    if handler in _subscribers[topic]:
+        _subscribers[topic].remove(handler)
+
+
+def publish(topic: str, event: Any):
+    """Deliver an event; a failing handler never breaks ingestion"""
+    for handler in list(_subscribers[topic]):
+        try:
+            handler(event)
+        except Exception as e:
+            print(f"Event handler error ({topic}): {e}")
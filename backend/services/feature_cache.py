@@ -0,0 +1,88 @@
+"""
+Feature-matrix cache
+Computed feature matrices per market, so back-to-back requests over the
+same data (a dashboard load hits forecast and both signal endpoints) and
+repeated training runs don't recompute features
+"""
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+import os
+import threading
+
+from models.features import FeatureMatrix
+from services.events import subscribe, PRICES_INGESTED, PricesIngested
+
+FEATURE_CACHE_MB = int(os.getenv("FEATURE_CACHE_MB", "256"))
+
+
+class FeatureCache:
+    """
+    LRU of FeatureMatrix objects bounded by total bytes
+
+    Keys start with the market and include the feature version and the
+    data's last timestamp, so new prices or changed feature definitions
+    never hit a stale entry; ingests also drop the market's entries to
+    free their memory straight away.
+    """
+
+    def __init__(self, max_bytes: int = FEATURE_CACHE_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, FeatureMatrix]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def get(self, key: Hashable) -> Optional[FeatureMatrix]:
+        with self._lock:
+            matrix = self._entries.get(key)
+            if matrix is None:
+                self.counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.counters["hits"] += 1
+            return matrix
+
+    def put(self, key: Hashable, matrix: FeatureMatrix):
+        if matrix.nbytes > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key).nbytes
+            self._entries[key] = matrix
+            self._bytes += matrix.nbytes
+
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self.counters["evictions"] += 1
+
+    def invalidate(self, market: str):
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == market]:
+                self._bytes -= self._entries.pop(key).nbytes
+                self.counters["invalidations"] += 1
+
+    def on_prices_ingested(self, event: PricesIngested):
+        self.invalidate(event.market)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                **self.counters,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+_cache: Optional[FeatureCache] = None
+
+
+def get_feature_cache() -> FeatureCache:
+    """The process-wide cache, invalidated by every bulk ingest in this process"""
+    global _cache
+    if _cache is None:
+        _cache = FeatureCache()
+        subscribe(PRICES_INGESTED, _cache.on_prices_ingested)
+    return _cache
@@ -0,0 +1,242 @@
+"""
+Columnar price history store
+Parquet files partitioned by market and month, next to the SQLite database,
+for training and analytics reads that don't need row-by-row ORM access
+"""
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+import os
+import threading
+import time
+
+import pandas as pd
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+
+from services.database import MarketPrice, iter_prices
+from services.events import subscribe, PRICES_INGESTED, PricesIngested
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+HISTORY_STORE_DIR = os.getenv("HISTORY_STORE_DIR", "./data/history")
+HISTORY_STORE_ENABLED = os.getenv("HISTORY_STORE_ENABLED", "1") == "1"
+
+# Ingested rows are buffered and merged into the month files in batches,
+# so a live poll adding a few periods doesn't rewrite a whole month
+HISTORY_FLUSH_ROWS = int(os.getenv("HISTORY_FLUSH_ROWS", "5000"))
+HISTORY_FLUSH_SECONDS = float(os.getenv("HISTORY_FLUSH_SECONDS", "3600"))
+
+
+class HistoryStore:
+    """
+    Layout: <root>/market=<market>/month=<YYYY-MM>/prices.parquet
+
+    Each file holds one market-month sorted by timestamp. Reads push the
+    market, month and timestamp predicates down into pyarrow, so only the
+    needed partitions and row groups are decoded.
+
+    Ingest events are buffered per market and flushed once flush_rows rows
+    or flush_seconds have accumulated; reads flush first, so they always
+    see everything this process has ingested.
+    """
+
+    def __init__(
+        self,
+        root: str = HISTORY_STORE_DIR,
+        flush_rows: int = HISTORY_FLUSH_ROWS,
+        flush_seconds: float = HISTORY_FLUSH_SECONDS
+    ):
+        if not PYARROW_AVAILABLE:
+            raise RuntimeError("pyarrow is required for the history store")
+
+        self.root = root
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.schema = pa.schema([
+            ("timestamp", pa.timestamp("us")),
+            ("price", pa.float64()),
+        ])
+        self._lock = threading.Lock()
+        self._pending: Dict[str, List[pd.DataFrame]] = {}
+        self._pending_since: Dict[str, float] = {}
+        self._pending_lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, market: str, month: str) -> str:
+        return os.path.join(self.root, f"market={market}", f"month={month}", "prices.parquet")
+
+    def write(self, market: str, rows: pd.DataFrame) -> int:
+        """Merge timestamp/price rows into the market's monthly files (last write wins)"""
+        if rows.empty:
+            return 0
+
+        rows = rows[["timestamp", "price"]]
+        months = rows["timestamp"].dt.strftime("%Y-%m")
+
+        with self._lock:
+            for month, part in rows.groupby(months, sort=False):
+                path = self._path(market, month)
+
+                if os.path.exists(path):
+                    existing = pq.read_table(path).to_pandas()
+                    part = pd.concat([existing, part], ignore_index=True)
+
+                part = part.drop_duplicates(subset="timestamp", keep="last").sort_values("timestamp")
+                table = pa.Table.from_pandas(part, schema=self.schema, preserve_index=False)
+
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.tmp"
+                pq.write_table(table, tmp_path)
+                os.replace(tmp_path, path)
+
+        return len(rows)
+
+    def append(self, market: str, rows: pd.DataFrame) -> int:
+        """Buffer rows for the next flush, flushing if the buffer is full or old"""
+        if rows.empty:
+            return 0
+
+        with self._pending_lock:
+            pending = self._pending.setdefault(market, [])
+            pending.append(rows[["timestamp", "price"]])
+            since = self._pending_since.setdefault(market, time.monotonic())
+            buffered = sum(len(part) for part in pending)
+
+        if buffered >= self.flush_rows or time.monotonic() - since >= self.flush_seconds:
+            self.flush(market)
+        return len(rows)
+
+    def flush(self, market: Optional[str] = None) -> int:
+        """Merge buffered rows into the month files (every market by default)"""
+        with self._pending_lock:
+            markets = [market] if market is not None else list(self._pending)
+            batches = [(m, self._pending.pop(m)) for m in markets if m in self._pending]
+            for m, _ in batches:
+                self._pending_since.pop(m, None)
+
+        written = 0
+        for m, parts in batches:
+            written += self.write(m, pd.concat(parts, ignore_index=True))
+        return written
+
+    def read(
+        self,
+        market: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        columns: Sequence[str] = ("timestamp", "price")
+    ) -> pd.DataFrame:
+        """Ascending prices for a market in [start, end)"""
+        self.flush(market)
+        market_dir = os.path.join(self.root, f"market={market}")
+        if not os.path.isdir(market_dir):
+            return pd.DataFrame(columns=list(columns))
+
+        dataset = ds.dataset(market_dir, format="parquet", partitioning="hive")
+
+        predicate = None
+        if start is not None:
+            predicate = (ds.field("month") >= start.strftime("%Y-%m")) & (ds.field("timestamp") >= start)
+        if end is not None:
+            upper = (ds.field("month") <= end.strftime("%Y-%m")) & (ds.field("timestamp") < end)
+            predicate = upper if predicate is None else predicate & upper
+
+        table = dataset.to_table(columns=list(columns), filter=predicate)
+        if "timestamp" in columns:
+            table = table.sort_by("timestamp")
+
+        # Hand Arrow buffers to pandas without an intermediate consolidation copy
+        return table.to_pandas(split_blocks=True, self_destruct=True)
+
+    def count(self, market: str) -> int:
+        self.flush(market)
+        market_dir = os.path.join(self.root, f"market={market}")
+        if not os.path.isdir(market_dir):
+            return 0
+        return ds.dataset(market_dir, format="parquet", partitioning="hive").count_rows()
+
+    def latest(self, market: str) -> Optional[datetime]:
+        """Newest stored timestamp for a market, read from the last month's file"""
+        self.flush(market)
+        market_dir = os.path.join(self.root, f"market={market}")
+        if not os.path.isdir(market_dir):
+            return None
+
+        months = sorted(name for name in os.listdir(market_dir) if name.startswith("month="))
+        if not months:
+            return None
+        last = pq.read_table(self._path(market, months[-1][len("month="):]), columns=["timestamp"])
+        return pd.Timestamp(last.column("timestamp")[-1].as_py()).to_pydatetime()
+
+    def _db_extent(self, db: Session, market: str) -> Tuple[int, Optional[datetime]]:
+        return db.execute(
+            select(func.count(), func.max(MarketPrice.timestamp)).where(MarketPrice.market == market)
+        ).one()
+
+    def is_current(self, db: Session, market: str) -> bool:
+        """Whether the store holds as many rows as the database, up to the same timestamp"""
+        db_count, db_latest = self._db_extent(db, market)
+        return self.count(market) == db_count and self.latest(market) == db_latest
+
+    def rebuild_from_db(self, db: Session, market: str, chunk_size: int = 50000) -> int:
+        """Copy a market's rows from the database, streaming in chunks"""
+        written = 0
+        for chunk in iter_prices(db, market, chunk_size=chunk_size):
+            written += self.write(market, chunk)
+        return written
+
+    def sync_from_db(self, db: Session, market: str) -> int:
+        """
+        Bring a market up to date with the database
+
+        Rows newer than the store's latest timestamp are copied over; if
+        that doesn't account for the difference (a backfilled gap, say) the
+        market is rebuilt.
+        """
+        db_count, db_latest = self._db_extent(db, market)
+        stored = self.count(market)
+        latest = self.latest(market)
+        if stored >= db_count and latest == db_latest:
+            return 0
+
+        if latest is not None:
+            newer = db.execute(
+                select(func.count()).where(MarketPrice.market == market, MarketPrice.timestamp > latest)
+            ).scalar()
+            if stored + newer == db_count:
+                copied = 0
+                for chunk in iter_prices(db, market, start=latest + pd.Timedelta(microseconds=1)):
+                    copied += self.write(market, chunk)
+                return copied
+
+        return self.rebuild_from_db(db, market)
+
+    def on_prices_ingested(self, event: PricesIngested):
+        self.append(event.market, event.rows)
+
+
+_store: Optional[HistoryStore] = None
+
+
+def get_history_store() -> Optional[HistoryStore]:
+    """The process-wide store, or None if disabled or pyarrow is missing"""
+    global _store
+    if not (HISTORY_STORE_ENABLED and PYARROW_AVAILABLE):
+        return None
+    if _store is None:
+        _store = HistoryStore(HISTORY_STORE_DIR)
+    return _store
+
+
+def attach_history_store() -> Optional[HistoryStore]:
+    """Keep the store in sync with every bulk ingest in this process"""
+    store = get_history_store()
+    if store is not None:
+        subscribe(PRICES_INGESTED, store.on_prices_ingested)
+    return store
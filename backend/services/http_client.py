@@ -0,0 +1,110 @@
+"""
+Shared pooled HTTP client for upstream market data sources
+One keep-alive connection pool per process instead of a new client per request
+"""
+from typing import Optional, Dict
+import os
+
+import httpx
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "120"))
+
+DEFAULT_TIMEOUT = httpx.Timeout(30.0, connect=10.0)
+
+# Per-host timeouts; BMRS range queries can be slow to respond
+HOST_TIMEOUTS = {
+    "data.elexon.co.uk": httpx.Timeout(60.0, connect=10.0),
+    "api.bmreports.com": httpx.Timeout(30.0, connect=10.0),
+    "www.nordpoolgroup.com": httpx.Timeout(30.0, connect=10.0),
+    "data.nationalgas.com": httpx.Timeout(60.0, connect=10.0),
+}
+
+
+class PooledHTTPClient:
+    """
+    httpx.AsyncClient with tuned pool limits, per-host timeouts and
+    connection counters, shared by all upstream clients
+    """
+
+    def __init__(
+        self,
+        max_connections: int = HTTP_MAX_CONNECTIONS,
+        max_keepalive: int = HTTP_MAX_KEEPALIVE,
+        keepalive_expiry: float = HTTP_KEEPALIVE_EXPIRY,
+        host_timeouts: Optional[Dict[str, httpx.Timeout]] = None
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.host_timeouts = dict(HOST_TIMEOUTS if host_timeouts is None else host_timeouts)
+        self.client = httpx.AsyncClient(
+            limits=self.limits,
+            timeout=DEFAULT_TIMEOUT,
+            headers={"User-Agent": "LobsterEnergy/1.0"}
+        )
+        self.counters = {"requests": 0, "tcp_connects": 0, "tls_handshakes": 0}
+
+    async def _trace(self, event_name: str, info: Dict):
+        # httpcore trace events fire once per new connection, never on reuse
+        if event_name == "connection.connect_tcp.complete":
+            self.counters["tcp_connects"] += 1
+        elif event_name == "connection.start_tls.complete":
+            self.counters["tls_handshakes"] += 1
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        host = httpx.URL(url).host
+        kwargs.setdefault("timeout", self.host_timeouts.get(host, DEFAULT_TIMEOUT))
+        extensions = dict(kwargs.pop("extensions", None) or {})
+        extensions["trace"] = self._trace
+
+        self.counters["requests"] += 1
+        return await self.client.get(url, extensions=extensions, **kwargs)
+
+    def stats(self) -> Dict:
+        """Pool occupancy and connection reuse counters"""
+        pool = getattr(getattr(self.client, "_transport", None), "_pool", None)
+        connections = list(getattr(pool, "connections", []))
+        idle = sum(1 for c in connections if c.is_idle())
+
+        requests = self.counters["requests"]
+        connects = self.counters["tcp_connects"]
+
+        return {
+            **self.counters,
+            "connections_open": len(connections),
+            "connections_idle": idle,
+            "connections_active": len(connections) - idle,
+            "reuse_ratio": round(1 - connects / requests, 3) if requests else None,
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+        }
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+_shared_client: Optional[PooledHTTPClient] = None
+
+
+async def open_http_client() -> PooledHTTPClient:
+    """Create the process-wide client (called from the FastAPI lifespan)"""
+    global _shared_client
+    if _shared_client is None:
+        _shared_client = PooledHTTPClient()
+    return _shared_client
+
+
+async def close_http_client():
+    global _shared_client
+    if _shared_client is not None:
+        await _shared_client.aclose()
+        _shared_client = None
+
+
+def get_http_client() -> Optional[PooledHTTPClient]:
+    """The shared client, or None outside the API process (e.g. scripts)"""
+    return _shared_client
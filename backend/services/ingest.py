@@ -0,0 +1,176 @@
+"""
+Bulk ingestion of market price DataFrames
+Batched INSERT ... ON CONFLICT instead of one existence query per row
+"""
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Optional, Dict
+import os
+
+import pandas as pd
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+
+from services.database import MarketPrice
+from services.rollups import update_rollups
+from services.events import publish, PRICES_INGESTED, PricesIngested
+
+INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", "500"))
+
+PRICE_COLUMNS = ["market", "timestamp", "price", "product", "unit", "source"]
+
+
+@dataclass
+class IngestResult:
+    """Row counts from a bulk ingest"""
+    inserted: int = 0
+    updated: int = 0
+    skipped: int = 0
+
+    def __iadd__(self, other: "IngestResult") -> "IngestResult":
+        self.inserted += other.inserted
+        self.updated += other.updated
+        self.skipped += other.skipped
+        return self
+
+    def as_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+def _insert_for(db: Session):
+    """Dialect-specific INSERT construct that supports ON CONFLICT"""
+    dialect = db.get_bind().dialect.name
+
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        raise ValueError(f"Bulk ingest not supported for {dialect} databases")
+
+    return insert
+
+
+def normalize_price_frame(
+    df: pd.DataFrame,
+    market: Optional[str] = None,
+    unit: str = "GBP/MWh",
+    source: str = "bmrs"
+) -> pd.DataFrame:
+    """
+    Shape a fetcher DataFrame into market_prices rows
+
+    Timestamps become naive UTC (how they are stored), missing columns get
+    defaults, rows without a positive price are dropped and duplicate
+    (market, timestamp) pairs keep the last value.
+    """
+    frame = pd.DataFrame(index=df.index)
+
+    timestamps = pd.to_datetime(df["timestamp"])
+    if timestamps.dt.tz is not None:
+        timestamps = timestamps.dt.tz_convert("UTC").dt.tz_localize(None)
+    frame["timestamp"] = timestamps
+
+    frame["market"] = df["market"] if "market" in df else market
+    frame["price"] = pd.to_numeric(df["price"], errors="coerce")
+    frame["product"] = df["product"] if "product" in df else None
+    frame["unit"] = df["unit"].fillna(unit) if "unit" in df else unit
+    frame["source"] = df["source"].fillna(source) if "source" in df else source
+
+    frame = frame[frame["timestamp"].notna() & frame["market"].notna() & (frame["price"] > 0)]
+    frame = frame.drop_duplicates(subset=["market", "timestamp"], keep="last")
+    return frame.sort_values(["market", "timestamp"])[PRICE_COLUMNS]
+
+
+def bulk_upsert_prices(
+    db: Session,
+    df: pd.DataFrame,
+    update_existing: bool = False,
+    chunk_size: Optional[int] = None,
+    market: Optional[str] = None
+) -> IngestResult:
+    """
+    Write a price DataFrame to market_prices in batches
+
+    Each chunk is one batched INSERT ... ON CONFLICT DO NOTHING, whose
+    RETURNING keys are the rows inserted. Existing rows are left alone
+    unless update_existing is set, in which case a second batched upsert
+    overwrites the ones whose price changed (its RETURNING keys are the
+    rows updated). No existence query is run. Commits after every chunk
+    so partial progress survives. Publishes a PricesIngested event per
+    market that had rows written.
+    """
+    result = IngestResult()
+    if df is None or df.empty:
+        return result
+
+    frame = normalize_price_frame(df, market=market)
+    result.skipped += len(df) - len(frame)
+
+    # Statements are built once and executed per chunk as batched executemanys
+    table = MarketPrice.__table__
+    insert = _insert_for(db)
+    insert_new = (
+        insert(table)
+        .on_conflict_do_nothing(index_elements=["market", "timestamp"])
+        .returning(table.c.market, table.c.timestamp)
+    )
+    update_changed = insert(table)
+    update_changed = update_changed.on_conflict_do_update(
+        index_elements=["market", "timestamp"],
+        set_={
+            "price": update_changed.excluded.price,
+            "product": update_changed.excluded.product,
+            "unit": update_changed.excluded.unit,
+            "source": update_changed.excluded.source,
+        },
+        where=table.c.price != update_changed.excluded.price
+    ).returning(table.c.market, table.c.timestamp)
+
+    chunk_size = chunk_size or INGEST_CHUNK_SIZE
+    written = []
+
+    for offset in range(0, len(frame), chunk_size):
+        chunk = frame.iloc[offset:offset + chunk_size]
+        rows = chunk.astype(object).where(chunk.notna(), None).to_dict("records")
+        for row in rows:
+            row["timestamp"] = row["timestamp"].to_pydatetime()
+
+        inserted = set(map(tuple, db.execute(insert_new, rows).all()))
+        updated = set()
+        if update_existing and len(inserted) < len(rows):
+            existing = [r for r in rows if (r["market"], r["timestamp"]) not in inserted]
+            updated = set(map(tuple, db.execute(update_changed, existing).all()))
+        db.commit()
+
+        result.inserted += len(inserted)
+        result.updated += len(updated)
+        result.skipped += len(rows) - len(inserted) - len(updated)
+        changed = inserted | updated
+        written.extend(r for r in rows if (r["market"], r["timestamp"]) in changed)
+
+    if written:
+        written = pd.DataFrame(written, columns=PRICE_COLUMNS)
+        for market, rows in written.groupby("market", sort=False):
+            update_rollups(db, market, rows["timestamp"].dt.to_pydatetime())
+        _publish_written(db, written)
+
+    return result
+
+
+def get_watermark(db: Session, market: str) -> Optional[datetime]:
+    """Latest stored timestamp for a market (answered from the index)"""
+    return db.execute(
+        select(func.max(MarketPrice.timestamp)).where(MarketPrice.market == market)
+    ).scalar()
+
+
+def _publish_written(db: Session, written: pd.DataFrame):
+    for market, rows in written.groupby("market", sort=False):
+        rows = rows[["timestamp", "price"]].sort_values("timestamp").reset_index(drop=True)
+        publish(PRICES_INGESTED, PricesIngested(
+            market=market,
+            watermark=get_watermark(db, market),
+            first_timestamp=rows["timestamp"].iloc[0],
+            rows=rows
+        ))
@@ -8,6 +8,9 @@ from datetime import datetime, timedelta
 from typing import Optional
 import json
 
+from services.http_client import PooledHTTPClient, get_http_client
+from services.response_cache import ResponseCache, CacheMiss, get_response_cache
+
 
 class NordpoolClient:
     """Client for fetching Nordpool/N2EX market data"""
@@ -21,8 +24,41 @@ class NordpoolClient:
         "gas_uk": 328,           # UK Gas prices (NBP)
     }
     
-    def __init__(self):
-        self.client = httpx.AsyncClient(timeout=30.0)
+    def __init__(
+        self,
+        http: Optional[PooledHTTPClient] = None,
+        cache: Optional[ResponseCache] = None
+    ):
+        # Use the app-wide pooled client when one is running
+        shared = http or get_http_client()
+        self._owns_client = shared is None
+        self.client = shared or httpx.AsyncClient(timeout=30.0)
+        self.cache = cache or get_response_cache()
+    
+    async def _get_json(
+        self,
+        url: str,
+        params: dict,
+        data_end: Optional[datetime] = None
+    ) -> Optional[dict]:
+        """GET via the response cache when enabled, None on non-200"""
+        if self.cache is not None:
+            try:
+                cached = self.cache.get(url, params)
+            except CacheMiss as e:
+                print(f"Nordpool replay miss: {e}")
+                return None
+            if cached is not None:
+                return cached
+        
+        response = await self.client.get(url, params=params)
+        if response.status_code != 200:
+            return None
+        
+        data = response.json()
+        if self.cache is not None:
+            self.cache.put(url, params, data, data_end)
+        return data
     
     async def fetch_dayahead_prices(
         self, 
@@ -45,9 +81,8 @@ class NordpoolClient:
                     "endDate": current.strftime("%d-%m-%Y"),
                 }
                 
-                response = await self.client.get(url, params=params)
-                if response.status_code == 200:
-                    data = response.json()
+                data = await self._get_json(url, params, data_end=current)
+                if data is not None:
                     parsed = self._parse_nordpool_response(data)
                     all_data.extend(parsed)
             except Exception as e:
@@ -110,10 +145,9 @@ class NordpoolClient:
         """Get latest prices for all markets"""
         try:
             url = f"{self.BASE_URL}/{self.PAGES['uk_dayahead']}"
-            response = await self.client.get(url, params={"currency": "GBP"})
+            data = await self._get_json(url, {"currency": "GBP"})
             
-            if response.status_code == 200:
-                data = response.json()
+            if data is not None:
                 # Get the most recent price
                 rows = data.get('data', {}).get('Rows', [])
                 for row in rows:
@@ -133,7 +167,8 @@ class NordpoolClient:
         return {}
     
     async def close(self):
-        await self.client.aclose()
+        if self._owns_client:
+            await self.client.aclose()
 
 
 # Alternative: BMRS (Balancing Mechanism Reporting Service) - Free UK data
@@ -145,9 +180,11 @@ class BMRSClient:
     
     BASE_URL = "https://api.bmreports.com/BMRS"
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, http: Optional[PooledHTTPClient] = None):
         self.api_key = api_key or "demo"  # Demo key available
-        self.client = httpx.AsyncClient(timeout=30.0)
+        shared = http or get_http_client()
+        self._owns_client = shared is None
+        self.client = shared or httpx.AsyncClient(timeout=30.0)
     
     async def fetch_system_price(
         self,
@@ -214,6 +251,10 @@ class BMRSClient:
             current += timedelta(days=1)
         
         return pd.DataFrame(records)
+    
+    async def close(self):
+        if self._owns_client:
+            await self.client.aclose()
 
 
 # Gas prices from ICE/NBP
@@ -0,0 +1,110 @@
+"""
+Process-wide predictor registry
+One EnergyPredictor per market, each with its own artifact directory,
+shared by every router and job and swapped when a new model version is
+published
+"""
+from datetime import datetime
+from typing import Dict, Optional
+import os
+import threading
+import time
+
+from models.artifacts import ArtifactStore
+from models.predictor import EnergyPredictor
+from services.events import subscribe, MODEL_TRAINED, ModelTrained
+from services.feature_cache import get_feature_cache
+
+MODEL_DIR = os.getenv("MODEL_DIR", "./saved_models")
+
+# How often a market's active version is re-checked on disk (models
+# published by this process are picked up immediately)
+MODEL_RELOAD_SECONDS = float(os.getenv("MODEL_RELOAD_SECONDS", "30"))
+
+
+class PredictorRegistry:
+    """
+    Serving predictors per market, loaded lazily from each market's active
+    artifact version
+
+    A new version is loaded into a fresh predictor and swapped in whole, so
+    a request holding the previous one keeps a consistent set of models.
+    Training never touches a serving predictor: jobs train their own
+    (see training_predictor) and publish, and the registry reloads.
+    """
+
+    def __init__(self, root: str = MODEL_DIR, reload_seconds: float = MODEL_RELOAD_SECONDS):
+        self.root = root
+        self.reload_seconds = reload_seconds
+        self._predictors: Dict[str, EnergyPredictor] = {}
+        self._checked: Dict[str, float] = {}
+        self._loaded_at: Dict[str, datetime] = {}
+        self._lock = threading.Lock()
+
+    def model_dir(self, market: str) -> str:
+        return os.path.join(self.root, market)
+
+    def _new_predictor(self, market: str) -> EnergyPredictor:
+        return EnergyPredictor(model_dir=self.model_dir(market), feature_cache=get_feature_cache())
+
+    def get(self, market: str) -> Optional[EnergyPredictor]:
+        """The market's serving predictor, or None while it has no model"""
+        predictor = self._predictors.get(market)
+        if predictor is None or time.monotonic() - self._checked.get(market, 0) >= self.reload_seconds:
+            predictor = self.refresh(market)
+        return predictor
+
+    def refresh(self, market: str) -> Optional[EnergyPredictor]:
+        """Load the market's active version if it isn't the one being served"""
+        with self._lock:
+            current = self._predictors.get(market)
+            self._checked[market] = time.monotonic()
+
+            version = ArtifactStore(self.model_dir(market)).active_version()
+            if version is None or (current is not None and current.version == version):
+                return current
+
+            predictor = self._new_predictor(market)
+            if not predictor.load_models(version):
+                return current
+
+            if current is not None:
+                # Rolling feature state depends on the data, not the model
+                predictor.feature_engines = current.feature_engines
+                predictor.feature_lock = current.feature_lock
+            self._predictors[market] = predictor
+            self._loaded_at[market] = datetime.utcnow()
+            print(f"Serving {market} model version {version}")
+            return predictor
+
+    def training_predictor(self, market: str) -> EnergyPredictor:
+        """A private predictor for a training job, holding the active version if any"""
+        predictor = self._new_predictor(market)
+        predictor.load_models()
+        return predictor
+
+    def on_model_trained(self, event: ModelTrained):
+        self.refresh(event.market)
+
+    def status(self) -> Dict[str, Dict]:
+        return {
+            market: {
+                "version": predictor.version,
+                "loaded_at": self._loaded_at[market].isoformat(),
+                "data": predictor.data_range,
+                "backends": {slot: spec.backend for slot, spec in predictor.model_specs.items()},
+            }
+            for market, predictor in self._predictors.items()
+        }
+
+
+_registry: Optional[PredictorRegistry] = None
+
+
+def get_predictor_registry() -> PredictorRegistry:
+    """The process-wide registry, reloading whenever a model is trained here"""
+    global _registry
+    if _registry is None:
+        _registry = PredictorRegistry()
+        subscribe(MODEL_TRAINED, _registry.on_model_trained)
+    return _registry
@@ -0,0 +1,151 @@
+"""
+Hot in-memory price window
+The last N days of prices per market as contiguous NumPy arrays, loaded
+once and extended from ingest events, so read endpoints skip the database
+"""
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from services.database import load_prices
+from services.events import subscribe, PRICES_INGESTED, PricesIngested
+
+PRICE_WINDOW_DAYS = int(os.getenv("PRICE_WINDOW_DAYS", "365"))
+
+
+class _MarketWindow:
+    """Sorted timestamps/prices in the first `size` slots of growable buffers"""
+
+    def __init__(self, timestamps: np.ndarray, prices: np.ndarray):
+        self.timestamps = timestamps
+        self.prices = prices
+        self.size = len(timestamps)
+
+    def append(self, timestamps: np.ndarray, prices: np.ndarray, since: np.datetime64):
+        """Add rows later than everything held, regrowing (and trimming) when full"""
+        needed = self.size + len(timestamps)
+        if needed > len(self.timestamps):
+            # Fresh buffers: views already handed out keep pointing at the old ones
+            start = int(np.searchsorted(self.timestamps[:self.size], since, side="left"))
+            kept = self.size - start
+            capacity = max(2 * (kept + len(timestamps)), 1024)
+            self.timestamps = _grow(self.timestamps[start:self.size], capacity)
+            self.prices = _grow(self.prices[start:self.size], capacity)
+            self.size = kept
+            needed = kept + len(timestamps)
+
+        # Slots past `size` are not visible through any existing view
+        self.timestamps[self.size:needed] = timestamps
+        self.prices[self.size:needed] = prices
+        self.size = needed
+
+    def replace(self, timestamps: np.ndarray, prices: np.ndarray):
+        self.timestamps = timestamps
+        self.prices = prices
+        self.size = len(timestamps)
+
+
+def _grow(values: np.ndarray, capacity: int) -> np.ndarray:
+    grown = np.empty(capacity, dtype=values.dtype)
+    grown[:len(values)] = values
+    return grown
+
+
+def _read_only(values: np.ndarray) -> np.ndarray:
+    view = values.view()
+    view.flags.writeable = False
+    return view
+
+
+class PriceWindow:
+    """
+    Process-wide cache of recent prices per market
+
+    Markets load from the database on first use (or at startup via warm).
+    New rows arrive through PricesIngested events: rows after the latest
+    held timestamp are appended in place, anything older is merged. Rows
+    that age out of the window are dropped when the buffers are next
+    rebuilt. Readers get read-only views, so no request can mutate the
+    shared arrays.
+    """
+
+    def __init__(self, days: int = PRICE_WINDOW_DAYS):
+        self.window = timedelta(days=days)
+        self._markets: Dict[str, _MarketWindow] = {}
+        self._lock = threading.Lock()
+
+    def loaded(self, market: str) -> bool:
+        return market in self._markets
+
+    def load(self, db: Session, market: str) -> int:
+        """(Re)load a market's window from the database"""
+        prices = load_prices(db, market, start=datetime.utcnow() - self.window)
+
+        with self._lock:
+            self._markets[market] = _MarketWindow(
+                prices["timestamp"].to_numpy(), prices["price"].to_numpy()
+            )
+        return len(prices)
+
+    def arrays(self, market: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Read-only (timestamps, prices) views for the window ending now"""
+        since = np.datetime64(datetime.utcnow() - self.window, "ns")
+
+        with self._lock:
+            window = self._markets.get(market)
+            if window is None:
+                raise KeyError(f"{market} is not loaded")
+            timestamps = window.timestamps[:window.size]
+            prices = window.prices[:window.size]
+
+        start = int(np.searchsorted(timestamps, since, side="left"))
+        return _read_only(timestamps[start:]), _read_only(prices[start:])
+
+    def frame(self, market: str) -> pd.DataFrame:
+        """Ascending timestamp/price/market frame, as the models expect"""
+        timestamps, prices = self.arrays(market)
+        return pd.DataFrame({"timestamp": timestamps, "price": prices, "market": market})
+
+    def on_prices_ingested(self, event: PricesIngested):
+        timestamps = event.rows["timestamp"].to_numpy(dtype="datetime64[ns]")
+        prices = event.rows["price"].to_numpy(dtype=np.float64)
+
+        since = np.datetime64(datetime.utcnow() - self.window, "ns")
+
+        with self._lock:
+            window = self._markets.get(event.market)
+            if window is None:
+                return  # loads on first use
+
+            held = window.timestamps[:window.size]
+            if window.size == 0 or timestamps[0] > held[-1]:
+                window.append(timestamps, prices, since)
+                return
+
+            # Backfilled or rewritten rows: merge, later writes win
+            merged_ts = np.concatenate([held, timestamps])
+            merged_prices = np.concatenate([window.prices[:window.size], prices])
+
+            order = np.argsort(merged_ts, kind="stable")
+            merged_ts, merged_prices = merged_ts[order], merged_prices[order]
+            last = np.append(merged_ts[1:] != merged_ts[:-1], True)
+            keep = last & (merged_ts >= since)
+
+            window.replace(merged_ts[keep], merged_prices[keep])
+
+
+_window: Optional[PriceWindow] = None
+
+
+def get_price_window() -> PriceWindow:
+    """The process-wide window, following every bulk ingest in this process"""
+    global _window
+    if _window is None:
+        _window = PriceWindow()
+        subscribe(PRICES_INGESTED, _window.on_prices_ingested)
+    return _window
@@ -0,0 +1,275 @@
+"""
+Non-blocking data access for async route handlers
+
+Repository functions are plain synchronous queries taking a Session.
+Handlers call them through run_db, which runs them on a worker thread
+with their own session, bounded by the size of the connection pool,
+so a slow query never stalls the event loop.
+"""
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, TypeVar
+
+import anyio
+import numpy as np
+import pandas as pd
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+
+from services.database import (
+    SessionLocal, MarketPrice, Prediction, Signal, DB_POOL_SIZE, DB_MAX_OVERFLOW, load_prices
+)
+from services.ingest import get_watermark
+from services.downsample import lttb, chart_cache, CHART_LTTB_SOURCE_FACTOR
+from services.price_window import get_price_window
+from services.rollups import (
+    pick_resolution, finest_resolution_within, rollup_points, rollup_stats, raw_stats,
+    CHART_MIN_POINTS, SUMMARY_MIN_BUCKETS
+)
+
+T = TypeVar("T")
+
+_limiter: Optional[anyio.CapacityLimiter] = None
+
+
+def _get_limiter() -> anyio.CapacityLimiter:
+    # One worker per pooled connection; more would just queue on the pool
+    global _limiter
+    if _limiter is None:
+        _limiter = anyio.CapacityLimiter(DB_POOL_SIZE + DB_MAX_OVERFLOW)
+    return _limiter
+
+
+async def run_db(fn: Callable[..., T], *args, **kwargs) -> T:
+    """Run fn(db, *args, **kwargs) in a worker thread with its own session"""
+    def call() -> T:
+        db = SessionLocal()
+        try:
+            return fn(db, *args, **kwargs)
+        finally:
+            db.close()
+
+    return await anyio.to_thread.run_sync(call, limiter=_get_limiter())
+
+
+# Market prices
+
+async def recent_price_history(market: str) -> pd.DataFrame:
+    """
+    The hot price window for a market as a model-ready frame
+
+    Only the first request for a market (or one before startup warming
+    finished) reads the database.
+    """
+    window = get_price_window()
+    if not window.loaded(market):
+        await run_db(window.load, market)
+    return window.frame(market)
+
+
+def fetch_prices(
+    db: Session,
+    market: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = 1000
+) -> List[Dict]:
+    """Newest-first prices for the /prices endpoint"""
+    query = db.query(MarketPrice).filter(MarketPrice.market == market)
+
+    if start:
+        query = query.filter(MarketPrice.timestamp >= start)
+    if end:
+        query = query.filter(MarketPrice.timestamp <= end)
+
+    prices = query.order_by(MarketPrice.timestamp.desc()).limit(limit).all()
+
+    return [
+        {
+            "timestamp": p.timestamp.isoformat(),
+            "price": p.price,
+            "unit": p.unit,
+            "product": p.product
+        }
+        for p in prices
+    ]
+
+
+def price_stats(db: Session, market: str, since: datetime) -> Optional[Dict]:
+    """min/max/avg/count of prices since a point in time"""
+    resolution = pick_resolution(datetime.utcnow() - since, SUMMARY_MIN_BUCKETS)
+    if resolution:
+        stats = rollup_stats(db, market, since, resolution)
+        if stats:
+            return stats
+
+    # Short windows, or rollups not built yet
+    return raw_stats(db, market, since)
+
+
+def chart_points(db: Session, market: str, since: datetime) -> Dict:
+    """Points from the coarsest rollup that still fills a chart, or raw rows"""
+    resolution = pick_resolution(datetime.utcnow() - since, CHART_MIN_POINTS)
+    if resolution:
+        points = rollup_points(db, market, resolution, since)
+        if points:
+            return {"resolution": resolution, "data": points}
+
+    prices = db.query(MarketPrice).filter(
+        MarketPrice.market == market,
+        MarketPrice.timestamp >= since
+    ).order_by(MarketPrice.timestamp.asc()).all()
+
+    return {"resolution": "raw", "data": [{"x": p.timestamp.isoformat(), "y": p.price} for p in prices]}
+
+
+def downsampled_chart(
+    db: Session,
+    market: str,
+    period: str,
+    since: datetime,
+    max_points: int
+) -> Dict:
+    """
+    Prices since a point in time reduced to max_points with LTTB, cached per watermark
+
+    LTTB reads raw rows while there are at most CHART_LTTB_SOURCE_FACTOR
+    times max_points of them. Wider windows are reduced from the finest
+    rollup within that budget, keeping its OHLC fields, so a 5Y chart
+    never loads every raw row.
+    """
+    key = (market, period, max_points, get_watermark(db, market))
+    cached = chart_cache.get(key)
+    if cached is not None:
+        return cached
+
+    source_points = db.execute(
+        select(func.count()).where(MarketPrice.market == market, MarketPrice.timestamp >= since)
+    ).scalar()
+    budget = max_points * CHART_LTTB_SOURCE_FACTOR
+
+    chart = None
+    if source_points > budget:
+        resolution = finest_resolution_within(datetime.utcnow() - since, budget) or "week"
+        points = rollup_points(db, market, resolution, since)
+        if points:
+            buckets = pd.DatetimeIndex([p["x"] for p in points])
+            keep = lttb(buckets.asi8, np.array([p["y"] for p in points]), max_points)
+            chart = {
+                "resolution": "lttb" if len(keep) < len(points) else resolution,
+                "source_resolution": resolution,
+                "source_points": len(points),
+                "data": [points[i] for i in keep]
+            }
+
+    if chart is None:
+        frame = load_prices(db, market, start=since)
+        timestamps = pd.DatetimeIndex(frame["timestamp"])
+        prices = frame["price"].to_numpy()
+        keep = lttb(timestamps.asi8, prices, max_points)
+
+        chart = {
+            "resolution": "lttb" if len(keep) < len(frame) else "raw",
+            "source_resolution": "raw",
+            "source_points": len(frame),
+            "data": [
+                {"x": timestamps[i].isoformat(), "y": float(prices[i])}
+                for i in keep
+            ]
+        }
+    chart_cache.put(key, chart)
+    return chart
+
+
+def load_price_history(
+    db: Session,
+    market: str,
+    since: Optional[datetime] = None
+) -> pd.DataFrame:
+    """Ascending timestamp/price/market frame for models"""
+    return load_prices(db, market, start=since, columns=("timestamp", "price", "market"))
+
+
+def dashboard_snapshot(db: Session, markets: List[str]) -> Dict:
+    """Latest week of prices plus latest signal per market"""
+    dashboard = {}
+
+    for market in markets:
+        prices = db.query(MarketPrice).filter(
+            MarketPrice.market == market
+        ).order_by(MarketPrice.timestamp.desc()).limit(168).all()  # Last week
+
+        if prices:
+            current = prices[0].price
+            day_ago = prices[24].price if len(prices) > 24 else current
+            week_ago = prices[-1].price if prices else current
+
+            dashboard[market] = {
+                "current_price": current,
+                "change_24h": ((current - day_ago) / day_ago * 100) if day_ago else 0,
+                "change_7d": ((current - week_ago) / week_ago * 100) if week_ago else 0,
+                "min_7d": min(p.price for p in prices),
+                "max_7d": max(p.price for p in prices),
+                "unit": prices[0].unit
+            }
+
+    # Latest signal for each market
+    for market in markets:
+        latest_signal = db.query(Signal).filter(
+            Signal.market == market
+        ).order_by(Signal.created_at.desc()).first()
+
+        if latest_signal and market in dashboard:
+            dashboard[market]['signal'] = {
+                "type": latest_signal.signal_type,
+                "strength": latest_signal.strength,
+                "reason": latest_signal.reason
+            }
+
+    return dashboard
+
+
+# Predictions and signals
+
+def save_records(db: Session, *records) -> List[int]:
+    """Insert records in one transaction, returning their ids"""
+    db.add_all(records)
+    db.commit()
+    return [r.id for r in records]
+
+
+def prediction_history(db: Session, market: str, limit: int) -> List[Dict]:
+    predictions = db.query(Prediction).filter(
+        Prediction.market == market
+    ).order_by(Prediction.created_at.desc()).limit(limit).all()
+
+    return [
+        {
+            "id": p.id,
+            "created_at": p.created_at.isoformat(),
+            "target_date": p.target_date.isoformat(),
+            "predicted_price": p.predicted_price,
+            "confidence": p.confidence,
+            "lower_bound": p.lower_bound,
+            "upper_bound": p.upper_bound
+        }
+        for p in predictions
+    ]
+
+
+def signal_history(db: Session, market: str, limit: int) -> List[Dict]:
+    signals = db.query(Signal).filter(
+        Signal.market == market
+    ).order_by(Signal.created_at.desc()).limit(limit).all()
+
+    return [
+        {
+            "id": s.id,
+            "created_at": s.created_at.isoformat(),
+            "signal_type": s.signal_type,
+            "strength": s.strength,
+            "reason": s.reason,
+            "current_price": s.current_price,
+            "target_price": s.target_price
+        }
+        for s in signals
+    ]
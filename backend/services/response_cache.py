@@ -0,0 +1,129 @@
+"""
+Content-addressed on-disk cache for upstream market data responses
+
+Settled market data never changes, so responses whose data window is older
+than the finality window are kept forever; recent ones get a short TTL.
+Replay mode serves everything from disk and never touches the network.
+"""
+from datetime import datetime, timedelta
+from typing import Optional, Dict
+import gzip
+import hashlib
+import json
+import os
+import time
+
+MARKET_CACHE_MODE = os.getenv("MARKET_CACHE_MODE", "off")  # off, on, replay
+MARKET_CACHE_DIR = os.getenv("MARKET_CACHE_DIR", "./data/response_cache")
+MARKET_CACHE_FINALITY_DAYS = int(os.getenv("MARKET_CACHE_FINALITY_DAYS", "3"))
+MARKET_CACHE_RECENT_TTL = int(os.getenv("MARKET_CACHE_RECENT_TTL", "300"))  # seconds
+
+CACHE_MODES = ("off", "on", "replay")
+
+
+class CacheMiss(LookupError):
+    """Raised in replay mode when a response was never recorded"""
+
+
+class ResponseCache:
+    """
+    JSON responses stored under the SHA-256 of (endpoint, normalized params)
+    """
+
+    def __init__(
+        self,
+        root: str = MARKET_CACHE_DIR,
+        mode: str = "on",
+        finality_days: int = MARKET_CACHE_FINALITY_DAYS,
+        recent_ttl: int = MARKET_CACHE_RECENT_TTL
+    ):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Invalid cache mode {mode!r}. Use: {list(CACHE_MODES)}")
+
+        self.root = root
+        self.mode = mode
+        self.finality = timedelta(days=finality_days)
+        self.recent_ttl = recent_ttl
+        self.stats = {"hits": 0, "misses": 0, "stale": 0, "writes": 0}
+
+    @property
+    def replay(self) -> bool:
+        return self.mode == "replay"
+
+    @staticmethod
+    def key(url: str, params: Optional[Dict] = None) -> str:
+        """Content address for a request: parameter order and types don't matter"""
+        normalized = {str(k): str(v) for k, v in (params or {}).items() if v is not None}
+        blob = json.dumps({"url": url.rstrip("/"), "params": normalized}, sort_keys=True)
+        return hashlib.sha256(blob.encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.json.gz")
+
+    def get(self, url: str, params: Optional[Dict] = None) -> Optional[Dict]:
+        """Cached payload, or None if absent/expired (CacheMiss in replay mode)"""
+        path = self._path(self.key(url, params))
+
+        try:
+            with gzip.open(path, "rt") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError, OSError):
+            self.stats["misses"] += 1
+            if self.replay:
+                raise CacheMiss(f"No recorded response for {url} {params}")
+            return None
+
+        if not self.replay and not entry["final"]:
+            if time.time() - entry["fetched_at"] > self.recent_ttl:
+                self.stats["stale"] += 1
+                return None
+
+        self.stats["hits"] += 1
+        return entry["payload"]
+
+    def put(
+        self,
+        url: str,
+        params: Optional[Dict],
+        payload: Dict,
+        data_end: Optional[datetime] = None
+    ):
+        """
+        Store a response; data_end is the end of the period it covers and
+        decides whether it is final (unknown counts as recent)
+        """
+        if self.replay:
+            return
+
+        final = data_end is not None and data_end < datetime.now() - self.finality
+        key = self.key(url, params)
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        entry = {
+            "url": url,
+            "params": params,
+            "fetched_at": time.time(),
+            "final": final,
+            "payload": payload,
+        }
+
+        # Write then rename so readers never see a partial file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with gzip.open(tmp_path, "wt") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+        self.stats["writes"] += 1
+
+
+_default_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Cache configured by MARKET_CACHE_MODE, or None when caching is off"""
+    global _default_cache
+    if MARKET_CACHE_MODE == "off":
+        return None
+    if _default_cache is None:
+        _default_cache = ResponseCache(MARKET_CACHE_DIR, mode=MARKET_CACHE_MODE)
+    return _default_cache
@@ -0,0 +1,238 @@
+"""
+OHLC rollups of market prices
+Hourly, daily and weekly open/high/low/close/mean/count per market, kept
+current by the ingest path so charts and summaries never scan raw rows
+"""
+from datetime import datetime, timedelta
+from typing import Optional, Dict, List, Iterable, Tuple
+import os
+
+import pandas as pd
+from sqlalchemy import select, delete, insert, func
+from sqlalchemy.orm import Session
+
+from services.database import MarketPrice, PriceRollup, load_prices
+
+# Finest to coarsest; hours and days nest inside Monday-aligned weeks
+ROLLUP_RESOLUTIONS = {
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+    "week": timedelta(weeks=1),
+}
+
+# A chart period uses the coarsest rollup that still gives this many points
+CHART_MIN_POINTS = int(os.getenv("CHART_MIN_POINTS", "200"))
+
+# A summary window uses the coarsest rollup with at least this many buckets
+SUMMARY_MIN_BUCKETS = 7
+
+ROLLUP_COLUMNS = ["bucket", "open", "high", "low", "close", "mean", "count"]
+
+
+def bucket_starts(timestamps: pd.Series, resolution: str) -> pd.Series:
+    """Start of the rollup period each timestamp falls in"""
+    if resolution == "hour":
+        return timestamps.dt.floor("h")
+    days = timestamps.dt.normalize()
+    if resolution == "day":
+        return days
+    return days - pd.to_timedelta(days.dt.weekday, unit="D")
+
+
+def floor_bucket(dt: datetime, resolution: str) -> datetime:
+    if resolution == "hour":
+        return dt.replace(minute=0, second=0, microsecond=0)
+    day = dt.replace(hour=0, minute=0, second=0, microsecond=0)
+    if resolution == "day":
+        return day
+    return day - timedelta(days=day.weekday())
+
+
+def ceil_bucket(dt: datetime, resolution: str) -> datetime:
+    floor = floor_bucket(dt, resolution)
+    return floor if floor == dt else floor + ROLLUP_RESOLUTIONS[resolution]
+
+
+def aggregate(prices: pd.DataFrame, resolution: str) -> pd.DataFrame:
+    """Rollup rows for timestamp-sorted timestamp/price rows"""
+    buckets = bucket_starts(prices["timestamp"], resolution).rename("bucket")
+    grouped = prices["price"].groupby(buckets, sort=True)
+
+    return pd.DataFrame({
+        "open": grouped.first(),
+        "high": grouped.max(),
+        "low": grouped.min(),
+        "close": grouped.last(),
+        "mean": grouped.mean(),
+        "count": grouped.count(),
+    }).reset_index()[ROLLUP_COLUMNS]
+
+
+def pick_resolution(span: timedelta, min_buckets: int) -> Optional[str]:
+    """Coarsest rollup giving at least min_buckets over span (None: use raw rows)"""
+    for resolution in reversed(list(ROLLUP_RESOLUTIONS)):
+        if span / ROLLUP_RESOLUTIONS[resolution] >= min_buckets:
+            return resolution
+    return None
+
+
+def finest_resolution_within(span: timedelta, max_buckets: int) -> Optional[str]:
+    """Finest rollup giving at most max_buckets over span (None: even weeks are too many)"""
+    for resolution, width in ROLLUP_RESOLUTIONS.items():
+        if span / width <= max_buckets:
+            return resolution
+    return None
+
+
+# Maintenance
+
+def _week_ranges(timestamps: Iterable[datetime]) -> List[Tuple[datetime, datetime]]:
+    """Touched Monday-aligned weeks, merged into contiguous [start, end) ranges"""
+    week = ROLLUP_RESOLUTIONS["week"]
+    ranges = []
+    for start in sorted({floor_bucket(ts, "week") for ts in timestamps}):
+        if ranges and ranges[-1][1] == start:
+            ranges[-1] = (ranges[-1][0], start + week)
+        else:
+            ranges.append((start, start + week))
+    return ranges
+
+
+def _write_rollups(
+    db: Session,
+    market: str,
+    prices: pd.DataFrame,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> int:
+    """Replace a market's rollups in [start, end) with ones computed from prices"""
+    clear = delete(PriceRollup).where(PriceRollup.market == market)
+    if start is not None:
+        clear = clear.where(PriceRollup.bucket >= start)
+    if end is not None:
+        clear = clear.where(PriceRollup.bucket < end)
+    db.execute(clear)
+
+    if prices.empty:
+        return 0
+
+    records = []
+    for resolution in ROLLUP_RESOLUTIONS:
+        rollup = aggregate(prices, resolution)
+        rollup["bucket"] = rollup["bucket"].dt.to_pydatetime()
+        rollup["count"] = rollup["count"].astype(int)
+        for record in rollup.astype(object).to_dict("records"):
+            record["market"] = market
+            record["resolution"] = resolution
+            records.append(record)
+
+    db.execute(insert(PriceRollup), records)
+    return len(records)
+
+
+def update_rollups(db: Session, market: str, timestamps: Iterable[datetime]):
+    """
+    Recompute every week touched by newly written timestamps
+
+    Weeks are recomputed from the stored rows rather than merged in, so
+    overwritten prices and out-of-order arrivals stay exact.
+    """
+    for start, end in _week_ranges(timestamps):
+        _write_rollups(db, market, load_prices(db, market, start, end), start, end)
+    db.commit()
+
+
+def rebuild_rollups(db: Session, market: str) -> int:
+    """Recompute all of a market's rollups from its stored prices"""
+    written = _write_rollups(db, market, load_prices(db, market))
+    db.commit()
+    return written
+
+
+def sync_rollups(db: Session, market: str) -> int:
+    """Rebuild a market's rollups if they don't account for every stored price"""
+    stored = db.execute(
+        select(func.count()).select_from(MarketPrice).where(MarketPrice.market == market)
+    ).scalar()
+    rolled_up = db.execute(
+        select(func.coalesce(func.sum(PriceRollup.count), 0)).where(
+            PriceRollup.market == market,
+            PriceRollup.resolution == "hour"
+        )
+    ).scalar()
+
+    if stored == rolled_up:
+        return 0
+    return rebuild_rollups(db, market)
+
+
+# Reads
+
+def rollup_points(db: Session, market: str, resolution: str, since: datetime) -> List[Dict]:
+    rollups = db.execute(
+        select(
+            PriceRollup.bucket, PriceRollup.open, PriceRollup.high,
+            PriceRollup.low, PriceRollup.close, PriceRollup.mean
+        ).where(
+            PriceRollup.market == market,
+            PriceRollup.resolution == resolution,
+            PriceRollup.bucket >= floor_bucket(since, resolution)
+        ).order_by(PriceRollup.bucket)
+    ).all()
+
+    return [
+        {"x": r.bucket.isoformat(), "y": r.mean, "open": r.open, "high": r.high, "low": r.low, "close": r.close}
+        for r in rollups
+    ]
+
+
+def raw_stats(
+    db: Session,
+    market: str,
+    since: datetime,
+    until: Optional[datetime] = None
+) -> Optional[Dict]:
+    """min/max/avg/count of stored prices in [since, until)"""
+    query = select(
+        func.min(MarketPrice.price), func.max(MarketPrice.price),
+        func.avg(MarketPrice.price), func.count()
+    ).where(MarketPrice.market == market, MarketPrice.timestamp >= since)
+    if until is not None:
+        query = query.where(MarketPrice.timestamp < until)
+
+    low, high, avg, count = db.execute(query).one()
+    if not count:
+        return None
+    return {"min": low, "max": high, "avg": avg, "count": count}
+
+
+def rollup_stats(db: Session, market: str, since: datetime, resolution: str) -> Optional[Dict]:
+    """
+    min/max/avg/count since a point in time from whole rollup buckets,
+    with raw rows covering the partial bucket at the start
+
+    Returns None when the rollups hold nothing for the window.
+    """
+    aligned = ceil_bucket(since, resolution)
+
+    low, high, total, count = db.execute(
+        select(
+            func.min(PriceRollup.low), func.max(PriceRollup.high),
+            func.sum(PriceRollup.mean * PriceRollup.count), func.sum(PriceRollup.count)
+        ).where(
+            PriceRollup.market == market,
+            PriceRollup.resolution == resolution,
+            PriceRollup.bucket >= aligned
+        )
+    ).one()
+    if not count:
+        return None
+
+    head = raw_stats(db, market, since, aligned) if aligned > since else None
+    if head:
+        low = min(low, head["min"])
+        high = max(high, head["max"])
+        total += head["avg"] * head["count"]
+        count += head["count"]
+
+    return {"min": low, "max": high, "avg": total / count, "count": count}
@@ -5,145 +5,125 @@ from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 from apscheduler.triggers.cron import CronTrigger
 from datetime import datetime, timedelta
+from typing import Dict, Optional
 import asyncio
 
-from services.database import SessionLocal, MarketPrice, init_db
+from services.database import SessionLocal, init_db
 from services.data_fetcher import BMRSClient
+from services.backfill_planner import run_backfill, SETTLEMENT_PERIOD
+from services.bmrs_parser import TRACKED_MARKETS, TRACKED_PROVIDERS
+from services.ingest import bulk_upsert_prices, get_watermark
+from services.repository import run_db
+from services.history_store import get_history_store, attach_history_store
+from services.rollups import sync_rollups
+from services.price_window import get_price_window
+from services.predictor_registry import get_predictor_registry
+from services.training_jobs import load_training_data, MIN_TRAINING_ROWS
+from services.events import publish, MODEL_TRAINED, ModelTrained
+
+# Live polling catches up at most this far back; older gaps are backfill's job
+LIVE_MAX_LOOKBACK = timedelta(days=7)
+
+# Markets further behind the freshest one than this are left to backfill,
+# so one stale or empty series doesn't widen every poll
+LIVE_MARKET_LAG = timedelta(days=1)
 
 scheduler = AsyncIOScheduler()
 
 
+def live_since(watermarks: Dict[str, Optional[datetime]], now: datetime) -> datetime:
+    """
+    Where a live poll should start: just after the oldest watermark among
+    markets that are keeping up (within LIVE_MARKET_LAG of the freshest),
+    never more than LIVE_MAX_LOOKBACK back
+    """
+    stored = [w for w in watermarks.values() if w is not None]
+    if not stored:
+        return now - timedelta(days=1)
+    
+    newest = max(stored)
+    current = [w for w in stored if w >= newest - LIVE_MARKET_LAG]
+    return max(min(current) + SETTLEMENT_PERIOD, now - LIVE_MAX_LOOKBACK)
+
+
+def tracked_watermarks(db) -> Dict[str, Optional[datetime]]:
+    """Latest stored timestamp for each tracked market"""
+    return {market: get_watermark(db, market) for market in TRACKED_MARKETS}
+
+
 async def fetch_live_prices():
-    """Fetch current prices from BMRS"""
+    """
+    Fetch every settlement period published since the stored high-water mark
+    
+    One request covers everything since the oldest watermark of the
+    tracked markets that are keeping up (see live_since), so missed runs
+    or several new periods between polls are caught up here rather than
+    waiting for the nightly backfill. The upsert (and the rollup refresh
+    and event handlers it triggers) runs in a worker thread.
+    """
     print(f"[{datetime.now()}] Fetching live prices...")
     
-    db = SessionLocal()
     client = BMRSClient()
     
     try:
-        price_data = await client.get_current_price()
+        now = datetime.utcnow()
+        since = live_since(await run_db(tracked_watermarks), now)
         
-        if price_data and price_data.get("uk_dayahead"):
-            price = MarketPrice(
-                timestamp=datetime.fromisoformat(price_data["timestamp"].replace("Z", "+00:00")),
-                market="uk_dayahead",
-                price=price_data["uk_dayahead"],
-                unit="GBP/MWh",
-                source="bmrs"
-            )
-            
-            # Check if we already have this timestamp
-            existing = db.query(MarketPrice).filter(
-                MarketPrice.timestamp == price.timestamp,
-                MarketPrice.market == "uk_dayahead"
-            ).first()
-            
-            if not existing:
-                db.add(price)
-                db.commit()
-                print(f"  UK Day-ahead: £{price_data['uk_dayahead']}/MWh")
-            else:
-                print(f"  Price already exists for {price.timestamp}")
+        # End a day ahead so today's date is included in the request
+        df = await client.fetch_market_prices(since, now + timedelta(days=1), TRACKED_PROVIDERS)
+        result = await run_db(bulk_upsert_prices, df)
+        
+        if result.inserted:
+            print(f"  Added {result.inserted} new periods since {since}")
         else:
-            print("  No price data available")
+            print(f"  No new prices since {since}")
             
     except Exception as e:
         print(f"  Error fetching prices: {e}")
     finally:
         await client.close()
-        db.close()
 
 
 async def update_predictions():
-    """Regenerate predictions based on latest data"""
-    print(f"[{datetime.now()}] Updating predictions...")
+    """
+    Bring the models up to date with the latest data
     
-    from models.predictor import EnergyPredictor
-    import pandas as pd
+    Usually a warm-start update of the saved model on the rows added since
+    it was last fitted; a full retrain on the FULL_RETRAIN_HOURS schedule,
+    on drift, or when there is no usable saved model.
+    """
+    print(f"[{datetime.now()}] Updating predictions...")
     
-    db = SessionLocal()
-    try:
-        predictor = EnergyPredictor()
-        
-        for market in ["uk_dayahead"]:
-            prices = db.query(MarketPrice).filter(
-                MarketPrice.market == market
-            ).order_by(MarketPrice.timestamp.asc()).all()
+    registry = get_predictor_registry()
+    for market in TRACKED_MARKETS:
+        # One market failing (or short of history) doesn't hold up the rest
+        try:
+            df = await asyncio.to_thread(load_training_data, market)
+            if len(df) < MIN_TRAINING_ROWS:
+                print(f"  Skipping {market}: {len(df)} rows, need {MIN_TRAINING_ROWS}")
+                continue
             
-            if len(prices) > 1000:
-                df = pd.DataFrame([
-                    {"timestamp": p.timestamp, "price": p.price, "market": p.market}
-                    for p in prices
-                ])
-                
-                if not predictor.is_trained:
-                    print(f"  Training model on {len(df)} records...")
-                    predictor.train(df)
-                
-                print(f"  Updated predictions for {market}")
-    except Exception as e:
-        print(f"  Error updating predictions: {e}")
-    finally:
-        db.close()
+            # Updates a private copy; serving predictors swap to the new version
+            predictor = await asyncio.to_thread(registry.training_predictor, market)
+            result = await asyncio.to_thread(predictor.retrain, df, market)
+            if result['mode'] != 'skipped':
+                # Handlers load the new version from disk, so keep them off the loop
+                await asyncio.to_thread(publish, MODEL_TRAINED, ModelTrained(market=market, model_dir=predictor.model_dir))
+            print(f"  Updated predictions for {market} ({result['mode']}: {result['reason']})")
+        except Exception as e:
+            print(f"  Error updating predictions for {market}: {e}")
 
 
 async def backfill_historical():
-    """Backfill historical data from BMRS"""
+    """Backfill missing periods from BMRS, resuming any interrupted run"""
     print(f"[{datetime.now()}] Checking for historical data gaps...")
     
     db = SessionLocal()
     client = BMRSClient()
     
     try:
-        # Check current data count
-        count = db.query(MarketPrice).filter(
-            MarketPrice.market == "uk_dayahead"
-        ).count()
-        
-        # Target: 5 years of half-hourly data = ~87,600 records
-        target = 87600
-        
-        if count < target * 0.9:  # Less than 90% of target
-            print(f"  Have {count} records, need ~{target}. Starting backfill...")
-            
-            # Find oldest record
-            oldest = db.query(MarketPrice).filter(
-                MarketPrice.market == "uk_dayahead"
-            ).order_by(MarketPrice.timestamp.asc()).first()
-            
-            if oldest:
-                end_date = oldest.timestamp
-            else:
-                end_date = datetime.now()
-            
-            # Fetch in chunks (BMRS has rate limits)
-            start_date = end_date - timedelta(days=365)  # 1 year at a time
-            
-            df = await client.fetch_market_prices(start_date, end_date)
-            
-            added = 0
-            for _, row in df.iterrows():
-                existing = db.query(MarketPrice).filter(
-                    MarketPrice.timestamp == row["timestamp"],
-                    MarketPrice.market == row["market"]
-                ).first()
-                
-                if not existing and row["price"] > 0:
-                    price = MarketPrice(
-                        timestamp=row["timestamp"],
-                        market=row["market"],
-                        price=row["price"],
-                        unit=row["unit"],
-                        source=row["source"]
-                    )
-                    db.add(price)
-                    added += 1
-            
-            db.commit()
-            print(f"  Added {added} historical records")
-        else:
-            print(f"  Historical data OK: {count} records")
-            
+        result = await run_backfill(db, client, years=5)
+        print(f"  Added {result.inserted} historical records ({result.skipped} skipped)")
     except Exception as e:
         print(f"  Backfill error: {e}")
     finally:
@@ -151,12 +131,61 @@ async def backfill_historical():
         db.close()
 
 
+async def sync_history_store():
+    """Bring the Parquet history store up to date with the database"""
+    store = get_history_store()
+    if store is None:
+        return
+    
+    db = SessionLocal()
+    try:
+        for market in TRACKED_MARKETS:
+            copied = await asyncio.to_thread(store.sync_from_db, db, market)
+            if copied:
+                print(f"  History store: copied {copied} {market} rows")
+    except Exception as e:
+        print(f"  History store sync error: {e}")
+    finally:
+        db.close()
+
+
+async def sync_rollup_tables():
+    """Build OHLC rollups for prices stored before they existed"""
+    db = SessionLocal()
+    try:
+        for market in TRACKED_MARKETS:
+            written = await asyncio.to_thread(sync_rollups, db, market)
+            if written:
+                print(f"  Rollups: rebuilt {written} {market} buckets")
+    except Exception as e:
+        print(f"  Rollup sync error: {e}")
+    finally:
+        db.close()
+
+
+async def warm_price_window():
+    """Load recent prices for the tracked markets into memory"""
+    window = get_price_window()
+    db = SessionLocal()
+    try:
+        for market in TRACKED_MARKETS:
+            rows = await asyncio.to_thread(window.load, db, market)
+            print(f"  Price window: {rows} {market} rows in memory")
+    except Exception as e:
+        print(f"  Price window load error: {e}")
+    finally:
+        db.close()
+
+
 def start_scheduler():
     """Initialize and start the background scheduler"""
     
     # Initialize database
     init_db()
     
+    # Mirror every ingest into the columnar history store
+    attach_history_store()
+    
     # Fetch live prices every 15 minutes
     scheduler.add_job(
         fetch_live_prices,
@@ -181,6 +210,34 @@ def start_scheduler():
         replace_existing=True
     )
     
+    # Seed the history store from existing data, then keep it caught up
+    # with rows ingested by other processes (backfill.py, the API)
+    scheduler.add_job(
+        sync_history_store,
+        id="sync_history_store",
+        replace_existing=True
+    )
+    scheduler.add_job(
+        sync_history_store,
+        IntervalTrigger(hours=1),
+        id="sync_history_store_hourly",
+        replace_existing=True
+    )
+    
+    # Keep recent prices in memory for the read endpoints
+    scheduler.add_job(
+        warm_price_window,
+        id="warm_price_window",
+        replace_existing=True
+    )
+    
+    # Roll up prices stored before rollups existed
+    scheduler.add_job(
+        sync_rollup_tables,
+        id="sync_rollup_tables",
+        replace_existing=True
+    )
+    
     # Run initial fetch on startup
     scheduler.add_job(
         fetch_live_prices,
@@ -195,3 +252,8 @@ def start_scheduler():
 def stop_scheduler():
     """Stop the scheduler"""
     scheduler.shutdown()
+    
+    # Write out ingested rows still waiting in the history store's buffer
+    store = get_history_store()
+    if store is not None:
+        store.flush()
@@ -0,0 +1,188 @@
+"""
+Background training jobs
+Models train on a small worker pool instead of inside requests; callers
+get a job id to poll, and read endpoints answer 503 until a model exists
+"""
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+import os
+import threading
+import uuid
+
+import pandas as pd
+
+from services.database import SessionLocal
+from services.events import publish, MODEL_TRAINED, ModelTrained
+from services.history_store import get_history_store
+from services.predictor_registry import get_predictor_registry
+from services.repository import load_price_history
+
+# Concurrent training jobs (each already uses several cores)
+TRAINING_JOB_WORKERS = int(os.getenv("TRAINING_JOB_WORKERS", "1"))
+
+# Seconds clients are told to wait (Retry-After) while a model trains
+TRAINING_RETRY_AFTER = int(os.getenv("TRAINING_RETRY_AFTER", "30"))
+
+# Seconds before a read endpoint may retrain a market whose last job
+# succeeded but left no loadable model
+TRAINING_SUCCESS_COOLDOWN = int(os.getenv("TRAINING_SUCCESS_COOLDOWN", "600"))
+
+# History a market needs before it is trained, however training is started
+MIN_TRAINING_ROWS = int(os.getenv("MIN_TRAINING_ROWS", "1000"))
+
+# Finished jobs kept for status queries
+TRAINING_JOB_HISTORY = 50
+
+
+@dataclass
+class TrainingJob:
+    """One training run and where it has got to"""
+    market: str
+    min_rows: int
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = "queued"  # queued, running, succeeded, failed
+    stage: str = "queued"
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    rows: Optional[int] = None
+    metrics: Optional[Dict] = None
+    error: Optional[str] = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in ("queued", "running")
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.id,
+            "market": self.market,
+            "status": self.status,
+            "stage": self.stage,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "training_samples": self.rows,
+            "metrics": self.metrics,
+            "error": self.error,
+        }
+
+
+def load_training_data(market: str) -> pd.DataFrame:
+    """
+    All of a market's history, from the columnar store when it has it
+
+    The store is only used while it matches the database; if it has fallen
+    behind (rows ingested by another process since the last sync) training
+    reads the database instead.
+    """
+    store = get_history_store()
+    db = SessionLocal()
+    try:
+        if store is not None and store.count(market) >= MIN_TRAINING_ROWS and store.is_current(db, market):
+            df = store.read(market)
+            df["market"] = market
+            return df
+        return load_price_history(db, market)
+    finally:
+        db.close()
+
+
+def train_market(job: TrainingJob) -> Dict:
+    """Load a market's history, then train and publish the market's models"""
+    job.stage = "loading data"
+    df = load_training_data(job.market)
+    job.rows = len(df)
+    if len(df) < job.min_rows:
+        raise ValueError(f"Insufficient data for training. Have {len(df)}, need {job.min_rows}+.")
+
+    job.stage = "training"
+    predictor = get_predictor_registry().training_predictor(job.market)
+    metrics = predictor.train(df, market=job.market)
+
+    job.stage = "publishing"
+    publish(MODEL_TRAINED, ModelTrained(market=job.market, model_dir=predictor.model_dir))
+    return metrics
+
+
+class TrainingQueue:
+    """
+    Training jobs on a bounded thread pool
+
+    At most one job per market is queued or running: submitting while one
+    is pending returns it. A job that failed is also returned until
+    TRAINING_RETRY_AFTER has passed, and one that succeeded until
+    TRAINING_SUCCESS_COOLDOWN has (unless forced), so clients polling read
+    endpoints don't start a doomed job on every request, including when
+    a trained model then fails to load.
+    """
+
+    def __init__(self, workers: int = TRAINING_JOB_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="training")
+        self._jobs: "OrderedDict[str, TrainingJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, market: str, min_rows: int = MIN_TRAINING_ROWS, force: bool = False) -> TrainingJob:
+        """Queue a job for a market, or return the one that makes it unnecessary"""
+        now = datetime.utcnow()
+        with self._lock:
+            latest = self.latest(market)
+            if latest is not None and (latest.active or self._cooling_down(latest, now, force)):
+                return latest
+
+            job = TrainingJob(market=market, min_rows=min_rows)
+            self._jobs[job.id] = job
+            while len(self._jobs) > TRAINING_JOB_HISTORY:
+                oldest = next(iter(self._jobs.values()))
+                if oldest.active:
+                    break
+                self._jobs.popitem(last=False)
+
+        self._executor.submit(self._run, job)
+        return job
+
+    @staticmethod
+    def _cooling_down(job: TrainingJob, now: datetime, force: bool) -> bool:
+        age = (now - job.finished_at).total_seconds()
+        if job.status == "failed":
+            return age < TRAINING_RETRY_AFTER
+        return not force and age < TRAINING_SUCCESS_COOLDOWN
+
+    def _run(self, job: TrainingJob):
+        job.status = job.stage = "running"
+        job.started_at = datetime.utcnow()
+        print(f"[{job.started_at}] Training job {job.id} ({job.market}) started")
+        try:
+            job.metrics = train_market(job)
+            job.finished_at = datetime.utcnow()
+            job.status = job.stage = "succeeded"
+        except Exception as e:
+            job.error = str(e)
+            job.finished_at = datetime.utcnow()
+            job.status = "failed"
+            print(f"  Training job {job.id} failed: {e}")
+
+    def get(self, job_id: str) -> Optional[TrainingJob]:
+        return self._jobs.get(job_id)
+
+    def latest(self, market: str) -> Optional[TrainingJob]:
+        for job in reversed(list(self._jobs.values())):
+            if job.market == market:
+                return job
+        return None
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_queue: Optional[TrainingQueue] = None
+
+
+def get_training_queue() -> TrainingQueue:
+    global _queue
+    if _queue is None:
+        _queue = TrainingQueue()
+    return _queue
@@ -0,0 +1,50 @@
+"""
+Shared fixtures
+Tests run against throwaway SQLite databases under pytest's temp directory
+"""
+import os
+import sys
+
+# Nothing may touch a database file in the working directory: the app's
+# engine starts in memory and is rebound to a temp file per session below
+os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+os.environ.setdefault("HISTORY_STORE_ENABLED", "0")
+os.environ.setdefault("MARKET_CACHE_MODE", "off")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from services import database
+from services.database import Base
+
+
+@pytest.fixture(scope="session", autouse=True)
+def app_database(tmp_path_factory):
+    """Point the app's own engine and SessionLocal at a temp database"""
+    engine = create_engine(
+        f"sqlite:///{tmp_path_factory.mktemp('db') / 'app.db'}",
+        connect_args={"check_same_thread": False}
+    )
+    original = database.engine
+    database.engine = engine
+    database.SessionLocal.configure(bind=engine)
+    database.init_db()
+    yield engine
+    database.SessionLocal.configure(bind=original)
+    database.engine = original
+    engine.dispose()
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
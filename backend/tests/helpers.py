@@ -0,0 +1,22 @@
+"""Synthetic data shared by the tests"""
+import numpy as np
+import pandas as pd
+
+
+def synthetic_prices(rows: int, seed: int = 42) -> np.ndarray:
+    """Random-walk prices with a volatile spell and a flat stretch"""
+    rng = np.random.default_rng(seed)
+    prices = np.abs(rng.standard_normal(rows).cumsum()) * 3 + 50
+    spike = slice(rows // 2, rows // 2 + rows // 20)
+    prices[spike] += np.abs(rng.standard_normal(len(prices[spike]))) * 300
+    prices[rows // 10:rows // 10 + 200] = 80.0
+    return prices
+
+
+def hourly_history(hours: int = 24 * 120, market: str = "uk_dayahead", start: str = "2024-01-01") -> pd.DataFrame:
+    """A model-ready price frame of hourly synthetic prices"""
+    return pd.DataFrame({
+        "timestamp": pd.date_range(start, periods=hours, freq="h"),
+        "price": synthetic_prices(hours),
+        "market": market,
+    })
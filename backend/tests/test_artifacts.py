@@ -0,0 +1,73 @@
+import os
+
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingRegressor
+from xgboost import XGBRegressor
+
+from models.artifacts import ArtifactStore
+
+
+def _members():
+    rng = np.random.default_rng(0)
+    X, y = rng.standard_normal((200, 4)), rng.standard_normal(200)
+    xgb_params = {"n_estimators": 5, "max_depth": 2, "random_state": 42, "tree_method": "hist"}
+    gbr_params = {"n_estimators": 5, "max_depth": 2, "random_state": 42}
+    return X, {
+        "xgb_short": (XGBRegressor(**xgb_params).fit(X, y), "xgboost_hist", xgb_params),
+        "gb_long": (GradientBoostingRegressor(**gbr_params).fit(X, y), "sklearn_gbr", gbr_params),
+    }
+
+
+def test_publish_and_load_round_trip(tmp_path):
+    store = ArtifactStore(str(tmp_path))
+    X, members = _members()
+
+    version = store.publish(members, {"main": None}, {"market": "uk_dayahead"})
+    models, scalers, manifest = store.load()
+
+    assert store.active_version() == version
+    assert manifest["market"] == "uk_dayahead"
+    assert set(scalers) == {"main"}
+    for slot, (model, _, _) in members.items():
+        np.testing.assert_array_equal(models[slot].predict(X), model.predict(X))
+
+
+def test_activate_rolls_back_and_rejects_unknown_versions(tmp_path):
+    store = ArtifactStore(str(tmp_path))
+    _, members = _members()
+    first = store.publish(members, {}, {})
+    second = store.publish(members, {}, {})
+
+    assert store.active_version() == second
+    store.activate(first)
+    assert store.active_version() == first
+    assert store.load()[2]["version"] == first
+
+    with pytest.raises(ValueError):
+        store.activate("no-such-version")
+    assert store.active_version() == first
+
+
+def test_prune_keeps_newest_and_leaves_no_staging_files(tmp_path):
+    store = ArtifactStore(str(tmp_path), keep=2)
+    _, members = _members()
+    versions = [store.publish(members, {}, {}) for _ in range(4)]
+
+    assert store.versions() == versions[-2:]
+    assert not [name for name in os.listdir(store.versions_dir) if name.startswith(".")]
+    assert not [name for name in os.listdir(tmp_path) if name.startswith(".")]
+
+
+def test_prune_never_deletes_the_active_version(tmp_path):
+    store = ArtifactStore(str(tmp_path), keep=2)
+    _, members = _members()
+    first = store.publish(members, {}, {})
+    second = store.publish(members, {}, {})
+    store.activate(first)
+
+    store.keep = 1
+    store.prune()
+
+    assert store.versions() == [first, second]
+    assert store.load()[2]["version"] == first
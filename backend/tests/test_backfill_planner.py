@@ -0,0 +1,81 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from services.backfill_planner import plan_backfill, run_backfill, subtract_ranges
+from services.database import BackfillCheckpoint
+
+MARKETS = ["uk_dayahead", "uk_dayahead_n2ex"]
+
+
+class FakeBMRS:
+    """Serves APX prices for any range; N2EX only ever sends unusable zero prices"""
+
+    def __init__(self):
+        self.requests = []
+
+    async def iter_market_prices(self, start, end, providers):
+        self.requests.append((start, end))
+        timestamps = pd.date_range(start, end, freq="30min", inclusive="left")
+        for market, price in (("uk_dayahead", 50.0), ("uk_dayahead_n2ex", 0.0)):
+            yield pd.DataFrame({"timestamp": timestamps, "price": price, "market": market})
+
+
+def _fetched_days(client):
+    return sum((end - start for start, end in client.requests), timedelta()) / timedelta(days=1)
+
+
+def _now():
+    return datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+
+
+def test_subtract_ranges():
+    d = lambda day: datetime(2024, 1, day)
+
+    assert subtract_ranges([(d(1), d(10))], [(d(3), d(5)), (d(4), d(6)), (d(8), d(12))]) == [
+        (d(1), d(3)), (d(6), d(8))
+    ]
+    assert subtract_ranges([(d(1), d(3))], [(d(1), d(3))]) == []
+    assert subtract_ranges([(d(1), d(3))], []) == [(d(1), d(3))]
+
+
+def test_unfillable_market_only_refetches_non_final_days(db):
+    client = FakeBMRS()
+    end = _now()
+
+    asyncio.run(run_backfill(db, client, MARKETS, years=1, end=end))
+    first = _fetched_days(client)
+
+    client.requests.clear()
+    asyncio.run(run_backfill(db, client, MARKETS, years=1, end=end + timedelta(days=1)))
+
+    assert first >= 365
+    # Only the finality window plus the new day, not the whole year again
+    assert 0 < _fetched_days(client) <= 3.5
+
+
+def test_exhaustion_is_tracked_per_market(db):
+    end = _now()
+    start = end - timedelta(days=30)
+    # Only N2EX was ever fetched over this range, and it came back empty
+    db.add(BackfillCheckpoint(
+        market="uk_dayahead_n2ex", range_start=start, range_end=end, cursor=end,
+        status="done", updated_at=end
+    ))
+    db.commit()
+
+    checkpoints = plan_backfill(db, MARKETS, start, end)
+
+    assert [(cp.range_start, cp.range_end) for cp in checkpoints] == [(start, end)]
+    assert checkpoints[0].market == "uk_dayahead,uk_dayahead_n2ex"
+
+
+def test_pending_checkpoints_resume_before_planning(db):
+    end = _now()
+    start = end - timedelta(days=10)
+    first = plan_backfill(db, MARKETS, start, end)
+
+    again = plan_backfill(db, MARKETS, start, end + timedelta(days=1))
+
+    assert [cp.id for cp in again] == [cp.id for cp in first]
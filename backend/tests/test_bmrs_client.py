@@ -0,0 +1,81 @@
+import asyncio
+import time
+from datetime import datetime
+
+import httpx
+import pytest
+
+from services.data_fetcher import BMRSClient, TokenBucket
+
+URL = "https://example.test/market-index"
+
+
+def _run(handler, coro_fn, max_retries=2):
+    calls = []
+
+    def record(request):
+        calls.append(request)
+        return handler(request, len(calls))
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(record)) as http:
+            client = BMRSClient(http=http, rate_limit=1000, max_retries=max_retries)
+            client.RETRY_BACKOFF = 0.0
+            return await coro_fn(client)
+
+    return asyncio.run(run()), calls
+
+
+def test_retries_retryable_statuses_then_succeeds():
+    def handler(request, n):
+        if n < 3:
+            return httpx.Response(503, headers={"Retry-After": "0"})
+        return httpx.Response(200, json={"data": []})
+
+    payload, calls = _run(handler, lambda c: c._get_json(URL, {}))
+
+    assert payload == {"data": []}
+    assert len(calls) == 3
+
+
+def test_gives_up_after_retries_and_does_not_retry_client_errors():
+    payload, calls = _run(lambda r, n: httpx.Response(500), lambda c: c._get_json(URL, {}))
+    assert payload is None
+    assert len(calls) == 3
+
+    payload, calls = _run(lambda r, n: httpx.Response(404), lambda c: c._get_json(URL, {}))
+    assert payload is None
+    assert len(calls) == 1
+
+
+@pytest.mark.parametrize("error", [httpx.DecodingError("bad gzip"), httpx.ConnectError("refused")])
+def test_http_errors_fail_only_their_chunk(error):
+    def handler(request, n):
+        if request.url.params["from"].startswith("2024-01-08"):
+            raise error
+        return httpx.Response(200, json={"data": [
+            {"startTime": request.url.params["from"], "dataProvider": "APXMIDP", "price": 50.0, "settlementPeriod": 1}
+        ]})
+
+    df, calls = _run(
+        handler,
+        lambda c: c.fetch_market_prices(datetime(2024, 1, 1), datetime(2024, 1, 22)),
+        max_retries=1
+    )
+
+    assert len(calls) == 4  # three chunks, the failing one tried twice
+    assert len(df) == 2
+
+
+def test_token_bucket_paces_after_burst():
+    async def run():
+        bucket = TokenBucket(rate=20, capacity=2)
+        start = time.monotonic()
+        for _ in range(6):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    elapsed = asyncio.run(run())
+
+    # Two requests ride the burst, the other four wait 1/20 s each
+    assert 0.18 <= elapsed < 1.0
@@ -0,0 +1,90 @@
+import asyncio
+from datetime import datetime
+
+import httpx
+import pandas as pd
+
+from services.bmrs_parser import parse_market_index
+from services.data_fetcher import BMRSClient
+
+
+def _payload(timestamps, providers=("APXMIDP",)):
+    return {"data": [
+        {"startTime": ts.strftime("%Y-%m-%dT%H:%M:%SZ"), "dataProvider": provider, "price": 50.0,
+         "volume": 100.0, "settlementPeriod": 1}
+        for ts in timestamps for provider in providers
+    ]}
+
+
+def _mock_bmrs(requests):
+    """Market index periods in [from, to], inclusive of both ends like the API"""
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(dict(request.url.params))
+        start = pd.Timestamp(request.url.params["from"])
+        end = pd.Timestamp(request.url.params["to"])
+        return httpx.Response(200, json=_payload(pd.date_range(start.ceil("30min"), end, freq="30min")))
+    return httpx.MockTransport(handler)
+
+
+def _fetch(start, end):
+    requests = []
+
+    async def run():
+        async with httpx.AsyncClient(transport=_mock_bmrs(requests)) as http:
+            client = BMRSClient(http=http, rate_limit=1000, max_retries=0)
+            return await client.fetch_market_prices(start, end)
+
+    return asyncio.run(run()), requests
+
+
+def test_parse_trims_to_half_open_window_and_provider():
+    timestamps = pd.date_range("2024-01-01", periods=6, freq="30min", tz="UTC")
+    payload = _payload(timestamps, providers=("APXMIDP", "N2EXMIDP"))
+
+    batch = parse_market_index(payload, "APXMIDP", datetime(2024, 1, 1, 0, 30), datetime(2024, 1, 1, 2))
+
+    assert list(batch["timestamp"]) == list(timestamps[1:4])
+    assert set(batch["market"]) == {"uk_dayahead"}
+
+
+def test_parse_keeps_every_known_provider_as_its_own_market():
+    timestamps = pd.date_range("2024-01-01", periods=2, freq="30min", tz="UTC")
+    payload = _payload(timestamps, providers=("APXMIDP", "N2EXMIDP", "OTHER"))
+
+    batch = parse_market_index(payload, None)
+
+    assert batch["market"].value_counts().to_dict() == {"uk_dayahead": 2, "uk_dayahead_n2ex": 2}
+
+
+def test_parse_accepts_an_unlisted_provider_asked_for_by_name():
+    timestamps = pd.date_range("2024-01-01", periods=2, freq="30min", tz="UTC")
+    payload = _payload(timestamps, providers=("APXMIDP", "OTHER"))
+
+    batch = parse_market_index(payload, "OTHER")
+    several = parse_market_index(payload, ["APXMIDP", "OTHER"])
+
+    assert len(batch) == 2
+    assert set(batch["market"]) == {"uk_dayahead"}
+    assert list(batch["provider"].astype(str)) == ["OTHER", "OTHER"]
+    assert len(several) == 4
+    assert "nan" not in set(several["market"])
+
+
+def test_fetch_across_chunk_boundaries_with_time_of_day_start():
+    start, end = datetime(2024, 1, 1, 14, 30), datetime(2024, 2, 1, 14, 30)
+
+    df, requests = _fetch(start, end)
+
+    expected = pd.date_range(start, end, freq="30min", inclusive="left", tz="UTC")
+    assert len(requests) == 5
+    assert len(df) == len(expected) == 1488
+    assert list(df["timestamp"]) == list(expected)
+
+
+def test_fetch_requests_exact_chunk_bounds():
+    _, requests = _fetch(datetime(2024, 1, 1, 14, 30), datetime(2024, 1, 9))
+
+    assert requests == [
+        {"from": "2024-01-01T14:30:00Z", "to": "2024-01-08T14:30:00Z"},
+        {"from": "2024-01-08T14:30:00Z", "to": "2024-01-09T00:00:00Z"},
+    ]
@@ -0,0 +1,37 @@
+import numpy as np
+
+from services.downsample import lttb
+
+
+def _series(n=10_000, seed=7):
+    rng = np.random.default_rng(seed)
+    y = rng.standard_normal(n).cumsum()
+    y[1234] += 500
+    y[8765] -= 500
+    return np.arange(n, dtype=np.float64), y
+
+
+def test_keeps_endpoints_one_point_per_bucket_in_order():
+    x, y = _series()
+
+    idx = lttb(x, y, 500)
+
+    assert len(idx) == 500
+    assert idx[0] == 0 and idx[-1] == len(x) - 1
+    assert np.all(np.diff(idx) > 0)
+
+
+def test_keeps_peaks_and_troughs():
+    x, y = _series()
+
+    idx = lttb(x, y, 200)
+
+    assert 1234 in idx
+    assert 8765 in idx
+
+
+def test_short_series_and_tiny_targets_are_returned_whole():
+    x, y = np.arange(50.0), np.sin(np.arange(50.0))
+
+    assert np.array_equal(lttb(x, y, 100), np.arange(50))
+    assert np.array_equal(lttb(x, y, 2), np.arange(50))
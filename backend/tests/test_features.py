@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+
+from helpers import synthetic_prices
+from models.features import (
+    FEATURE_COLUMNS, MODEL_COLUMNS, ROLLING_WINDOWS, TIME_FEATURES, IncrementalFeatureEngine,
+    build_direct_matrix, build_feature_matrix, fill_time_features, rolling_features
+)
+
+
+def _series(hours=24 * 120):
+    return pd.date_range("2024-01-01", periods=hours, freq="h"), synthetic_prices(hours)
+
+
+def test_rolling_kernel_matches_pandas():
+    _, prices = _series()
+    series = pd.Series(prices)
+
+    rolled = rolling_features(prices)
+
+    for window in ROLLING_WINDOWS:
+        expected = series.rolling(window)
+        np.testing.assert_allclose(rolled[f"rolling_mean_{window}h"], expected.mean(), rtol=1e-9)
+        np.testing.assert_allclose(rolled[f"rolling_std_{window}h"], expected.std(), rtol=1e-6, atol=1e-9)
+        np.testing.assert_array_equal(rolled[f"rolling_min_{window}h"], expected.min())
+        np.testing.assert_array_equal(rolled[f"rolling_max_{window}h"], expected.max())
+
+
+def test_incremental_engine_matches_batch_latest_row():
+    timestamps, prices = _series()
+    batch = build_feature_matrix(timestamps, prices)
+
+    engine = IncrementalFeatureEngine()
+    engine.sync(timestamps[:2000].to_numpy(), prices[:2000])
+    fed = engine.sync(timestamps.to_numpy(), prices)
+    features = engine.features()
+
+    assert fed == len(prices) - 2000
+    assert engine.last_timestamp == batch.timestamps[-1]
+    np.testing.assert_allclose(
+        [features[c] for c in FEATURE_COLUMNS], batch.X[-1].astype(np.float64), rtol=1e-5, atol=1e-5
+    )
+
+
+def test_incremental_engine_resets_when_history_is_rewritten():
+    timestamps, prices = _series()
+    engine = IncrementalFeatureEngine()
+    engine.sync(timestamps.to_numpy(), prices)
+
+    rewritten = prices.copy()
+    rewritten[-10] += 25.0
+    engine.sync(timestamps.to_numpy(), rewritten)
+
+    expected = build_feature_matrix(timestamps, rewritten).X[-1]
+    np.testing.assert_allclose(
+        [engine.features()[c] for c in FEATURE_COLUMNS], expected.astype(np.float64), rtol=1e-5, atol=1e-5
+    )
+
+
+def test_rolling_kernel_recovers_after_missing_prices_like_pandas():
+    _, prices = _series()
+    prices = prices.copy()
+    prices[[50, 900, 901]] = np.nan
+    series = pd.Series(prices)
+
+    rolled = rolling_features(prices)
+
+    for window in ROLLING_WINDOWS:
+        expected = series.rolling(window)
+        mean = rolled[f"rolling_mean_{window}h"]
+        np.testing.assert_allclose(mean, expected.mean(), rtol=1e-9)
+        np.testing.assert_allclose(rolled[f"rolling_std_{window}h"], expected.std(), rtol=1e-6, atol=1e-9)
+        np.testing.assert_array_equal(rolled[f"rolling_min_{window}h"], expected.min())
+        np.testing.assert_array_equal(rolled[f"rolling_max_{window}h"], expected.max())
+        assert not np.isnan(mean[901 + window:]).any()
+    # RSI as prepare_features always computed it (a missing change counts as 0)
+    delta = series.diff()
+    gain = delta.where(delta > 0, 0).rolling(168).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(168).mean()
+    np.testing.assert_allclose(rolled["rsi_7d"], 100 - 100 / (1 + gain / loss), rtol=1e-6)
+
+
+def test_direct_rows_pair_origin_features_with_a_later_target():
+    timestamps, prices = _series()
+    matrix = build_feature_matrix(timestamps, prices)
+    price_at = dict(zip(timestamps.to_numpy(), prices))
+    row_at = {ts: i for i, ts in enumerate(matrix.timestamps)}
+
+    direct = build_direct_matrix(matrix, max_horizon_days=10, samples=3)
+
+    horizons = direct.X[:, -1].astype(np.int64)
+    assert direct.columns == MODEL_COLUMNS
+    assert horizons.min() == 1 and horizons.max() == 10
+    assert len(direct) > 2 * len(matrix)
+    assert np.all(np.diff(direct.timestamps) >= np.timedelta64(0))
+
+    prices_only = [FEATURE_COLUMNS.index(c) for c in FEATURE_COLUMNS if c not in TIME_FEATURES]
+    calendar = np.empty((len(direct), len(FEATURE_COLUMNS)), dtype=np.float32)
+    fill_time_features(calendar, pd.DatetimeIndex(direct.timestamps))
+    for i in range(0, len(direct), 97):
+        origin = row_at[direct.timestamps[i] - np.timedelta64(horizons[i], "D")]
+        np.testing.assert_array_equal(direct.X[i, prices_only], matrix.X[origin, prices_only])
+        assert direct.y[i] == price_at[direct.timestamps[i]]
+    np.testing.assert_array_equal(direct.X[:, :len(TIME_FEATURES)], calendar[:, :len(TIME_FEATURES)])
+
+    # Incremental updates only see targets after the cut-off
+    cutoff = matrix.timestamps[-48]
+    newer = build_direct_matrix(matrix, max_horizon_days=10, samples=3, after=cutoff)
+    assert len(newer) and np.all(newer.timestamps > cutoff)
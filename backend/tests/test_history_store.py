@@ -0,0 +1,76 @@
+import os
+
+import pandas as pd
+
+from services import training_jobs
+from services.database import SessionLocal
+from services.history_store import HistoryStore
+from services.ingest import bulk_upsert_prices
+
+
+def _prices(start, periods, market):
+    return pd.DataFrame({
+        "timestamp": pd.date_range(start, periods=periods, freq="30min"),
+        "price": 50.0 + pd.RangeIndex(periods) % 17,
+        "market": market,
+    })
+
+
+def test_ingested_rows_are_written_in_batches(tmp_path):
+    store = HistoryStore(str(tmp_path), flush_rows=100, flush_seconds=1e9)
+    month_file = store._path("uk_dayahead", "2024-01")
+
+    store.append("uk_dayahead", _prices("2024-01-01", 60, "uk_dayahead"))
+    assert not os.path.exists(month_file)
+
+    store.append("uk_dayahead", _prices("2024-01-02 06:00", 60, "uk_dayahead"))
+    assert os.path.exists(month_file)
+
+    # Reads see buffered rows too
+    store.append("uk_dayahead", _prices("2024-01-05", 10, "uk_dayahead"))
+    assert len(store.read("uk_dayahead")) == 130
+
+
+def test_training_reads_the_database_while_the_store_is_behind(tmp_path, monkeypatch):
+    market = "history_store_test"
+    store = HistoryStore(str(tmp_path))
+    monkeypatch.setattr(training_jobs, "get_history_store", lambda: store)
+
+    db = SessionLocal()
+    try:
+        bulk_upsert_prices(db, _prices("2024-01-01", 1500, market))
+        assert store.sync_from_db(db, market) == 1500
+        assert store.is_current(db, market)
+
+        # Rows ingested without this store seeing them (another process)
+        latest = _prices("2024-02-01 06:00", 48, market)
+        bulk_upsert_prices(db, latest)
+        assert not store.is_current(db, market)
+        df = training_jobs.load_training_data(market)
+        assert len(df) == 1548
+        assert df["timestamp"].iloc[-1] == latest["timestamp"].iloc[-1]
+
+        # Catching up copies only the new tail
+        assert store.sync_from_db(db, market) == 48
+        assert store.is_current(db, market)
+        assert len(training_jobs.load_training_data(market)) == 1548
+    finally:
+        db.close()
+
+
+def test_sync_rebuilds_when_an_older_gap_was_filled(tmp_path):
+    market = "history_store_gap"
+    store = HistoryStore(str(tmp_path))
+    df = _prices("2024-03-01", 200, market)
+
+    db = SessionLocal()
+    try:
+        bulk_upsert_prices(db, df.drop(index=range(50, 60)))
+        store.sync_from_db(db, market)
+        assert store.count(market) == 190
+
+        bulk_upsert_prices(db, df.iloc[50:60])
+        assert store.sync_from_db(db, market) == 200
+        assert store.read(market)["timestamp"].tolist() == df["timestamp"].tolist()
+    finally:
+        db.close()
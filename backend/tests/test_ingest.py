@@ -0,0 +1,62 @@
+import pandas as pd
+from sqlalchemy import select
+
+from services.database import MarketPrice
+from services.ingest import bulk_upsert_prices
+
+
+def _prices(start="2024-01-01", periods=10, price=None):
+    return pd.DataFrame({
+        "timestamp": pd.date_range(start, periods=periods, freq="30min"),
+        "price": price if price is not None else [float(p) for p in range(1, periods + 1)],
+        "market": "uk_dayahead",
+    })
+
+
+def _stored(db):
+    return dict(db.execute(select(MarketPrice.timestamp, MarketPrice.price)).all())
+
+
+def test_inserts_then_skips_existing_rows(db):
+    df = _prices()
+
+    first = bulk_upsert_prices(db, df, chunk_size=4)
+    second = bulk_upsert_prices(db, df, chunk_size=4)
+
+    assert first.as_dict() == {"inserted": 10, "updated": 0, "skipped": 0}
+    assert second.as_dict() == {"inserted": 0, "updated": 0, "skipped": 10}
+    assert len(_stored(db)) == 10
+
+
+def test_existing_rows_are_kept_without_update_existing(db):
+    bulk_upsert_prices(db, _prices())
+
+    result = bulk_upsert_prices(db, _prices(price=[99.0] * 10))
+
+    assert result.as_dict() == {"inserted": 0, "updated": 0, "skipped": 10}
+    assert set(_stored(db).values()) == set(float(p) for p in range(1, 11))
+
+
+def test_update_existing_counts_only_changed_prices(db):
+    bulk_upsert_prices(db, _prices())
+    df = _prices()
+    df.loc[:2, "price"] = 99.0
+    df = pd.concat([df, _prices(start="2024-02-01", periods=1)], ignore_index=True)
+
+    result = bulk_upsert_prices(db, df, update_existing=True, chunk_size=3)
+    again = bulk_upsert_prices(db, df, update_existing=True, chunk_size=3)
+
+    assert result.as_dict() == {"inserted": 1, "updated": 3, "skipped": 7}
+    assert again.as_dict() == {"inserted": 0, "updated": 0, "skipped": 11}
+    stored = _stored(db)
+    assert len(stored) == 11
+    assert stored[pd.Timestamp("2024-01-01 01:00").to_pydatetime()] == 99.0
+
+
+def test_invalid_and_duplicate_rows_are_skipped(db):
+    df = _prices(periods=4, price=[10.0, -5.0, None, 20.0])
+    df = pd.concat([df, df.iloc[[0]]], ignore_index=True)
+
+    result = bulk_upsert_prices(db, df)
+
+    assert result.as_dict() == {"inserted": 2, "updated": 0, "skipped": 3}
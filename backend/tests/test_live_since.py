@@ -0,0 +1,25 @@
+from datetime import datetime, timedelta
+
+from services.scheduler import live_since, LIVE_MAX_LOOKBACK
+
+NOW = datetime(2024, 6, 1, 12, 0)
+
+
+def test_starts_after_oldest_current_watermark():
+    watermarks = {"uk_dayahead": NOW - timedelta(hours=1), "uk_dayahead_n2ex": NOW - timedelta(hours=3)}
+
+    assert live_since(watermarks, NOW) == NOW - timedelta(hours=2, minutes=30)
+
+
+def test_empty_or_stale_market_does_not_widen_the_poll():
+    fresh = NOW - timedelta(hours=1)
+
+    assert live_since({"uk_dayahead": fresh, "uk_dayahead_n2ex": None}, NOW) == fresh + timedelta(minutes=30)
+    assert live_since({"uk_dayahead": fresh, "uk_dayahead_n2ex": NOW - timedelta(days=5)}, NOW) == (
+        fresh + timedelta(minutes=30)
+    )
+
+
+def test_lookback_is_capped_and_empty_store_polls_a_day():
+    assert live_since({"uk_dayahead": NOW - timedelta(days=30)}, NOW) == NOW - LIVE_MAX_LOOKBACK
+    assert live_since({"uk_dayahead": None}, NOW) == NOW - timedelta(days=1)
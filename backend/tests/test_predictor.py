@@ -0,0 +1,87 @@
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import StandardScaler
+
+from helpers import hourly_history
+from models.features import FEATURE_COLUMNS, MODEL_COLUMNS, build_feature_matrix, fill_time_features
+from models.predictor import EnergyPredictor, fit_members
+from models.registry import ensemble_specs, thread_budgets
+from services.feature_cache import FeatureCache
+
+
+def test_training_reuses_cached_features_without_modifying_them(tmp_path):
+    df = hourly_history()
+    cache = FeatureCache()
+    predictor = EnergyPredictor(model_dir=str(tmp_path / "models"), feature_cache=cache)
+
+    first = predictor.train(df, market="uk_dayahead")
+    second = predictor.train(df, market="uk_dayahead")
+
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["hits"] == 1
+    assert first["xgb_short"]["mae"] == second["xgb_short"]["mae"]
+
+    cached = predictor.feature_matrix(df, "uk_dayahead")
+    expected = build_feature_matrix(df["timestamp"], df["price"].to_numpy())
+    assert not cached.X.flags.writeable
+    assert np.array_equal(cached.X, expected.X)
+
+
+def _history_arrays():
+    df = hourly_history()
+    return df["timestamp"], df["price"].to_numpy()
+
+
+def test_parallel_and_sequential_fits_are_identical():
+    matrix = build_feature_matrix(*_history_arrays())
+    X = StandardScaler().fit_transform(matrix.X[-1000:]).astype(np.float32)
+    y = matrix.y[-1000:]
+    specs = ensemble_specs("uk_dayahead")
+    budgets = thread_budgets(specs)
+
+    def members():
+        return {slot: (spec.build(budgets[slot]), X, y, budgets[slot]) for slot, spec in specs.items()}
+
+    sequential, _ = fit_members(members(), workers=1)
+    parallel, _ = fit_members(members(), workers=2)
+
+    assert sequential.keys() == parallel.keys()
+    for slot in specs:
+        assert np.array_equal(sequential[slot].predict(X), parallel[slot].predict(X))
+
+
+def test_batched_forecast_matches_scoring_each_day_on_its_own(tmp_path):
+    df = hourly_history()
+    predictor = EnergyPredictor(model_dir=str(tmp_path / "models"))
+    predictor.train(df, market="uk_dayahead")
+
+    forecast = predictor.predict(df, horizon_days=30)
+
+    # The per-day loop predict used to run: one row and one call per model per day
+    latest = predictor.latest_features(df)
+    origin = latest["timestamp"].iloc[0]
+    historical_std = df["price"].std()
+    for day, result in enumerate(forecast, start=1):
+        target_date = origin + timedelta(days=day)
+        row = np.empty((1, len(MODEL_COLUMNS)), dtype=np.float32)
+        row[0, :len(FEATURE_COLUMNS)] = latest[FEATURE_COLUMNS].to_numpy(dtype=np.float32)[0]
+        fill_time_features(row, pd.DatetimeIndex([target_date]))
+        row[0, -1] = day
+
+        X_scaled = predictor.scalers["main"].transform(row)
+        xgb_pred = predictor.models["xgb_short"].predict(X_scaled)[0]
+        gb_pred = predictor.models["gb_long"].predict(X_scaled)[0]
+        weights = (0.6, 0.4) if day <= 7 else (0.3, 0.7)
+        price = xgb_pred * weights[0] + gb_pred * weights[1]
+        spread = np.std([xgb_pred, gb_pred]) + historical_std * 0.1 * np.sqrt(day)
+
+        assert result.target_date == target_date
+        assert result.predicted_price == pytest.approx(price, rel=1e-6)
+        assert result.lower_bound == pytest.approx(price - 2 * spread, rel=1e-6)
+        assert result.confidence == pytest.approx(max(0.5, 1.0 - day * 0.05))
+
+    # Each horizon is its own prediction, not the same row repeated
+    assert len({round(r.predicted_price, 6) for r in forecast}) > 1
@@ -0,0 +1,82 @@
+import asyncio
+import time
+
+import pandas as pd
+import pytest
+
+from helpers import hourly_history
+from services import scheduler
+from services.bmrs_parser import TRACKED_MARKETS
+from services.events import publish, subscribe, unsubscribe, MODEL_TRAINED, ModelTrained
+from services.predictor_registry import PredictorRegistry
+
+MARKET = "uk_dayahead"
+
+
+@pytest.fixture
+def history():
+    return hourly_history()
+
+
+@pytest.fixture
+def registry(tmp_path, history):
+    """A registry serving a model trained on all but the last four days"""
+    registry = PredictorRegistry(root=str(tmp_path), reload_seconds=3600)
+    registry.training_predictor(MARKET).train(history.iloc[:-96], market=MARKET)
+    return registry
+
+
+def _publish_update(registry, history) -> str:
+    """Retrain a private copy on the full history, as a training job would"""
+    predictor = registry.training_predictor(MARKET)
+    assert predictor.retrain(history, MARKET)["mode"] == "incremental"
+    return predictor.version
+
+
+def test_model_trained_swaps_in_the_new_version_and_keeps_feature_state(registry, history):
+    serving = registry.get(MARKET)
+    serving.latest_features(history, MARKET)
+    engines, lock, version = serving.feature_engines, serving.feature_lock, serving.version
+
+    new_version = _publish_update(registry, history)
+    assert registry.get(MARKET) is serving
+
+    subscribe(MODEL_TRAINED, registry.on_model_trained)
+    try:
+        publish(MODEL_TRAINED, ModelTrained(market=MARKET, model_dir=registry.model_dir(MARKET)))
+    finally:
+        unsubscribe(MODEL_TRAINED, registry.on_model_trained)
+
+    swapped = registry.get(MARKET)
+    assert swapped is not serving and swapped.version == new_version
+    assert swapped.feature_engines is engines and swapped.feature_lock is lock
+    # Requests still holding the old predictor keep its models
+    assert serving.version == version
+    assert registry.status()[MARKET]["version"] == new_version
+
+
+def test_versions_published_elsewhere_load_after_the_reload_interval(registry, history):
+    registry.reload_seconds = 0.2
+    serving = registry.get(MARKET)
+
+    new_version = _publish_update(registry, history)
+    registry._checked[MARKET] = time.monotonic()
+    assert registry.get(MARKET) is serving
+
+    time.sleep(0.25)
+    assert registry.get(MARKET).version == new_version
+
+
+def test_scheduled_update_covers_every_tracked_market(monkeypatch):
+    loaded = []
+
+    def load_training_data(market):
+        loaded.append(market)
+        if market == TRACKED_MARKETS[0]:
+            raise RuntimeError("store unavailable")
+        return pd.DataFrame(columns=["timestamp", "price", "market"])
+
+    monkeypatch.setattr(scheduler, "load_training_data", load_training_data)
+    asyncio.run(scheduler.update_predictions())
+
+    assert loaded == TRACKED_MARKETS
@@ -0,0 +1,106 @@
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.events import PricesIngested
+from services.ingest import bulk_upsert_prices
+from services.price_window import PriceWindow
+
+MARKET = "uk_dayahead"
+
+
+def _rows(start, periods):
+    timestamps = pd.date_range(start, periods=periods, freq="30min")
+    # Price derived from the timestamp, so any row can be checked on its own
+    return pd.DataFrame({"timestamp": timestamps, "price": (timestamps.as_unit("s").asi8 % 9973) / 10.0})
+
+
+def _event(rows):
+    return PricesIngested(
+        market=MARKET,
+        watermark=rows["timestamp"].max().to_pydatetime(),
+        first_timestamp=rows["timestamp"].min().to_pydatetime(),
+        rows=rows
+    )
+
+
+@pytest.fixture
+def window(db):
+    start = datetime.utcnow().replace(minute=0, second=0, microsecond=0) - timedelta(days=10)
+    bulk_upsert_prices(db, _rows(start, 48 * 5).assign(market=MARKET))
+    window = PriceWindow(days=30)
+    window.load(db, MARKET)
+    return window
+
+
+def test_new_rows_are_appended_without_touching_handed_out_views(window):
+    before_ts, before_prices = window.arrays(MARKET)
+    snapshot = before_ts.copy(), before_prices.copy()
+    newer = _rows(pd.Timestamp(before_ts[-1]) + pd.Timedelta(minutes=30), 2000)
+
+    window.on_prices_ingested(_event(newer))
+
+    timestamps, prices = window.arrays(MARKET)
+    assert len(timestamps) == len(before_ts) + 2000
+    assert timestamps[-1] == newer["timestamp"].iloc[-1]
+    assert np.all(np.diff(timestamps) > np.timedelta64(0))
+    assert np.array_equal(before_ts, snapshot[0]) and np.array_equal(before_prices, snapshot[1])
+    assert not timestamps.flags.writeable and not prices.flags.writeable
+
+
+def test_out_of_order_rows_are_merged_and_later_writes_win(window):
+    timestamps, _ = window.arrays(MARKET)
+    first = pd.Timestamp(timestamps[0])
+
+    # Older than everything held, overlapping the start, and with rewritten prices
+    backfill = _rows(first - pd.Timedelta(hours=6), 24)
+    backfill["price"] = -1.0
+    window.on_prices_ingested(_event(backfill))
+
+    merged_ts, merged_prices = window.arrays(MARKET)
+    assert len(merged_ts) == len(timestamps) + 12
+    assert np.all(np.diff(merged_ts) > np.timedelta64(0))
+    assert np.all(merged_prices[:24] == -1.0)
+    assert merged_prices[24] != -1.0
+
+
+def test_rows_older_than_the_window_are_dropped_on_merge(window):
+    stale = _rows(datetime.utcnow() - timedelta(days=60), 4)
+    window.on_prices_ingested(_event(stale))
+
+    timestamps, _ = window.arrays(MARKET)
+    assert timestamps[0] > np.datetime64(datetime.utcnow() - timedelta(days=30))
+
+
+def test_readers_see_consistent_arrays_while_rows_arrive(window):
+    timestamps, _ = window.arrays(MARKET)
+    start = pd.Timestamp(timestamps[-1]) + pd.Timedelta(minutes=30)
+    batches = [_rows(start + pd.Timedelta(hours=i), 2) for i in range(300)]
+    done = threading.Event()
+    errors = []
+
+    def read():
+        try:
+            while not done.is_set():
+                ts, prices = window.arrays(MARKET)
+                assert len(ts) == len(prices)
+                assert np.all(np.diff(ts) > np.timedelta64(0))
+                expected = (ts.astype("datetime64[s]").astype(np.int64) % 9973) / 10.0
+                assert np.array_equal(prices, expected)
+        except AssertionError as e:
+            errors.append(e)
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    for batch in batches:
+        window.on_prices_ingested(_event(batch))
+    done.set()
+    for reader in readers:
+        reader.join()
+
+    assert not errors
+    assert len(window.arrays(MARKET)[0]) == len(timestamps) + 600
@@ -0,0 +1,90 @@
+import shutil
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from helpers import hourly_history
+from models.predictor import EnergyPredictor, INCREMENTAL_TREES, FULL_RETRAIN_HOURS
+
+NEW_ROWS = 96
+
+
+@pytest.fixture(scope="module")
+def trained(tmp_path_factory):
+    """Models fitted on all but the last NEW_ROWS hours of a history"""
+    history = hourly_history()
+    model_dir = tmp_path_factory.mktemp("retrain") / "models"
+    EnergyPredictor(model_dir=str(model_dir)).train(history.iloc[:-NEW_ROWS], market="uk_dayahead")
+    return model_dir, history
+
+
+def _load(trained, tmp_path) -> EnergyPredictor:
+    model_dir = tmp_path / "models"
+    shutil.copytree(trained[0], model_dir)
+    predictor = EnergyPredictor(model_dir=str(model_dir))
+    assert predictor.load_models()
+    return predictor
+
+
+def _rounds(predictor) -> int:
+    return predictor.models["xgb_short"].get_booster().num_boosted_rounds()
+
+
+def test_new_rows_add_trees_to_the_saved_model(trained, tmp_path):
+    predictor = _load(trained, tmp_path)
+    history = trained[1]
+    rounds = _rounds(predictor)
+    gb_long = predictor.models["gb_long"]
+
+    result = predictor.retrain(history, "uk_dayahead")
+
+    assert result["mode"] == "incremental"
+    assert _rounds(predictor) == rounds + INCREMENTAL_TREES
+    assert predictor.models["gb_long"] is gb_long
+    assert predictor.training_state["trained_until"] == np.datetime64(history["timestamp"].iloc[-1], "ns")
+
+    # The update is published: a fresh load picks up the extra trees
+    reloaded = EnergyPredictor(model_dir=predictor.model_dir)
+    assert reloaded.load_models()
+    assert _rounds(reloaded) == rounds + INCREMENTAL_TREES
+
+
+def test_no_new_rows_is_a_skip(trained, tmp_path):
+    predictor = _load(trained, tmp_path)
+    version = predictor.version
+
+    result = predictor.retrain(trained[1].iloc[:-NEW_ROWS], "uk_dayahead")
+
+    assert result == {"mode": "skipped", "reason": "0 new rows", "metrics": {}}
+    assert predictor.version == version
+    assert predictor.artifacts.active_version() == version
+
+
+def test_stale_model_gets_a_full_retrain(trained, tmp_path):
+    predictor = _load(trained, tmp_path)
+    predictor.training_state["full_trained_at"] = datetime.utcnow() - timedelta(hours=FULL_RETRAIN_HOURS + 1)
+    n_estimators = predictor.model_specs["xgb_short"].params["n_estimators"]
+
+    result = predictor.retrain(trained[1], "uk_dayahead")
+
+    assert (result["mode"], result["reason"]) == ("full", "scheduled")
+    assert _rounds(predictor) == n_estimators
+    assert datetime.utcnow() - predictor.training_state["full_trained_at"] < timedelta(minutes=5)
+
+
+@pytest.mark.parametrize("setup, reason", [
+    (lambda p: setattr(p, "is_trained", False), "untrained"),
+    (lambda p: p.training_state.update(forecast_mae=1e-6), "drift"),
+])
+def test_fallbacks_to_a_full_retrain(trained, tmp_path, setup, reason):
+    predictor = _load(trained, tmp_path)
+    setup(predictor)
+    full_fits = []
+    predictor.train = lambda df, market=None, reason=None: full_fits.append(reason) or {}
+
+    result = predictor.retrain(trained[1], "uk_dayahead")
+
+    assert result["mode"] == "full"
+    assert result["reason"].startswith(reason)
+    assert full_fits == [result["reason"]]
@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.ingest import bulk_upsert_prices
+from services.repository import downsampled_chart
+from services.rollups import ROLLUP_RESOLUTIONS, raw_stats, rollup_stats
+
+
+def _prices(periods=48 * 40, seed=3):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "timestamp": pd.date_range("2024-01-01", periods=periods, freq="30min"),
+        "price": np.round(50 + rng.standard_normal(periods).cumsum(), 2).clip(1),
+        "market": "uk_dayahead",
+    })
+
+
+def _assert_same_stats(db, since):
+    raw = raw_stats(db, "uk_dayahead", since)
+    for resolution in ROLLUP_RESOLUTIONS:
+        rolled = rollup_stats(db, "uk_dayahead", since, resolution)
+        assert rolled["count"] == raw["count"]
+        assert rolled["min"] == raw["min"]
+        assert rolled["max"] == raw["max"]
+        assert rolled["avg"] == pytest.approx(raw["avg"])
+
+
+def test_rollup_stats_match_raw_stats(db):
+    bulk_upsert_prices(db, _prices())
+
+    for since in (datetime(2024, 1, 1), datetime(2024, 1, 3, 7, 30), datetime(2024, 1, 17, 13)):
+        _assert_same_stats(db, since)
+
+
+def test_rollups_follow_overwritten_prices(db):
+    df = _prices()
+    bulk_upsert_prices(db, df)
+
+    df.loc[100:140, "price"] = 999.0
+    bulk_upsert_prices(db, df, update_existing=True)
+
+    _assert_same_stats(db, datetime(2024, 1, 2, 5))
+    assert raw_stats(db, "uk_dayahead", datetime(2024, 1, 1))["max"] == 999.0
+
+
+def test_wide_downsampled_charts_come_from_rollups(db):
+    now = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    df = _prices(periods=48 * 90)
+    df["timestamp"] = pd.date_range(end=now, periods=len(df), freq="30min")
+    bulk_upsert_prices(db, df)
+
+    # 4320 raw rows > 8 * 300: LTTB over the 2160 hourly rollups
+    wide = downsampled_chart(db, "uk_dayahead", "3M", now - timedelta(days=90), 300)
+    assert wide["resolution"] == "lttb"
+    assert wide["source_resolution"] == "hour"
+    assert len(wide["data"]) == 300
+    assert {"open", "high", "low", "close"} <= set(wide["data"][0])
+    assert wide["data"][-1]["x"] == now.replace(minute=0).isoformat()
+
+    # Hourly is over budget and the daily rollup already fits
+    daily = downsampled_chart(db, "uk_dayahead", "3M", now - timedelta(days=90), 100)
+    assert daily["resolution"] == "day"
+    assert len(daily["data"]) == 91
+
+    reduced = downsampled_chart(db, "uk_dayahead", "3M", now - timedelta(days=90), 20)
+    assert reduced["resolution"] == "lttb"
+    assert reduced["source_resolution"] == "day"
+    assert len(reduced["data"]) == 20
+
+    narrow = downsampled_chart(db, "uk_dayahead", "1W", now - timedelta(days=7), 1000)
+    assert narrow["resolution"] == "raw"
+    assert len(narrow["data"]) == narrow["source_points"]
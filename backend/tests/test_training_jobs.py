@@ -0,0 +1,114 @@
+import asyncio
+import threading
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from routers import predictions
+from services import training_jobs
+from services.predictor_registry import PredictorRegistry
+from services.training_jobs import TrainingQueue, TRAINING_RETRY_AFTER
+
+
+@pytest.fixture
+def runs(monkeypatch):
+    """Replace the training run with one the test controls"""
+    calls = []
+    release = threading.Event()
+    outcome = {"error": None}
+
+    def train_market(job):
+        calls.append(job)
+        release.wait(5)
+        if outcome["error"]:
+            raise ValueError(outcome["error"])
+        return {"xgb_short": {"mae": 1.0}}
+
+    monkeypatch.setattr(training_jobs, "train_market", train_market)
+    return calls, release, outcome
+
+
+def _finish(queue, job):
+    queue._executor.submit(lambda: None).result(5)
+    assert not job.active
+
+
+def _age(job, seconds):
+    job.finished_at -= timedelta(seconds=seconds)
+
+
+def test_one_job_per_market_while_pending(runs):
+    calls, release, _ = runs
+    queue = TrainingQueue(workers=1)
+
+    first = queue.submit("uk_dayahead")
+    assert queue.submit("uk_dayahead") is first
+    other = queue.submit("uk_intraday")
+    assert other is not first
+
+    release.set()
+    _finish(queue, other)
+    assert [job.market for job in calls] == ["uk_dayahead", "uk_intraday"]
+    assert first.status == "succeeded" and first.min_rows == training_jobs.MIN_TRAINING_ROWS
+
+
+def test_failed_jobs_are_retried_only_after_the_retry_delay(runs):
+    _, release, outcome = runs
+    outcome["error"] = "Insufficient data"
+    release.set()
+    queue = TrainingQueue(workers=1)
+
+    failed = queue.submit("uk_dayahead")
+    _finish(queue, failed)
+    assert failed.status == "failed"
+    assert queue.submit("uk_dayahead") is failed
+    assert queue.submit("uk_dayahead", force=True) is failed
+
+    _age(failed, TRAINING_RETRY_AFTER)
+    assert queue.submit("uk_dayahead") is not failed
+
+
+def test_succeeded_jobs_are_not_rerun_by_reads_during_the_cooldown(runs):
+    _, release, _ = runs
+    release.set()
+    queue = TrainingQueue(workers=1)
+
+    done = queue.submit("uk_dayahead")
+    _finish(queue, done)
+    assert queue.submit("uk_dayahead") is done
+
+    # An explicit POST /train always starts a new run
+    forced = queue.submit("uk_dayahead", force=True)
+    assert forced is not done
+    _finish(queue, forced)
+
+    _age(forced, training_jobs.TRAINING_SUCCESS_COOLDOWN)
+    assert queue.submit("uk_dayahead") is not forced
+
+
+def test_reads_without_a_model_get_503_and_queue_one_job(runs, tmp_path, monkeypatch):
+    calls, release, _ = runs
+    queue = TrainingQueue(workers=1)
+    monkeypatch.setattr(predictions, "get_training_queue", lambda: queue)
+    monkeypatch.setattr(predictions, "get_predictor_registry", lambda: PredictorRegistry(root=str(tmp_path)))
+
+    def require():
+        with pytest.raises(HTTPException) as raised:
+            asyncio.run(predictions.require_model("uk_dayahead"))
+        return raised.value
+
+    first, second = require(), require()
+    assert first.status_code == 503
+    assert first.headers["Retry-After"] == str(TRAINING_RETRY_AFTER)
+    assert second.detail["job_id"] == first.detail["job_id"]
+
+    # The job succeeds but publishes nothing loadable: reads report it
+    # instead of training again on every request
+    release.set()
+    _finish(queue, queue.get(first.detail["job_id"]))
+    after = require()
+    assert after.detail["job_id"] == first.detail["job_id"]
+    assert after.detail["status"] == "succeeded"
+    assert "could not be loaded" in after.detail["message"]
+    assert len(calls) == 1
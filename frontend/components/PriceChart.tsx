@@ -26,6 +26,9 @@ interface PriceChartProps {
 
 const periods = ['1D', '1W', '1M', '3M', '1Y', '5Y'];
 
+// Server downsamples longer periods to roughly the chart's pixel width
+const MAX_CHART_POINTS = 1000;
+
 export default function PriceChart({ market, showForecast = false }: PriceChartProps) {
   const [data, setData] = useState<ChartData[]>([]);
   const [forecast, setForecast] = useState<any[]>([]);
@@ -40,7 +43,7 @@ export default function PriceChart({ market, showForecast = false }: PriceChartP
     setLoading(true);
     try {
       // Fetch historical data
-      const res = await fetch(`/api/market/chart?market=${market}&period=${period}`);
+      const res = await fetch(`/api/market/chart?market=${market}&period=${period}&max_points=${MAX_CHART_POINTS}`);
       if (res.ok) {
         const json = await res.json();
         setData(json.data || []);